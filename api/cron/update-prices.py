@@ -13,11 +13,15 @@ from http.server import BaseHTTPRequestHandler
 import json
 import os
 import sys
-from datetime import datetime
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import TimeoutError as FuturesTimeout
+from datetime import date, datetime
 from pathlib import Path
 
 # Add backend path for imports
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'backend', 'python'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'backend'))
 
 try:
     from multi_source_price_scraper import MultiSourcePriceScraper
@@ -25,6 +29,37 @@ try:
 except ImportError:
     SCRAPER_AVAILABLE = False
 
+try:
+    from state_ingest import ingest_state, prime_scraper_caches
+    STATE_INGEST_AVAILABLE = True
+except ImportError:
+    STATE_INGEST_AVAILABLE = False
+
+from lookup_memory import get_negative_cache
+from snapshot_writer import VERSION_KEY, publish_prices
+
+try:
+    from price_shards import write_price_shards
+    SHARDS_AVAILABLE = True
+except ImportError:
+    SHARDS_AVAILABLE = False
+
+try:
+    from price_forecasts import FORECAST_HISTORY_WEEKS, write_predictions
+    PREDICTIONS_AVAILABLE = True
+except ImportError:
+    PREDICTIONS_AVAILABLE = False
+
+try:
+    from database import PriceObservation, PriceRollup, init_db, read_prices
+    DATABASE_AVAILABLE = True
+except ImportError:
+    DATABASE_AVAILABLE = False
+
+# One paged whole-state pass primes every source before the per-crop loop
+STATE_INGEST_ENABLED = os.environ.get('CRON_STATE_INGEST', '1') != '0'
+INGEST_STATE = 'Maharashtra'
+
 # Top Maharashtra crops to update
 PRIORITY_CROPS = [
     'wheat', 'rice', 'cotton', 'sugarcane', 'soybean',
@@ -33,12 +68,159 @@ PRIORITY_CROPS = [
     'pomegranate', 'grapes', 'orange', 'chilli', 'turmeric'
 ]
 
+PRICES_FILE = Path(__file__).parent.parent.parent / 'data' / 'json' / 'prices.json'
+
+# Crops finished by a run, one JSON line each, until the run publishes the snapshot
+CHECKPOINT_FILE = PRICES_FILE.with_name('prices.checkpoint.jsonl')
+
+# Concurrent crop refreshes and overall run budget (kept under the function timeout)
+CRON_MAX_WORKERS = int(os.environ.get('CRON_MAX_WORKERS', '5'))
+CRON_TIME_BUDGET_SECONDS = float(os.environ.get('CRON_TIME_BUDGET_SECONDS', '45'))
+# Part of the budget the whole-state ingest may use before the per-crop refresh starts
+CRON_INGEST_BUDGET_SECONDS = float(os.environ.get('CRON_INGEST_BUDGET_SECONDS', '20'))
+
 HISTORY_LABELS = [
     '7W ago', '6W ago', '5W ago', '4W ago',
     '3W ago', '2W ago', '1W ago', 'Current'
 ]
 
 
+def build_price_entry(price_data):
+    """Shape a scraper result into a prices.json entry (or an error marker)"""
+    if not price_data or price_data.get('price', 0) <= 0:
+        return {'error': 'No data'}
+    
+    current_price = round(price_data['price'], 2)
+    historical_prices = [
+        round(float(value), 2)
+        for value in price_data.get('historical_prices', [current_price])
+        if float(value) > 0
+    ]
+    market_comparison = price_data.get('market_comparison', [])
+    is_fallback = price_data.get('is_fallback', False)
+
+    return {
+        'price': current_price,
+        'current_price': current_price,
+        'historical_prices': historical_prices,
+        'market_comparison': market_comparison,
+        'market': price_data.get('market', 'Multiple Markets'),
+        'state': price_data.get('state', 'Maharashtra'),
+        'source': price_data.get('data_source', 'Unknown'),
+        'source_badge': '⚪ MSP/Estimate' if is_fallback else '🟢 LIVE Data',
+        'confidence': price_data.get('confidence', 0),
+        'timestamp': price_data.get('timestamp'),
+        'is_fallback': is_fallback,
+        'is_estimate': is_fallback,
+        'data_origin': 'estimate' if is_fallback else 'live',
+        'labels': price_data.get('history_dates') or HISTORY_LABELS,
+        'data': [round(value * 100, 2) for value in historical_prices],
+        'unit': '₹/quintal'
+    }
+
+
+def refresh_priority(entry, now: datetime):
+    """
+    Sort key for refresh order: (staleness hours, volatility)
+
+    Crops never written by the cron rank first; among the rest the oldest
+    entries win, with recent price swings breaking ties within an hour.
+    """
+    if not isinstance(entry, dict) or not entry.get('last_updated'):
+        return (float('inf'), 0.0)
+    
+    try:
+        age_hours = (now - datetime.fromisoformat(entry['last_updated'])).total_seconds() / 3600
+    except (TypeError, ValueError):
+        return (float('inf'), 0.0)
+    
+    series = [float(value) for value in entry.get('data', []) if isinstance(value, (int, float)) and value > 0]
+    volatility = 0.0
+    if len(series) >= 2:
+        mean = sum(series) / len(series)
+        volatility = (sum((value - mean) ** 2 for value in series) / len(series)) ** 0.5 / mean
+    
+    return (int(age_hours), volatility)
+
+
+def crop_alias_map(scraper):
+    """Lowercase upstream commodity name -> scraper crop key"""
+    crop_for_alias = {}
+    for source in scraper.sources:
+        for crop, aliases in getattr(source, 'crop_mappings', {}).items():
+            for alias in aliases:
+                crop_for_alias.setdefault(alias.lower(), crop)
+    return crop_for_alias
+
+
+def store_partition(partition, scraper):
+    """Upsert ingested records as normalized observations under the scraper crop keys"""
+    crop_for_alias = crop_alias_map(scraper)
+    return PriceObservation.bulk_upsert(
+        PriceObservation.from_record(crop_for_alias[commodity.lower()], record, source='data.gov.in')
+        for commodity, markets in partition.items()
+        if commodity.lower() in crop_for_alias
+        for rows in markets.values()
+        for record in rows
+    )
+
+
+def load_weekly_rollups(crops):
+    """{crop: {market: [(week_start, ₹/kg), ...]}} for the forecast step"""
+    return {crop: PriceRollup.series_by_market(crop, 'week', FORECAST_HISTORY_WEEKS) for crop in crops}
+
+
+def save_prices(all_prices):
+    """Publish the snapshot to prices.json (skipped when no price changed) and SQLite; returns publish_prices' result"""
+    return publish_prices(str(PRICES_FILE), all_prices)
+
+
+def checkpoint_crop(crop, entry):
+    """Append one finished crop to the run's checkpoint (cheap; no snapshot or generation)"""
+    try:
+        with open(CHECKPOINT_FILE, 'a', encoding='utf-8') as f:
+            f.write(json.dumps({'crop': crop, 'entry': entry}, ensure_ascii=False) + '\n')
+    except OSError as e:
+        print(f"⚠️ Could not checkpoint {crop}: {e}")
+
+
+def restore_checkpoint(all_prices):
+    """
+    Merge crops a killed run finished but never published into all_prices
+
+    Only entries newer than the loaded ones are used; returns how many.
+    """
+    restored = 0
+    try:
+        with open(CHECKPOINT_FILE, 'r', encoding='utf-8') as f:
+            lines = f.readlines()
+    except OSError:
+        return 0
+
+    for line in lines:
+        try:
+            item = json.loads(line)
+            crop, entry = item['crop'], item['entry']
+        except (KeyError, TypeError, ValueError):
+            continue  # a line cut short when the run was killed
+        current = all_prices.get(crop)
+        if isinstance(current, dict) and current.get('last_updated', '') >= entry.get('last_updated', ''):
+            continue
+        all_prices[crop] = entry
+        all_prices['lastUpdated'] = max(all_prices.get('lastUpdated') or '', entry.get('last_updated', ''))
+        restored += 1
+    return restored
+
+
+def clear_checkpoint():
+    try:
+        CHECKPOINT_FILE.unlink()
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        print(f"⚠️ Could not remove price checkpoint: {e}")
+
+
 class handler(BaseHTTPRequestHandler):
     """Cron job handler for automated price updates"""
     
@@ -70,85 +252,139 @@ class handler(BaseHTTPRequestHandler):
             return
         
         try:
-            # Initialize scraper
-            scraper = MultiSourcePriceScraper()
+            run_started = time.monotonic()
+            budget_deadline = run_started + CRON_TIME_BUDGET_SECONDS
+            
+            ingest_deadline = min(budget_deadline, run_started + CRON_INGEST_BUDGET_SECONDS)
+            ingest, ingest_stats = self._run_state_ingest(ingest_deadline)
+            partition = ingest.partition if ingest else {}
+            
+            # Only a complete pass over today's listing makes the negative cache
+            # authoritative; otherwise re-probe crops cached as "no records"
+            fresh_and_complete = bool(ingest and ingest.complete and ingest.arrival_date == date.today())
+            scraper = MultiSourcePriceScraper(use_negative_cache=fresh_and_complete)
+            if partition:
+                ingest_stats.update(prime_scraper_caches(
+                    partition,
+                    INGEST_STATE,
+                    multi_source=scraper,
+                    arrival_date=ingest.arrival_date,
+                    complete=ingest.complete
+                ))
+            
+            # SQLite is what the API reads; prices.json stays as an export
+            database_ready = self._init_database()
+            if partition and database_ready:
+                try:
+                    ingest_stats['observations'] = store_partition(partition, scraper)
+                except Exception as e:
+                    ingest_stats['observations_error'] = str(e)
+            
+            # Load existing data (the database keeps per-crop refresh times even
+            # when an unchanged prices.json export was not rewritten)
+            all_prices = read_prices(json_paths=(str(PRICES_FILE),)) if database_ready else None
+            if all_prices is None and PRICES_FILE.exists():
+                with open(PRICES_FILE, 'r', encoding='utf-8') as f:
+                    all_prices = json.load(f)
+            all_prices = all_prices or {}
+            restored = restore_checkpoint(all_prices)
+            if restored:
+                all_prices['source'] = 'SmartSheti price pipeline cache'
+            
+            # Stalest and most volatile crops first, so a cut-short run still
+            # refreshes the entries that need it most
+            run_time = datetime.now()
+            crop_order = sorted(
+                PRIORITY_CROPS,
+                key=lambda crop: refresh_priority(all_prices.get(crop), run_time),
+                reverse=True
+            )
             
-            # Fetch prices for all priority crops
             results = {}
+            timings = {}
             successful = 0
             failed = 0
+            update_timestamp = run_time.isoformat()
             
-            for crop in PRIORITY_CROPS:
+            executor = ThreadPoolExecutor(max_workers=CRON_MAX_WORKERS, thread_name_prefix='cron-price')
+            try:
+                futures = {
+                    executor.submit(self._refresh_crop, scraper, crop, budget_deadline): crop
+                    for crop in crop_order
+                }
                 try:
-                    price_data = scraper.get_price(crop, 'Maharashtra')
-                    
-                    if price_data and price_data.get('price', 0) > 0:
-                        current_price = round(price_data['price'], 2)
-                        historical_prices = [
-                            round(float(value), 2)
-                            for value in price_data.get('historical_prices', [current_price])
-                            if float(value) > 0
-                        ]
-                        market_comparison = price_data.get('market_comparison', [])
-                        is_fallback = price_data.get('is_fallback', False)
-
-                        results[crop] = {
-                            'price': current_price,
-                            'current_price': current_price,
-                            'historical_prices': historical_prices,
-                            'market_comparison': market_comparison,
-                            'market': price_data.get('market', 'Multiple Markets'),
-                            'state': price_data.get('state', 'Maharashtra'),
-                            'source': price_data.get('data_source', 'Unknown'),
-                            'source_badge': '⚪ MSP/Estimate' if is_fallback else '🟢 LIVE Data',
-                            'confidence': price_data.get('confidence', 0),
-                            'timestamp': price_data.get('timestamp'),
-                            'is_fallback': is_fallback,
-                            'is_estimate': is_fallback,
-                            'data_origin': 'estimate' if is_fallback else 'live',
-                            'labels': HISTORY_LABELS,
-                            'data': [round(value * 100, 2) for value in historical_prices],
-                            'unit': '₹/quintal'
-                        }
+                    for future in as_completed(futures, timeout=max(0.0, budget_deadline - time.monotonic())):
+                        crop = futures[future]
+                        entry, outcome, latency_ms = future.result()
+                        results[crop] = entry
+                        timings[crop] = {'outcome': outcome, 'latency_ms': latency_ms}
+                        
+                        if 'error' in entry:
+                            failed += 1
+                            continue
+                        
                         successful += 1
-                    else:
-                        results[crop] = {'error': 'No data'}
+                        all_prices[crop] = {
+                            **entry,
+                            'last_updated': update_timestamp,
+                            'last_update_job': 'cron'
+                        }
+                        all_prices['lastUpdated'] = update_timestamp
+                        all_prices['source'] = 'SmartSheti price pipeline cache'
+                        # A run killed before publishing leaves what it finished here
+                        checkpoint_crop(crop, all_prices[crop])
+                except FuturesTimeout:
+                    pass
+                
+                for future, crop in futures.items():
+                    if crop not in results:
+                        outcome = 'timeout' if future.running() else 'skipped'
+                        results[crop] = {'error': f'Time budget exceeded ({outcome})'}
+                        timings[crop] = {'outcome': outcome, 'latency_ms': None}
                         failed += 1
-                        
-                except Exception as e:
-                    results[crop] = {'error': str(e)}
-                    failed += 1
-            
-            # Save results to JSON file
-            data_dir = Path(__file__).parent.parent.parent / 'data' / 'json'
-            data_dir.mkdir(parents=True, exist_ok=True)
+            finally:
+                executor.shutdown(wait=False, cancel_futures=True)
             
-            prices_file = data_dir / 'prices.json'
-            
-            # Load existing data or create new
-            if prices_file.exists():
-                with open(prices_file, 'r', encoding='utf-8') as f:
-                    all_prices = json.load(f)
+            # One snapshot (and at most one generation) per run; the checkpoint
+            # is kept for the next run unless prices.json was written
+            snapshot_stats = {'restored_from_checkpoint': restored}
+            if successful or restored:
+                try:
+                    published = save_prices(all_prices)
+                except Exception as e:
+                    snapshot_stats['error'] = str(e)
+                else:
+                    snapshot_stats.update(published)
+                    if database_ready and not published['database']:
+                        snapshot_stats['database_error'] = 'SQLite snapshot not updated'
+                    clear_checkpoint()
             else:
-                all_prices = {}
+                clear_checkpoint()
             
-            # Update with new prices
-            update_timestamp = datetime.now().isoformat()
+            # Static per-crop payloads so the frontend can skip the function
+            shard_stats = {'enabled': SHARDS_AVAILABLE}
+            if SHARDS_AVAILABLE and (successful or restored):
+                try:
+                    shard_stats.update(write_price_shards(all_prices, INGEST_STATE))
+                except Exception as e:
+                    shard_stats['error'] = str(e)
             
-            for crop, data in results.items():
-                if 'error' not in data:
-                    all_prices[crop] = {
-                        **data,
-                        'last_updated': update_timestamp,
-                        'last_update_job': 'cron'
-                    }
+            # Next-week forecasts so /api/predict is a lookup; past the budget
+            # stored model fits are applied but nothing is refit
+            prediction_stats = {'enabled': PREDICTIONS_AVAILABLE}
+            if PREDICTIONS_AVAILABLE:
+                try:
+                    rollups = load_weekly_rollups(PRIORITY_CROPS) if database_ready else {}
+                    prediction_stats.update(write_predictions(all_prices, rollups, deadline=budget_deadline))
+                except Exception as e:
+                    prediction_stats['error'] = str(e)
             
-            all_prices['lastUpdated'] = update_timestamp
-            all_prices['source'] = 'SmartSheti price pipeline cache'
-
-            # Save updated prices
-            with open(prices_file, 'w', encoding='utf-8') as f:
-                json.dump(all_prices, f, indent=2, ensure_ascii=False)
+            # The scrapers' negative-cache marks and clears, in one merged write
+            get_negative_cache().flush()
+            
+            elapsed_ms = round((time.monotonic() - run_started) * 1000)
+            timed_out = any(timing['outcome'] in ('timeout', 'skipped') for timing in timings.values())
+            success_rate = f"{(successful/len(PRIORITY_CROPS)*100):.1f}%"
             
             # Log to file
             log_dir = Path(__file__).parent.parent.parent / 'logs'
@@ -161,21 +397,35 @@ class handler(BaseHTTPRequestHandler):
                     'successful': successful,
                     'failed': failed,
                     'total': len(PRIORITY_CROPS),
-                    'success_rate': f"{(successful/len(PRIORITY_CROPS)*100):.1f}%"
+                    'success_rate': success_rate,
+                    'elapsed_ms': elapsed_ms,
+                    'timed_out': timed_out,
+                    'snapshot': snapshot_stats,
+                    'crops': timings
                 }
                 f.write(json.dumps(log_entry) + '\n')
             
             # Response
             response = {
                 'success': True,
-                'message': 'Price update completed',
+                'message': 'Price update stopped at time budget' if timed_out else 'Price update completed',
                 'stats': {
                     'total_crops': len(PRIORITY_CROPS),
                     'successful': successful,
                     'failed': failed,
-                    'success_rate': f"{(successful/len(PRIORITY_CROPS)*100):.1f}%"
+                    'success_rate': success_rate,
+                    'elapsed_ms': elapsed_ms,
+                    'time_budget_seconds': CRON_TIME_BUDGET_SECONDS,
+                    'timed_out': timed_out
                 },
+                'ingest': ingest_stats,
+                'snapshot_version': all_prices.get(VERSION_KEY),
+                'snapshot': snapshot_stats,
+                'shards': shard_stats,
+                'predictions': prediction_stats,
                 'timestamp': update_timestamp,
+                'order': crop_order,
+                'timings': timings,
                 'results': results
             }
             
@@ -188,6 +438,58 @@ class handler(BaseHTTPRequestHandler):
                 'timestamp': datetime.now().isoformat()
             }
             self.wfile.write(json.dumps(response).encode())
+    
+    def _init_database(self):
+        """Make sure the snapshot tables exist; False if SQLite can't be used"""
+        if not DATABASE_AVAILABLE:
+            return False
+        try:
+            init_db()
+            return True
+        except Exception as e:
+            print(f"⚠️ Price database unavailable, writing prices.json only: {e}")
+            return False
+    
+    def _refresh_crop(self, scraper, crop: str, budget_deadline: float):
+        """Refresh one crop within the remaining budget; returns (entry, outcome, latency_ms)"""
+        started = time.monotonic()
+        remaining = budget_deadline - started
+        if remaining <= 0:
+            return {'error': 'Time budget exceeded (skipped)'}, 'skipped', 0
+        
+        try:
+            price_data = scraper.get_price(crop, INGEST_STATE, deadline_seconds=remaining)
+            entry = build_price_entry(price_data)
+        except Exception as e:
+            entry = {'error': str(e)}
+        
+        latency_ms = round((time.monotonic() - started) * 1000)
+        if 'error' in entry:
+            outcome = 'error' if entry['error'] != 'No data' else 'no_data'
+        else:
+            outcome = entry['data_origin']
+        return entry, outcome, latency_ms
+    
+    def _run_state_ingest(self, deadline: float):
+        """Page through today's whole-state listing until deadline; returns (IngestResult or None, stats)"""
+        if not (STATE_INGEST_AVAILABLE and STATE_INGEST_ENABLED):
+            return None, {'enabled': False}
+        
+        try:
+            ingest = ingest_state(INGEST_STATE, deadline=deadline)
+        except Exception as e:
+            return None, {'enabled': True, 'success': False, 'error': str(e)}
+        
+        partition = ingest.partition
+        return ingest, {
+            'enabled': True,
+            'success': bool(partition),
+            'complete': ingest.complete,
+            'arrival_date': ingest.arrival_date.isoformat() if ingest.arrival_date else None,
+            'commodities': len(partition),
+            'markets': len({market for markets in partition.values() for market in markets}),
+            'records': sum(len(rows) for markets in partition.values() for rows in markets.values())
+        }
 
 
 if __name__ == '__main__':
@@ -6,12 +6,13 @@ This serverless function handles:
 - /api/realprice/<crop> - Multi-source prices with intelligent fallback
 - /api/prices/bulk - Fetch multiple crops at once
 - /api/prices/markets - Get available markets for crop
+- /api/predict/<crop> - Precomputed next-week forecast (lookup only)
 - /api/health - Health check endpoint
 """
 
 from http.server import BaseHTTPRequestHandler
 from urllib.parse import urlparse, parse_qs
-import json
+import copy
 import os
 import sys
 from datetime import datetime
@@ -19,6 +20,7 @@ from typing import Dict, Optional, List
 
 # Add backend path to enable imports
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend', 'python'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
 
 try:
     from multi_source_price_scraper import MultiSourcePriceScraper, get_crop_price
@@ -27,7 +29,35 @@ except ImportError:
     MULTI_SOURCE_AVAILABLE = False
     print("⚠️ Multi-source scraper not available, using basic fallback")
 
-import requests
+from concurrency import SingleFlight
+from http_caching import (
+    NO_CACHE, cache_control_for, encode_body, encode_response, etag_matches, select_representation
+)
+from http_client import http_get
+from lookup_memory import get_alias_learner, get_negative_cache
+from price_canonical import (
+    build_market_comparison_from_price,
+    calculate_change,
+    canonicalize_cached_entry,
+    canonicalize_price_data,
+    clamp_history,
+    generate_historical_trend,
+    get_crop_lookup_keys,
+    get_source_badge,
+    observed_history,
+    resolve_market_selection,
+    safe_float,
+)
+from price_forecasts import PREDICTIONS_FILE, find_prediction
+from price_history_store import history_stats, record_api_records
+from response_cache import ResponseCache
+from snapshot_writer import VERSION_KEY, load_snapshot
+
+try:
+    from database import read_price_entry
+    SNAPSHOT_DB_AVAILABLE = True
+except ImportError:
+    SNAPSHOT_DB_AVAILABLE = False
 
 # Data.gov.in API Configuration
 DATA_GOV_IN_API_KEY = os.environ.get('DATA_GOV_IN_API_KEY', '')
@@ -36,6 +66,23 @@ RESOURCE_ID = "9ef84268-d588-465a-a308-a864a43d0070"  # Daily agricultural price
 DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'data', 'json')
 CACHED_PRICES_FILE = os.path.join(DATA_DIR, 'prices.json')
 
+# In-process response cache for /api/realprice (seconds per data origin)
+REALPRICE_CACHE_SIZE = int(os.environ.get('REALPRICE_CACHE_SIZE', '256'))
+REALPRICE_MAX_STALE_SECONDS = int(os.environ.get('REALPRICE_MAX_STALE_SECONDS', '7200'))
+REALPRICE_CACHE_TTLS = {
+    'live': 1800,
+    'cached': 600,
+    'estimate': 300,
+}
+
+# Encoded /api/predict payloads; keyed by predictions version, so never stale
+PREDICT_CACHE_SIZE = int(os.environ.get('PREDICT_CACHE_SIZE', '256'))
+PREDICT_CACHE_TTL_SECONDS = 3600
+
+# Overall time budgets (seconds) for live lookups
+REALPRICE_DEADLINE_SECONDS = float(os.environ.get('REALPRICE_DEADLINE_SECONDS', '6'))
+BULK_DEADLINE_SECONDS = float(os.environ.get('BULK_DEADLINE_SECONDS', '8'))
+
 # Crop name mappings (common names to API names)
 CROP_MAPPINGS = {
     'wheat': ['Wheat', 'Wheat (Dara)', 'Gehun'],
@@ -53,177 +100,81 @@ CROP_MAPPINGS = {
     'tur': ['Arhar (Tur/Red Gram)(Whole)', 'Tur', 'Arhar'],
 }
 
-CROP_ALIASES = {
-    'soybean': ['soybean', 'soyabean'],
-    'soyabean': ['soyabean', 'soybean'],
-    'chili': ['chili', 'chilli'],
-    'chilli': ['chilli', 'chili'],
-}
-
-
-def get_crop_lookup_keys(crop: str) -> List[str]:
-    crop_key = crop.strip().lower()
-    keys = [crop_key]
-    for alias in CROP_ALIASES.get(crop_key, []):
-        if alias not in keys:
-            keys.append(alias)
-    return keys
-
-
-def safe_float(value, default: float = 0.0) -> float:
-    try:
-        return float(value)
-    except (TypeError, ValueError):
-        return default
-
-
-def clamp_history(history: List[float], current_price: float, desired_points: int = 8) -> List[float]:
-    normalized = [round(safe_float(price), 2) for price in history if safe_float(price) > 0]
-
-    if not normalized and current_price > 0:
-        normalized = generate_historical_trend(current_price, desired_points)
-
-    if normalized and len(normalized) < desired_points:
-        seed_price = normalized[-1]
-        generated = generate_historical_trend(seed_price, desired_points)
-        normalized = generated[:desired_points - len(normalized)] + normalized
-
-    if not normalized:
-        normalized = [round(current_price, 2)] * desired_points
-
-    return [round(price, 2) for price in normalized[-desired_points:]]
-
-
-def build_market_comparison_from_price(base_price: float) -> List[Dict]:
-    if base_price <= 0:
-        return []
-
-    market_defaults = [
-        ('Pune APMC', 1.00),
-        ('Mumbai APMC', 1.08),
-        ('Nashik APMC', 0.97),
-        ('Nagpur APMC', 1.03),
-        ('Aurangabad APMC', 0.99),
-    ]
-    comparison = []
-
-    for market_name, multiplier in market_defaults:
-        market_price = round(base_price * multiplier, 2)
-        change = ((market_price - base_price) / base_price) * 100 if base_price else 0
-        comparison.append({
-            'market': market_name,
-            'price': market_price,
-            'change': f"{'+' if change >= 0 else ''}{change:.1f}%"
-        })
-
-    return comparison
-
-
-def normalize_market_rows(markets: Optional[List[Dict]], current_price: float) -> List[Dict]:
-    normalized = []
-    seen = set()
-
-    for market in markets or []:
-        market_name = (
-            market.get('market')
-            or market.get('name')
-            or market.get('district')
-            or 'Unknown Market'
-        )
-        market_key = market_name.strip().lower()
-        if market_key in seen:
-            continue
-
-        price = safe_float(
-            market.get('price', market.get('price_per_kg', market.get('modal_price', current_price))),
-            current_price
-        )
-        if price <= 0:
-            continue
-
-        change_value = market.get('change')
-        if isinstance(change_value, str) and change_value:
-            change_text = change_value
-        else:
-            min_price = safe_float(market.get('min_price'), price)
-            max_price = safe_float(market.get('max_price'), price)
-            baseline = price or current_price or 1
-            change_pct = ((max_price - min_price) / baseline) * 100 if baseline else 0
-            change_text = f"{'+' if change_pct >= 0 else ''}{change_pct:.1f}%"
+def resolve_mapping_key(crop: str) -> str:
+    """Return the CROP_MAPPINGS key shared by a crop and its aliases"""
+    for crop_key in get_crop_lookup_keys(crop):
+        if crop_key in CROP_MAPPINGS:
+            return crop_key
+    return crop.strip().lower()
 
-        normalized.append({
-            'market': market_name,
-            'price': round(price, 2),
-            'change': change_text
-        })
-        seen.add(market_key)
 
-    if not normalized and current_price > 0:
-        normalized = build_market_comparison_from_price(current_price)
+def load_cached_prices() -> Dict:
+    """prices.json as written by the snapshot writer (shared, do not mutate)"""
+    data, _ = load_snapshot(CACHED_PRICES_FILE)
+    return data
 
-    return normalized[:5]
 
+def load_cached_price_entry(crop: str):
+    """
+    Point lookup of a crop's cached entry: (entry, snapshot metadata)
 
-def resolve_market_selection(requested_market: str, market_rows: List[Dict], current_price: float, historical_prices: List[float]) -> Dict:
-    requested_market = (requested_market or '').strip()
-    if not requested_market:
-        resolved_market = market_rows[0]['market'] if market_rows else 'Multiple Markets'
-        return {
-            'market': resolved_market,
-            'current_price': round(current_price, 2),
-            'historical_prices': historical_prices,
-            'market_requested': '',
-            'market_matched': bool(market_rows)
-        }
+    Reads one row from the SQLite price snapshot; prices.json is only
+    parsed when the database is unavailable or empty.
+    """
+    if SNAPSHOT_DB_AVAILABLE:
+        try:
+            _, entry, meta = read_price_entry(get_crop_lookup_keys(crop), json_paths=(CACHED_PRICES_FILE,))
+            return entry, meta
+        except (OSError, ValueError):
+            return None, {}
 
-    requested_key = requested_market.lower()
-    selected_market = None
+    cached_prices = load_cached_prices()
+    for crop_key in get_crop_lookup_keys(crop):
+        if isinstance(cached_prices.get(crop_key), dict):
+            return cached_prices[crop_key], cached_prices
+    return None, cached_prices
 
-    for market_row in market_rows:
-        market_name = market_row['market']
-        market_key = market_name.lower()
-        if market_key == requested_key or requested_key in market_key or market_key in requested_key:
-            selected_market = market_row
-            break
 
-    if selected_market:
-        selected_price = round(safe_float(selected_market.get('price'), current_price), 2)
-        delta = selected_price - current_price
-        adjusted_history = [round(price + delta, 2) for price in historical_prices] if historical_prices else [selected_price] * 8
-        return {
-            'market': selected_market['market'],
-            'current_price': selected_price,
-            'historical_prices': adjusted_history,
-            'market_requested': requested_market,
-            'market_matched': True
-        }
+def load_predictions() -> Dict:
+    """predictions.json as written by the cron (shared, do not mutate)"""
+    data, _ = load_snapshot(PREDICTIONS_FILE)
+    return data
 
-    resolved_market = market_rows[0]['market'] if market_rows else requested_market
-    return {
-        'market': resolved_market,
-        'current_price': round(current_price, 2),
-        'historical_prices': historical_prices,
-        'market_requested': requested_market,
-        'market_matched': False
-    }
 
+# Concurrent data.gov.in lookups for the same commodity share one request chain
+_api_flights = SingleFlight()
 
-def load_cached_prices() -> Dict:
-    if not os.path.exists(CACHED_PRICES_FILE):
-        return {}
 
-    try:
-        with open(CACHED_PRICES_FILE, 'r', encoding='utf-8') as file_handle:
-            return json.load(file_handle)
-    except (OSError, json.JSONDecodeError):
-        return {}
+def fetch_price_from_api(commodity: str, state: str = "Maharashtra") -> Optional[Dict]:
+    """Fetch real price data from data.gov.in API, coalescing concurrent lookups"""
+    
+    mapping_key = resolve_mapping_key(commodity)
+    flight_key = (mapping_key, (state or '').strip().lower())
+    price_data = _api_flights.do(flight_key, lambda: _fetch_price_from_api(mapping_key, state))
+    
+    if not price_data:
+        return None
+    
+    result = copy.deepcopy(price_data)
+    result['crop'] = commodity
+    return result
 
 
-def fetch_price_from_api(commodity: str, state: str = "Maharashtra") -> Optional[Dict]:
-    """Fetch real price data from data.gov.in API"""
+def _fetch_price_from_api(commodity: str, state: str = "Maharashtra") -> Optional[Dict]:
+    """Walk the commodity aliases against data.gov.in"""
+    
+    negative_cache = get_negative_cache()
+    if negative_cache.is_negative(commodity, state):
+        return None
     
-    # Get possible commodity names
-    commodity_names = CROP_MAPPINGS.get(commodity.lower(), [commodity.title()])
+    # Get possible commodity names, best-performing alias first
+    alias_learner = get_alias_learner()
+    commodity_names = alias_learner.order(
+        commodity,
+        state,
+        CROP_MAPPINGS.get(commodity.lower(), [commodity.title()])
+    )
+    empty_answers = 0
     
     for commodity_name in commodity_names:
         try:
@@ -240,20 +191,31 @@ def fetch_price_from_api(commodity: str, state: str = "Maharashtra") -> Optional
             
             # Make API request
             url = f"{BASE_URL}/{RESOURCE_ID}"
-            response = requests.get(url, params=params, timeout=10)
+            response = http_get(url, params=params, timeout=10)
             
             if response.status_code == 200:
                 data = response.json()
                 records = data.get('records', [])
                 
                 if records:
+                    record_api_records(commodity, records)
+                price_data = process_price_records(records, commodity) if records else None
+                if price_data:
                     # Successfully got real data
-                    return process_price_records(records, commodity)
+                    alias_learner.record_hit(commodity, state, commodity_name)
+                    negative_cache.clear(commodity, state)
+                    return price_data
+                
+                alias_learner.record_miss(commodity, state, commodity_name)
+                empty_answers += 1
         
         except Exception as e:
             print(f"Error fetching {commodity_name}: {e}")
             continue
     
+    if empty_answers == len(commodity_names):
+        negative_cache.mark_negative(commodity, state)
+    
     return None
 
 
@@ -293,8 +255,8 @@ def process_price_records(records: List[Dict], commodity: str) -> Dict:
     # Calculate current price (average of latest prices)
     current_price = round(sum(prices[:5]) / min(len(prices), 5), 2)
     
-    # Generate historical trend (8 data points)
-    historical_prices = prices[:8] if len(prices) >= 8 else generate_historical_trend(current_price, 8)
+    # Recorded history when available, generated trend otherwise
+    historical_prices = observed_history(commodity) or generate_historical_trend(current_price, 8)
     
     # Calculate price change
     previous_price = historical_prices[-2] if len(historical_prices) > 1 else current_price
@@ -324,33 +286,25 @@ def process_price_records(records: List[Dict], commodity: str) -> Dict:
     }
 
 
-def generate_historical_trend(current_price: float, num_points: int = 8) -> List[float]:
-    """Generate realistic historical price trend"""
-    import random
-    
-    # Use deterministic seed based on current price
-    random.seed(int(current_price * 100))
-    
-    prices = []
-    for i in range(num_points):
-        if i == num_points - 1:
-            prices.append(current_price)
-        else:
-            # Add realistic variation
-            variation = random.uniform(-0.08, 0.08)
-            historical_price = current_price * (1 + variation * (num_points - i - 1) / num_points)
-            prices.append(round(historical_price, 2))
-    
-    # Reset seed so it doesn't affect other random calls
-    random.seed()
-    return prices
-
-
 class handler(BaseHTTPRequestHandler):
     """Vercel serverless handler with multi-source support"""
     
     # Class-level scraper instance for reuse (reduces cold starts)
     scraper = None
+
+    # Finished /api/realprice payloads keyed by (crop, state, market)
+    price_cache = ResponseCache(
+        max_entries=REALPRICE_CACHE_SIZE,
+        ttl_seconds=REALPRICE_CACHE_TTLS['live'],
+        max_stale_seconds=REALPRICE_MAX_STALE_SECONDS
+    )
+
+    # Encoded /api/predict payloads keyed by (crop, market, predictions version)
+    predict_cache = ResponseCache(
+        max_entries=PREDICT_CACHE_SIZE,
+        ttl_seconds=PREDICT_CACHE_TTL_SECONDS,
+        max_stale_seconds=0
+    )
     
     @classmethod
     def get_scraper(cls):
@@ -368,101 +322,64 @@ class handler(BaseHTTPRequestHandler):
         data_origin: str,
         default_source: str = 'Unknown'
     ) -> Optional[Dict]:
-        if not price_data:
-            return None
-
-        history = price_data.get('historical_prices', [])
-        base_price = safe_float(price_data.get('current_price', price_data.get('price', 0)))
-        if 'data' in price_data and isinstance(price_data.get('data'), list):
-            price_series = [safe_float(value) for value in price_data.get('data', []) if safe_float(value) > 0]
-            unit = (price_data.get('unit') or '').lower()
-            if 'quintal' in unit:
-                history = [round(value / 100, 2) for value in price_series]
-            else:
-                history = [round(value, 2) for value in price_series]
-            if history:
-                base_price = history[-1]
-
-        if base_price <= 0 and history:
-            base_price = round(history[-1], 2)
-
-        if base_price <= 0:
-            return None
-
-        historical_prices = clamp_history(history, base_price)
-        current_price = round(base_price, 2)
-        market_rows = normalize_market_rows(
-            price_data.get('market_comparison', price_data.get('markets')),
-            current_price
-        )
-        market_resolution = resolve_market_selection(
-            requested_market,
-            market_rows,
-            current_price,
-            historical_prices
-        )
-
-        current_price = market_resolution['current_price']
-        historical_prices = clamp_history(market_resolution['historical_prices'], current_price)
-        change_percentage = self._calculate_change(historical_prices)
-        source = price_data.get('source', price_data.get('data_source', default_source))
-        confidence = int(round(safe_float(price_data.get('confidence', 0), 0)))
-        is_estimate = bool(price_data.get('is_estimate', False)) or data_origin == 'estimate'
-        is_fallback = bool(price_data.get('is_fallback', False)) or data_origin in ('cached', 'estimate')
-
-        canonical = {
-            'success': True,
-            'crop': price_data.get('crop', crop).lower(),
-            'current_price': round(current_price, 2),
-            'change_percentage': change_percentage,
-            'historical_prices': historical_prices,
-            'market_comparison': market_rows,
-            'timestamp': price_data.get('timestamp', price_data.get('last_updated', datetime.now().isoformat())),
-            'source': source,
-            'confidence': confidence,
-            'state': price_data.get('state', state),
-            'market': market_resolution['market'],
-            'market_requested': market_resolution['market_requested'],
-            'market_matched': market_resolution['market_matched'],
-            'is_fallback': is_fallback,
-            'is_estimate': is_estimate,
-            'data_origin': data_origin,
-        }
-        canonical['source_badge'] = self._get_source_badge(canonical)
-        return canonical
+        return canonicalize_price_data(crop, state, requested_market, price_data, data_origin, default_source)
 
     def _get_cached_price_data(self, crop: str, state: str, requested_market: str) -> Optional[Dict]:
-        cached_prices = load_cached_prices()
-        if not cached_prices:
+        crop_entry, cached_prices = load_cached_price_entry(crop)
+        if not isinstance(crop_entry, dict):
             return None
 
-        crop_entry = None
-        for crop_key in get_crop_lookup_keys(crop):
-            if crop_key in cached_prices:
-                crop_entry = cached_prices[crop_key]
-                break
+        return canonicalize_cached_entry(crop, state, requested_market, crop_entry, cached_prices)
+    
+    def _resolve_realprice(self, crop: str, state: str, requested_market: str) -> Dict:
+        """Walk the live -> data.gov.in -> cached -> fallback chain for one crop"""
+        response_data = None
 
-        if not isinstance(crop_entry, dict):
-            return None
+        try:
+            if MULTI_SOURCE_AVAILABLE:
+                # Use multi-source scraper without estimate fallback so cached real data stays preferred.
+                # Racing mode caps the live lookup at REALPRICE_DEADLINE_SECONDS.
+                scraper = self.get_scraper()
+                price_data = scraper.get_price(
+                    crop,
+                    state,
+                    use_fallback=False,
+                    deadline_seconds=REALPRICE_DEADLINE_SECONDS
+                )
+                response_data = self._canonicalize_price_data(
+                    crop,
+                    state,
+                    requested_market,
+                    price_data,
+                    data_origin='live',
+                    default_source='Multi-source scraper'
+                )
+
+            # The raced scraper already covers data.gov.in, so only query it directly without one
+            if not response_data and not MULTI_SOURCE_AVAILABLE:
+                price_data = fetch_price_from_api(crop, state)
+                response_data = self._canonicalize_price_data(
+                    crop,
+                    state,
+                    requested_market,
+                    price_data,
+                    data_origin='live',
+                    default_source='data.gov.in'
+                )
+
+            if not response_data:
+                response_data = self._get_cached_price_data(crop, state, requested_market)
 
-        cached_payload = {
-            **crop_entry,
-            'crop': crop,
-            'state': crop_entry.get('state', state),
-            'source': crop_entry.get('source', cached_prices.get('source', 'Cached Price Data')),
-            'timestamp': crop_entry.get('timestamp', crop_entry.get('last_updated', cached_prices.get('lastUpdated', datetime.now().isoformat()))),
-            'is_fallback': True,
-            'is_estimate': bool(crop_entry.get('is_estimate', False)),
-        }
+            if not response_data:
+                response_data = self._get_fallback_data(crop, state, requested_market)
 
-        return self._canonicalize_price_data(
-            crop,
-            state,
-            requested_market,
-            cached_payload,
-            data_origin='cached',
-            default_source='Cached Price Data'
-        )
+        except Exception as e:
+            print(f"Error fetching price for {crop}: {e}")
+            response_data = self._get_cached_price_data(crop, state, requested_market)
+            if not response_data:
+                response_data = self._get_fallback_data(crop, state, requested_market)
+
+        return response_data
     
     def do_GET(self):
         """Handle GET requests"""
@@ -473,6 +390,8 @@ class handler(BaseHTTPRequestHandler):
         # Headers moved to end of function
         
         response_data = {}
+        encoded = None
+        status_code = None
         
         # Health check
         if path == '/api/health':
@@ -482,8 +401,12 @@ class handler(BaseHTTPRequestHandler):
                 'version': '2.0',
                 'multi_source_enabled': MULTI_SOURCE_AVAILABLE,
                 'timestamp': datetime.now().isoformat(),
-                'realScraperAvailable': True
+                'realScraperAvailable': True,
+                'realprice_cache': self.price_cache.stats(),
+                'price_history': history_stats()
             }
+            if MULTI_SOURCE_AVAILABLE:
+                response_data['sources'] = self.get_scraper().get_source_health()
         
         # Multi-source price endpoint: /api/realprice/<crop>
         elif path.startswith('/api/realprice/'):
@@ -491,57 +414,35 @@ class handler(BaseHTTPRequestHandler):
             state = query.get('state', ['Maharashtra'])[0]
             requested_market = query.get('market', [''])[0]
             
-            try:
-                if MULTI_SOURCE_AVAILABLE:
-                    # Use multi-source scraper without estimate fallback so cached real data stays preferred.
-                    scraper = self.get_scraper()
-                    price_data = scraper.get_price(crop, state, use_fallback=False)
-                    response_data = self._canonicalize_price_data(
-                        crop,
-                        state,
-                        requested_market,
-                        price_data,
-                        data_origin='live',
-                        default_source='Multi-source scraper'
-                    )
-
-                if not response_data:
-                    price_data = fetch_price_from_api(crop, state)
-                    response_data = self._canonicalize_price_data(
-                        crop,
-                        state,
-                        requested_market,
-                        price_data,
-                        data_origin='live',
-                        default_source='data.gov.in'
-                    )
-
-                if not response_data:
-                    response_data = self._get_cached_price_data(crop, state, requested_market)
-
-                if not response_data:
-                    response_data = self._get_fallback_data(crop, state, requested_market)
-            
-            except Exception as e:
-                print(f"Error fetching price for {crop}: {e}")
-                response_data = self._get_cached_price_data(crop, state, requested_market)
-                if not response_data:
-                    response_data = self._get_fallback_data(crop, state, requested_market)
+            # Cached already encoded, so a revalidation with a matching ETag serializes nothing
+            cache_key = (crop.strip().lower(), state.strip().lower(), requested_market.strip().lower())
+            encoded = self.price_cache.get_or_load(
+                cache_key,
+                lambda: encode_response(self._resolve_realprice(crop, state, requested_market)),
+                ttl_for=lambda entry: REALPRICE_CACHE_TTLS.get(entry.payload.get('data_origin'), REALPRICE_CACHE_TTLS['estimate'])
+            )
+            response_data = encoded.payload
         
         # Bulk prices endpoint: /api/prices/bulk
         elif path == '/api/prices/bulk':
             crops_param = query.get('crops', [''])[0]
             crops = crops_param.split(',') if crops_param else ['wheat', 'rice', 'cotton']
             state = query.get('state', ['Maharashtra'])[0]
+            requested_deadline = safe_float(query.get('deadline', [BULK_DEADLINE_SECONDS])[0], BULK_DEADLINE_SECONDS)
+            deadline = max(1.0, min(requested_deadline, BULK_DEADLINE_SECONDS))
             
             try:
                 if MULTI_SOURCE_AVAILABLE:
                     scraper = self.get_scraper()
-                    bulk_data = scraper.get_bulk_prices(crops, state)
+                    bulk_data = scraper.get_bulk_prices(crops, state, deadline_seconds=deadline)
+                    data_origins = {'live': [], 'cached': [], 'estimate': []}
+                    for crop_name, crop_data in bulk_data.items():
+                        data_origins.setdefault(crop_data.get('data_origin', 'estimate'), []).append(crop_name)
                     response_data = {
                         'success': True,
                         'crops': bulk_data,
                         'count': len(bulk_data),
+                        'data_origins': data_origins,
                         'timestamp': datetime.now().isoformat()
                     }
                 else:
@@ -569,6 +470,39 @@ class handler(BaseHTTPRequestHandler):
             except Exception as e:
                 response_data = {'success': False, 'error': str(e)}
         
+        # Batch forecasts: /api/predict/bulk?crops=onion,tomato
+        elif path == '/api/predict/bulk':
+            crops_param = query.get('crops', [''])[0]
+            crops = [crop.strip() for crop in crops_param.split(',') if crop.strip()]
+            requested_market = query.get('market', [''])[0]
+            predictions = load_predictions()
+
+            found = {}
+            missing = []
+            for crop in crops:
+                payload = self._get_prediction(crop, requested_market, predictions).payload
+                if payload.get('success'):
+                    found[crop] = payload
+                else:
+                    missing.append(crop)
+            response_data = {
+                'success': True,
+                'predictions': found,
+                'count': len(found),
+                'missing': missing,
+                'data_origin': 'cached',
+                'predictions_version': predictions.get(VERSION_KEY)
+            }
+
+        # Precomputed forecast: /api/predict/<crop>?market=
+        elif path.startswith('/api/predict/'):
+            crop = path.split('/api/predict/')[-1]
+            requested_market = query.get('market', [''])[0]
+            encoded = self._get_prediction(crop, requested_market, load_predictions())
+            response_data = encoded.payload
+            if not response_data.get('success'):
+                status_code = 404
+
         # Legacy endpoint support: /api/live-price/<crop>
         elif path.startswith('/api/live-price/'):
             crop = path.split('/api/live-price/')[-1]
@@ -603,6 +537,8 @@ class handler(BaseHTTPRequestHandler):
                     '/api/realprice/<crop>': 'Multi-source price with fallback (recommended)',
                     '/api/prices/bulk?crops=wheat,rice,cotton': 'Fetch multiple crops',
                     '/api/prices/markets/<crop>': 'Get available markets for crop',
+                    '/api/predict/<crop>?market=': 'Precomputed next-week forecast',
+                    '/api/predict/bulk?crops=onion,tomato': 'Forecasts for multiple crops',
                     '/api/live-price/<crop>': 'Legacy endpoint (deprecated)'
                 },
                 'supported_states': ['Maharashtra', 'Karnataka', 'Gujarat', 'Madhya Pradesh'],
@@ -610,50 +546,70 @@ class handler(BaseHTTPRequestHandler):
             }
         
         # Determine status code
-        status_code = 200
-        if not response_data.get('success', True) and 'error' in response_data:
-            status_code = 500
+        if status_code is None:
+            status_code = 200
+            if not response_data.get('success', True) and 'error' in response_data:
+                status_code = 500
+        
+        if encoded is None:
+            encoded = encode_response(response_data)
+        
+        # Freshness follows the data origin; health is always revalidated
+        cache_control = NO_CACHE if path == '/api/health' else cache_control_for(response_data)
+        
+        # gzip/brotli when the client accepts it; the ETag is known before compressing
+        content_encoding, etag = select_representation(encoded.body, self.headers.get('Accept-Encoding'), encoded.etag)
+        
+        # Unchanged since the client's copy: headers only, nothing compressed
+        if status_code == 200 and etag_matches(self.headers.get('If-None-Match'), etag):
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', cache_control)
+            self.send_header('Vary', 'Accept-Encoding')
+            self.send_header('Access-Control-Allow-Origin', '*')
+            self.end_headers()
+            return
+        
+        body = encode_body(encoded.body, content_encoding, encoded.etag)
             
         # CORS headers
         self.send_response(status_code)
         self.send_header('Content-type', 'application/json')
         self.send_header('Access-Control-Allow-Origin', '*')
         self.send_header('Access-Control-Allow-Methods', 'GET, OPTIONS')
-        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
-        self.send_header('Cache-Control', 'public, max-age=1800')  # 30 min cache
+        self.send_header('Access-Control-Allow-Headers', 'Content-Type, If-None-Match')
+        self.send_header('Access-Control-Expose-Headers', 'ETag')
+        self.send_header('Cache-Control', cache_control)
+        self.send_header('Vary', 'Accept-Encoding')
+        if content_encoding:
+            self.send_header('Content-Encoding', content_encoding)
+        self.send_header('Content-Length', str(len(body)))
+        if status_code == 200:
+            self.send_header('ETag', etag)
         self.end_headers()
         
         # Send response
-        self.wfile.write(json.dumps(response_data).encode())
+        self.wfile.write(body)
     
+    def _get_prediction(self, crop: str, requested_market: str, predictions: Dict):
+        """Encoded /api/predict payload, cached per predictions.json version"""
+        version = predictions.get(VERSION_KEY)
+        cache_key = (crop.strip().lower(), requested_market.strip().lower(), version)
+        return self.predict_cache.get_or_load(
+            cache_key,
+            lambda: encode_response(
+                find_prediction(predictions, crop, requested_market)
+                or {'success': False, 'crop': crop, 'error': f'No forecast available for {crop}'}
+            )
+        )
+
     def _calculate_change(self, historical_prices: List[float]) -> str:
         """Calculate price change percentage"""
-        if len(historical_prices) < 2:
-            return "+0.0%"
-        current = historical_prices[-1]
-        previous = historical_prices[-2]
-        change = ((current - previous) / previous) * 100
-        return f"{'+' if change >= 0 else ''}{change:.1f}%"
+        return calculate_change(historical_prices)
     
     def _get_source_badge(self, price_data: Dict) -> str:
         """Get display badge for data source"""
-        if price_data.get('is_estimate'):
-            return '⚪ MSP/Estimate'
-
-        if price_data.get('data_origin') == 'cached':
-            return '🔵 Cached Real Data'
-        
-        confidence = price_data.get('confidence', 0)
-        source = price_data.get('source', price_data.get('data_source', '')).lower()
-        
-        if 'data.gov' in source or confidence >= 90:
-            return '🟢 LIVE Data'
-        elif confidence >= 70:
-            return '🔵 Recent Data'
-        elif confidence >= 50:
-            return '🟡 Cached Data'
-        else:
-            return '⚪ Estimated'
+        return get_source_badge(price_data)
     
     def _get_fallback_data(self, crop: str, state: str, requested_market: str = '') -> Dict:
         """Generate basic fallback data when all sources fail"""
@@ -693,15 +649,17 @@ class handler(BaseHTTPRequestHandler):
         self.send_response(200)
         self.send_header('Access-Control-Allow-Origin', '*')
         self.send_header('Access-Control-Allow-Methods', 'GET, OPTIONS')
-        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+        self.send_header('Access-Control-Allow-Headers', 'Content-Type, If-None-Match')
+        self.send_header('Content-Length', '0')
         self.end_headers()
 
 if __name__ == '__main__':
-    from http.server import HTTPServer
+    import logging
+    from local_server import LOCAL_SERVER_WORKERS, serve_local
+    
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
     
     port = int(os.environ.get('PORT', 5000))
-    server_address = ('', port)
-    httpd = HTTPServer(server_address, handler)
     
     print(f"""
     ╔══════════════════════════════════════════════════════════╗
@@ -717,10 +675,6 @@ if __name__ == '__main__':
     ║  Press Ctrl+C to stop the server                        ║
     ╚══════════════════════════════════════════════════════════╝
     """)
-    print(f"🚀 Starting server on http://localhost:{port}")
+    print(f"🚀 Starting server on http://localhost:{port} ({LOCAL_SERVER_WORKERS} workers)")
     
-    try:
-        httpd.serve_forever()
-    except KeyboardInterrupt:
-        print("\n🛑 Server stopped by user")
-        httpd.server_close()
+    serve_local(handler, port=port)
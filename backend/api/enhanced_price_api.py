@@ -16,7 +16,10 @@ import os
 import sys
 import os
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'python'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
+from database import read_price_entry, read_prices
+from http_caching import add_cache_validators
 from dynamic_price_updater import DynamicPriceScraper
 try:
     from enhanced_agmarknet_scraper import EnhancedAGMARKNETScraper
@@ -26,7 +29,13 @@ except ImportError:
 
 # Initialize Flask app
 app = Flask(__name__)
-CORS(app)  # Enable CORS for all routes
+CORS(app, expose_headers=['ETag'])  # Enable CORS for all routes
+
+
+@app.after_request
+def add_caching_headers(response):
+    """Strong ETag and conditional 304 for unchanged GET responses"""
+    return add_cache_validators(response, request)
 
 # Setup logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -100,10 +109,9 @@ def update_prices():
 def get_prices():
     """Get current price data"""
     try:
-        if os.path.exists('prices.json'):
-            with open('prices.json', 'r') as f:
-                data = f.read()
-                return data, 200, {'Content-Type': 'application/json'}
+        data = read_prices(json_paths=('prices.json',))
+        if data is not None:
+            return jsonify(data)
         else:
             return jsonify({
                 'error': 'Price data not found'
@@ -119,13 +127,9 @@ def get_prices():
 def get_status():
     """Get API and scraper status"""
     try:
-        # Check if prices.json exists and get last update time
-        last_updated = None
-        if os.path.exists('prices.json'):
-            import json
-            with open('prices.json', 'r') as f:
-                data = json.load(f)
-                last_updated = data.get('lastUpdated')
+        # Last update time from the price snapshot (prices.json if the database is empty)
+        _, _, meta = read_price_entry([], json_paths=('prices.json',))
+        last_updated = meta.get('lastUpdated')
         
         return jsonify({
             'status': 'running',
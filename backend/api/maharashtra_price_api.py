@@ -15,6 +15,9 @@ import logging
 # Add backend path
 backend_path = os.path.join(os.path.dirname(__file__), '..', 'backend', 'python')
 sys.path.insert(0, backend_path)
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'python'))
+
+from http_caching import add_cache_validators
 
 try:
     from agmarknet_scraper import AgMarkNetScraper
@@ -24,7 +27,13 @@ except ImportError:
     SCRAPER_AVAILABLE = False
 
 app = Flask(__name__)
-CORS(app)
+CORS(app, expose_headers=['ETag'])
+
+
+@app.after_request
+def add_caching_headers(response):
+    """Strong ETag and conditional 304 for unchanged GET responses"""
+    return add_cache_validators(response, request)
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
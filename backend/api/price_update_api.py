@@ -8,13 +8,26 @@ from flask import Flask, jsonify, request
 from flask_cors import CORS
 import json
 import os
+import sys
 import threading
 import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'python'))
+
+from database import read_price_entry, read_prices
+from http_caching import add_cache_validators
 from dynamic_price_updater import DynamicPriceScraper
 import logging
 
 app = Flask(__name__)
-CORS(app)
+CORS(app, expose_headers=['ETag'])
+
+
+@app.after_request
+def add_caching_headers(response):
+    """Strong ETag and conditional 304 for unchanged GET responses"""
+    return add_cache_validators(response, request)
 
 # Global scraper instance
 scraper = DynamicPriceScraper()
@@ -93,9 +106,8 @@ def start_auto_update():
 def get_prices():
     """Get current price data"""
     try:
-        if os.path.exists('prices.json'):
-            with open('prices.json', 'r', encoding='utf-8') as f:
-                data = json.load(f)
+        data = read_prices(json_paths=('prices.json',))
+        if data is not None:
             return jsonify(data)
         else:
             return jsonify({
@@ -123,12 +135,10 @@ def get_status():
     })
 
 def get_last_updated_time():
-    """Get last updated timestamp from prices.json"""
+    """Get last updated timestamp from the price snapshot (prices.json if the database is empty)"""
     try:
-        if os.path.exists('prices.json'):
-            with open('prices.json', 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            return data.get('lastUpdated', 'Unknown')
+        _, _, meta = read_price_entry([], json_paths=('prices.json',))
+        return meta.get('lastUpdated', 'Unknown')
     except:
         pass
     return 'Unknown'
@@ -16,10 +16,14 @@ import json
 import os
 import sys
 from datetime import datetime
-import requests
 
 # Add parent directory to path for imports
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'python'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from http_caching import add_cache_validators
+from http_client import http_get
+from database import SNAPSHOT_META_KEYS, read_price_entry, read_prices
 
 # Try to import the real scraper
 try:
@@ -36,7 +40,13 @@ DATA_GOV_IN_API_KEY = os.environ.get(
 )
 
 app = Flask(__name__)
-CORS(app)  # Enable CORS for all routes
+CORS(app, expose_headers=['ETag'])  # Enable CORS for all routes
+
+
+@app.after_request
+def add_caching_headers(response):
+    """Strong ETag and conditional 304 for unchanged GET responses"""
+    return add_cache_validators(response, request)
 
 # Get the correct path to prices.json
 BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -44,16 +54,10 @@ PRICES_FILE = os.path.join(os.path.dirname(BACKEND_DIR), 'prices.json')
 DATA_PRICES_FILE = os.path.join(os.path.dirname(os.path.dirname(BACKEND_DIR)), 'data', 'json', 'prices.json')
 
 def get_prices_data():
-    """Load price data from available sources"""
-    # Try backend/prices.json first
-    if os.path.exists(PRICES_FILE):
-        with open(PRICES_FILE, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    
-    # Try data/json/prices.json
-    elif os.path.exists(DATA_PRICES_FILE):
-        with open(DATA_PRICES_FILE, 'r', encoding='utf-8') as f:
-            return json.load(f)
+    """Load price data: backend/prices.json, then data/json/prices.json (each from its SQLite copy while current)"""
+    data = read_prices(json_paths=(PRICES_FILE, DATA_PRICES_FILE))
+    if data is not None:
+        return data
     
     # Return empty data if no file found
     return {
@@ -62,6 +66,12 @@ def get_prices_data():
         'error': 'Price data file not found'
     }
 
+
+def get_available_crops():
+    """Crop keys present in the price snapshot"""
+    keys = list(get_prices_data().keys())
+    return [key for key in keys if key not in SNAPSHOT_META_KEYS and key != 'error']
+
 @app.route('/api/prices', methods=['GET'])
 def get_all_prices():
     """Get all crop prices"""
@@ -78,13 +88,13 @@ def get_all_prices():
 def get_crop_price(crop: str):
     """Get price for a specific crop"""
     try:
-        data = get_prices_data()
-        
         # Normalize crop name
         crop_lower = crop.lower()
         
-        if crop_lower in data:
-            crop_data = data[crop_lower]
+        # Point lookup instead of loading every crop
+        _, crop_data, data = read_price_entry([crop_lower], json_paths=(PRICES_FILE, DATA_PRICES_FILE))
+        
+        if crop_data is not None:
             if isinstance(crop_data, dict):
                 price_list = crop_data.get('data', [])
                 current_price = price_list[-1] if price_list else None
@@ -112,7 +122,7 @@ def get_crop_price(crop: str):
         else:
             return jsonify({
                 'error': f'Price data not available for {crop}',
-                'availableCrops': [k for k in data.keys() if k != 'lastUpdated' and k != 'source']
+                'availableCrops': get_available_crops()
             }), 404
             
     except Exception as e:
@@ -225,7 +235,7 @@ def real_price_proxy(crop: str):
 
     def fetch(params: dict[str, str]):
         try:
-            r = requests.get(base_url, params=params, timeout=10)
+            r = http_get(base_url, params=params, timeout=10)
             return r.status_code, r.json() if r.headers.get('Content-Type','').startswith('application/json') else {'error':'Non-JSON response', 'raw': r.text}
         except Exception as e:
             return 599, {'error': str(e)}
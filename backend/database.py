@@ -1,55 +1,284 @@
 import sqlite3
 import os
 import json
-from datetime import datetime
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
 
 # Path to the SQLite database
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 DATA_DIR = os.path.join(BASE_DIR, 'data')
-DB_PATH = os.path.join(DATA_DIR, 'farm_database.db')
+DB_PATH = os.environ.get('SMARTSHETI_DB_PATH', os.path.join(DATA_DIR, 'farm_database.db'))
 
-def get_connection():
-    """Returns a connection to the SQLite database."""
-    # Ensure data directory exists
-    os.makedirs(DATA_DIR, exist_ok=True)
-    conn = sqlite3.connect(DB_PATH)
+# Applied to every new connection. WAL lets readers run alongside a writer and,
+# with synchronous=NORMAL, commits no longer fsync on every transaction.
+CONNECTION_PRAGMAS = (
+    ('journal_mode', 'WAL'),
+    ('synchronous', 'NORMAL'),
+    ('cache_size', -16000),        # ~16 MB page cache (negative = KiB)
+    ('mmap_size', 134217728),      # 128 MB memory-mapped reads
+    ('temp_store', 'MEMORY'),
+    ('foreign_keys', 'ON'),
+    ('busy_timeout', 5000),        # ms to wait on a locked database
+)
+
+# After the database fails to open (e.g. a read-only deployment without it),
+# callers get an immediate error for this long instead of a retry per request
+DB_RETRY_SECONDS = float(os.environ.get('SMARTSHETI_DB_RETRY_SECONDS', '60'))
+
+# Market used for crop-level series that are not tied to one mandi
+ALL_MARKETS = 'All Markets'
+
+# Key of the commodity-wide series in per-market results; no real market
+# can be named this (PriceObservation.from_record rejects it)
+CROP_WIDE = '*'
+
+# Top-level prices.json keys that describe the snapshot rather than a crop
+SNAPSHOT_META_KEYS = ('lastUpdated', 'source', 'api_version', 'snapshot_version')
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+
+# db_path -> time.monotonic() before which opening it is not retried
+_unavailable_until: Dict[str, float] = {}
+
+
+def _open_connection(db_path):
+    try:
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+    except OSError as e:
+        raise sqlite3.OperationalError(f'cannot create database directory: {e}') from e
+    # Autocommit mode: transactions are opened explicitly by transaction()
+    conn = sqlite3.connect(db_path, isolation_level=None, check_same_thread=False)
     conn.row_factory = sqlite3.Row
+    for name, value in CONNECTION_PRAGMAS:
+        try:
+            conn.execute(f'PRAGMA {name} = {value}')
+        except sqlite3.OperationalError:
+            # journal_mode=WAL fails on a read-only filesystem; reads still work
+            continue
+    try:
+        conn.execute('SELECT 1 FROM sqlite_master LIMIT 1')
+    except sqlite3.Error:
+        conn.close()
+        raise
     return conn
 
+
+def get_connection():
+    """
+    Returns this thread's connection to the SQLite database (opened once, then reused).
+
+    A database that failed to open raises sqlite3.OperationalError without
+    another attempt for DB_RETRY_SECONDS.
+    """
+    conn = getattr(_local, 'conn', None)
+    if conn is None or getattr(_local, 'db_path', None) != DB_PATH:
+        if conn is not None:
+            conn.close()
+            _local.conn = None
+        if time.monotonic() < _unavailable_until.get(DB_PATH, 0):
+            raise sqlite3.OperationalError(f'database unavailable: {DB_PATH}')
+        try:
+            conn = _open_connection(DB_PATH)
+        except sqlite3.Error:
+            _unavailable_until[DB_PATH] = time.monotonic() + DB_RETRY_SECONDS
+            raise
+        _unavailable_until.pop(DB_PATH, None)
+        _local.conn = conn
+        _local.db_path = DB_PATH
+        _local.depth = 0
+    return conn
+
+
+def close_connection():
+    """Closes this thread's connection, if any."""
+    conn = getattr(_local, 'conn', None)
+    if conn is not None:
+        conn.close()
+    _local.conn = None
+    _local.depth = 0
+
+
+@contextmanager
+def transaction():
+    """
+    Runs the block in a single write transaction on this thread's connection.
+
+    Commits on success and rolls back on error. Nested uses join the
+    outermost transaction, so bulk helpers can be combined freely.
+    """
+    conn = get_connection()
+    if _local.depth:
+        _local.depth += 1
+        try:
+            yield conn
+        finally:
+            _local.depth -= 1
+        return
+
+    conn.execute('BEGIN IMMEDIATE')
+    _local.depth = 1
+    try:
+        yield conn
+    except BaseException:
+        conn.execute('ROLLBACK')
+        raise
+    else:
+        conn.execute('COMMIT')
+    finally:
+        _local.depth = 0
+
+
+MARKET_PRICES_INDEX_SQL = '''
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_market_prices_crop_market
+    ON market_prices (crop_id, market_name)
+'''
+
+
 def init_db():
     """Initializes the database schema."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    
-    # Create valid tables matching our models
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS crop_prices (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            crop_name TEXT NOT NULL UNIQUE,
-            state TEXT,
-            unit TEXT,
-            current_price REAL,
-            source TEXT,
-            color TEXT,
-            last_updated TEXT,
-            historical_labels TEXT, -- stored as JSON string
-            historical_data TEXT    -- stored as JSON string
-        )
-    ''')
-
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS market_prices (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            crop_id INTEGER NOT NULL,
-            market_name TEXT NOT NULL,
-            district TEXT,
-            price REAL,
-            FOREIGN KEY (crop_id) REFERENCES crop_prices(id) ON DELETE CASCADE
-        )
-    ''')
+    with transaction() as conn:
+        cursor = conn.cursor()
+
+        # Create valid tables matching our models
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS crop_prices (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                crop_name TEXT NOT NULL UNIQUE,
+                state TEXT,
+                unit TEXT,
+                current_price REAL,
+                source TEXT,
+                color TEXT,
+                last_updated TEXT,
+                historical_labels TEXT, -- stored as JSON string
+                historical_data TEXT    -- stored as JSON string
+            )
+        ''')
+
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS market_prices (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                crop_id INTEGER NOT NULL,
+                market_name TEXT NOT NULL,
+                district TEXT,
+                price REAL,
+                FOREIGN KEY (crop_id) REFERENCES crop_prices(id) ON DELETE CASCADE
+            )
+        ''')
+
+        # One row per crop/market so market prices can be upserted in bulk. Existing
+        # duplicates are never deleted here; the migration script dedupes them.
+        has_market_index = cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_market_prices_crop_market'"
+        ).fetchone()
+        if not has_market_index:
+            duplicates = cursor.execute('''
+                SELECT COUNT(*) - (SELECT COUNT(*) FROM (SELECT DISTINCT crop_id, market_name FROM market_prices))
+                FROM market_prices
+            ''').fetchone()[0]
+            if duplicates:
+                logger.warning(
+                    f"⚠️ market_prices has {duplicates} duplicate crop/market rows; "
+                    "run scripts/python/migrate_json_to_sqlite.py to dedupe them"
+                )
+            else:
+                cursor.execute(MARKET_PRICES_INDEX_SQL)
+
+        # Normalized price schema: one fact row per commodity/market/day
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS commodities (
+                id INTEGER PRIMARY KEY,
+                name TEXT NOT NULL UNIQUE
+            )
+        ''')
+
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS markets (
+                id INTEGER PRIMARY KEY,
+                name TEXT NOT NULL,
+                district TEXT NOT NULL DEFAULT '',
+                state TEXT NOT NULL DEFAULT '',
+                UNIQUE (name, district, state)
+            )
+        ''')
+
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS price_observations (
+                commodity_id INTEGER NOT NULL REFERENCES commodities(id),
+                market_id INTEGER NOT NULL REFERENCES markets(id),
+                obs_date TEXT NOT NULL,     -- ISO date
+                min_price REAL,             -- ₹/kg
+                max_price REAL,             -- ₹/kg
+                modal_price REAL NOT NULL,  -- ₹/kg
+                source TEXT,
+                arrivals REAL,              -- as reported by the source, if at all
+                PRIMARY KEY (commodity_id, market_id, obs_date)
+            ) WITHOUT ROWID
+        ''')
+        observation_columns = {row['name'] for row in cursor.execute('PRAGMA table_info(price_observations)')}
+        if 'arrivals' not in observation_columns:
+            cursor.execute('ALTER TABLE price_observations ADD COLUMN arrivals REAL')
+
+        # Covers date-range and per-day scans for a commodity (series, top markets)
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_observations_commodity_date
+            ON price_observations (commodity_id, obs_date, market_id, modal_price, min_price, max_price)
+        ''')
+
+        # prices.json entries, one row per file and top-level key, for point lookups by
+        # crop. A table from before files were told apart only copies an export and is
+        # rebuilt by the next publish.
+        snapshot_columns = {row['name'] for row in cursor.execute('PRAGMA table_info(price_snapshots)')}
+        if snapshot_columns and 'source' not in snapshot_columns:
+            logger.info("🔄 Recreating price_snapshots keyed by source file")
+            cursor.execute('DROP TABLE price_snapshots')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS price_snapshots (
+                source TEXT NOT NULL,   -- snapshot_source() of the prices.json file
+                key TEXT NOT NULL,
+                payload TEXT NOT NULL,  -- JSON value of prices.json[key]
+                updated_at TEXT NOT NULL,
+                PRIMARY KEY (source, key)
+            ) WITHOUT ROWID
+        ''')
+
+        # The file each snapshot was published from, as it was right after publishing,
+        # so readers can tell whether the file changed since without parsing it
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS price_snapshot_files (
+                source TEXT PRIMARY KEY,
+                version INTEGER NOT NULL,
+                mtime_ns INTEGER,
+                size INTEGER,
+                updated_at TEXT NOT NULL
+            )
+        ''')
+
+        # Weekly (Monday-start) and monthly aggregates, refreshed as observations land.
+        # market_id 0 holds the commodity-wide rollup across markets.
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS price_rollups (
+                commodity_id INTEGER NOT NULL REFERENCES commodities(id),
+                market_id INTEGER NOT NULL,
+                period TEXT NOT NULL,           -- 'week' or 'month'
+                period_start TEXT NOT NULL,     -- ISO date
+                days INTEGER NOT NULL,          -- days with observations
+                min_price REAL,
+                max_price REAL,
+                mean_price REAL,                -- mean of daily modal prices
+                modal_price REAL,               -- modal price on the last observed day
+                arrivals REAL,
+                PRIMARY KEY (commodity_id, market_id, period, period_start)
+            ) WITHOUT ROWID
+        ''')
 
-    conn.commit()
-    conn.close()
 
 class CropPrice:
     """A model-like wrapper for the crop_prices table."""
@@ -65,44 +294,618 @@ class CropPrice:
         self.historical_labels = historical_labels
         self.historical_data = historical_data
 
+    _UPSERT_SQL = '''
+        INSERT INTO crop_prices
+        (crop_name, state, unit, current_price, source, color, last_updated, historical_labels, historical_data)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (crop_name) DO UPDATE SET
+            state = excluded.state,
+            unit = excluded.unit,
+            current_price = excluded.current_price,
+            source = excluded.source,
+            color = excluded.color,
+            last_updated = excluded.last_updated,
+            historical_labels = excluded.historical_labels,
+            historical_data = excluded.historical_data
+    '''
+
+    def _as_row(self):
+        labels_json = json.dumps(self.historical_labels) if self.historical_labels else '[]'
+        data_json = json.dumps(self.historical_data) if self.historical_data else '[]'
+        return (
+            self.crop_name, self.state, self.unit, self.current_price,
+            self.source, self.color, self.last_updated, labels_json, data_json
+        )
+
     @classmethod
     def save(cls, crop):
-        conn = get_connection()
-        cursor = conn.cursor()
-        
-        labels_json = json.dumps(crop.historical_labels) if crop.historical_labels else '[]'
-        data_json = json.dumps(crop.historical_data) if crop.historical_data else '[]'
-        
-        cursor.execute('''
-            INSERT OR REPLACE INTO crop_prices 
-            (crop_name, state, unit, current_price, source, color, last_updated, historical_labels, historical_data)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            crop.crop_name, crop.state, crop.unit, crop.current_price, 
-            crop.source, crop.color, crop.last_updated, labels_json, data_json
-        ))
-        
-        crop.id = cursor.lastrowid
-        conn.commit()
-        conn.close()
-        return crop.id
+        return cls.bulk_upsert([crop])[crop.crop_name]
+
+    @classmethod
+    def bulk_upsert(cls, crops):
+        """Inserts or updates many crops in one transaction; returns {crop_name: id}."""
+        crops = list(crops)
+        if not crops:
+            return {}
+
+        with transaction() as conn:
+            # Upserting in place keeps ids stable, so market rows stay attached
+            conn.executemany(cls._UPSERT_SQL, [crop._as_row() for crop in crops])
+            names = [crop.crop_name for crop in crops]
+            placeholders = ','.join('?' * len(names))
+            ids = {
+                row['crop_name']: row['id']
+                for row in conn.execute(f'SELECT id, crop_name FROM crop_prices WHERE crop_name IN ({placeholders})', names)
+            }
+
+        for crop in crops:
+            crop.id = ids.get(crop.crop_name)
+        return ids
+
 
 class MarketPrice:
     """A model-like wrapper for the market_prices table."""
+
+    _UPSERT_SQL = '''
+        INSERT INTO market_prices (crop_id, market_name, district, price)
+        VALUES (?, ?, ?, ?)
+        ON CONFLICT (crop_id, market_name) DO UPDATE SET
+            district = excluded.district,
+            price = excluded.price
+    '''
+
     @staticmethod
     def save(crop_id, market_name, district, price):
+        with transaction() as conn:
+            conn.execute(MarketPrice._UPSERT_SQL, (crop_id, market_name, district, price))
+            row = conn.execute(
+                'SELECT id FROM market_prices WHERE crop_id = ? AND market_name = ?',
+                (crop_id, market_name)
+            ).fetchone()
+        return row['id']
+
+    @staticmethod
+    def bulk_upsert(rows):
+        """Inserts or updates (crop_id, market_name, district, price) rows in one transaction."""
+        rows = list(rows)
+        if not rows:
+            return 0
+
+        with transaction() as conn:
+            conn.executemany(MarketPrice._UPSERT_SQL, rows)
+        return len(rows)
+
+
+def snapshot_source(path) -> str:
+    """Key of a prices.json file in price_snapshots: its repo-relative path ('data/json/prices.json')"""
+    path = os.path.abspath(path)
+    relative = os.path.relpath(path, BASE_DIR)
+    return path if relative.startswith('..') else relative.replace(os.sep, '/')
+
+
+def file_signature(path) -> Optional[Tuple[int, int]]:
+    """(mtime_ns, size) of a file, or None when it does not exist"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class PriceSnapshot:
+    """The content of each published prices.json file, stored key by key in price_snapshots."""
+
+    _UPSERT_SQL = '''
+        INSERT INTO price_snapshots (source, key, payload, updated_at)
+        VALUES (?, ?, ?, ?)
+        ON CONFLICT (source, key) DO UPDATE SET
+            payload = excluded.payload,
+            updated_at = excluded.updated_at
+    '''
+
+    @staticmethod
+    def replace(source, data, signature=None):
+        """
+        Makes the snapshot of one file exactly data (a prices.json-shaped dict) in one transaction.
+
+        Keys missing from data are deleted; other files' snapshots are left
+        alone. signature is the file's (mtime_ns, size) right after it was
+        written. Writers should go through snapshot_writer.publish_prices,
+        which keeps the file in step.
+        """
+        mtime_ns, size = signature or (None, None)
+        with transaction() as conn:
+            keys = list(data)
+            placeholders = ','.join('?' * len(keys))
+            conn.execute(
+                f'DELETE FROM price_snapshots WHERE source = ? AND key NOT IN ({placeholders})' if keys
+                else 'DELETE FROM price_snapshots WHERE source = ?',
+                [source, *keys]
+            )
+            conn.execute('''
+                INSERT INTO price_snapshot_files (source, version, mtime_ns, size, updated_at)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (source) DO UPDATE SET
+                    version = excluded.version,
+                    mtime_ns = excluded.mtime_ns,
+                    size = excluded.size,
+                    updated_at = excluded.updated_at
+            ''', (source, _snapshot_version(data), mtime_ns, size, datetime.now().isoformat()))
+            return PriceSnapshot.upsert(source, data)
+
+    @staticmethod
+    def upsert(source, entries):
+        """Writes {key: value} pairs (crop entries and metadata) of one file in one transaction."""
+        updated_at = datetime.now().isoformat()
+        rows = [(source, key, json.dumps(value, ensure_ascii=False), updated_at) for key, value in entries.items()]
+        if not rows:
+            return 0
+        with transaction() as conn:
+            conn.executemany(PriceSnapshot._UPSERT_SQL, rows)
+        return len(rows)
+
+    @staticmethod
+    def get_many(source, keys):
+        """Returns {key: value} for the keys that exist."""
+        keys = list(keys)
+        if not keys:
+            return {}
+        placeholders = ','.join('?' * len(keys))
+        rows = get_connection().execute(
+            f'SELECT key, payload FROM price_snapshots WHERE source = ? AND key IN ({placeholders})', [source, *keys]
+        )
+        return {row['key']: json.loads(row['payload']) for row in rows}
+
+    @staticmethod
+    def keys(source):
+        return [
+            row['key']
+            for row in get_connection().execute('SELECT key FROM price_snapshots WHERE source = ? ORDER BY key', (source,))
+        ]
+
+    @staticmethod
+    def export(source):
+        """Returns one file's snapshot as a prices.json-shaped dict."""
+        rows = get_connection().execute('SELECT key, payload FROM price_snapshots WHERE source = ?', (source,))
+        return {row['key']: json.loads(row['payload']) for row in rows}
+
+    @staticmethod
+    def published(source):
+        """The price_snapshot_files row of a file (version, mtime_ns, size), or None if never published."""
+        return get_connection().execute(
+            'SELECT version, mtime_ns, size FROM price_snapshot_files WHERE source = ?', (source,)
+        ).fetchone()
+
+
+# path -> ((mtime_ns, size), parsed content), so a fallback file is parsed once per change
+_json_cache: Dict[str, Tuple[Tuple[int, int], Dict]] = {}
+_json_cache_lock = threading.Lock()
+
+
+def _load_json_file(path):
+    """A JSON export, parsed once per file change; None when it does not exist"""
+    signature = file_signature(path)
+    if signature is None:
+        return None
+    with _json_cache_lock:
+        cached = _json_cache.get(path)
+    if cached and cached[0] == signature:
+        return cached[1]
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    with _json_cache_lock:
+        _json_cache[path] = (signature, data)
+    return data
+
+
+def _snapshot_version(data) -> int:
+    try:
+        return int((data or {}).get('snapshot_version') or 0)
+    except (TypeError, ValueError, AttributeError):
+        return 0
+
+
+def _serve_from_database(path) -> Optional[bool]:
+    """
+    Whether a file's SQLite snapshot is current (True), the file itself is
+    newer (False), or neither exists (None).
+
+    Decided from the file's stat and the signature stored when it was
+    published, so the file is only parsed when it is actually served.
+    """
+    signature = file_signature(path)
+    try:
+        published = PriceSnapshot.published(snapshot_source(path))
+    except sqlite3.Error:
+        published = None
+    if published is None:
+        return False if signature is not None else None
+    if signature is None or signature == (published['mtime_ns'], published['size']):
+        return True
+    # Changed since it was published (e.g. by a writer that could not reach the
+    # database) unless it is older than that, as after restoring a backup
+    return signature[0] < (published['mtime_ns'] or 0)
+
+
+def read_prices(json_paths=()) -> Optional[Dict]:
+    """
+    The full price snapshot of the first of json_paths that has one.
+
+    Each file is served from its SQLite copy unless the file changed
+    after it was published (e.g. a consolidate_prices.py run that could
+    not update the database), in which case the file itself is read.
+    """
+    for path in json_paths:
+        if not path:
+            continue
+        from_database = _serve_from_database(path)
+        if from_database:
+            try:
+                return PriceSnapshot.export(snapshot_source(path))
+            except sqlite3.Error:
+                pass
+        if from_database is not None:
+            data = _load_json_file(path)
+            if data is not None:
+                return data
+    return None
+
+
+def read_price_entry(keys, json_paths=()) -> Tuple[Optional[str], Optional[Dict], Dict]:
+    """
+    Point lookup of the first matching crop key.
+
+    Returns (key, entry, metadata) from the first of json_paths that has
+    a snapshot, chosen under the same rules as read_prices().
+    """
+    keys = list(keys)
+    for path in json_paths:
+        if not path:
+            continue
+        from_database = _serve_from_database(path)
+        if from_database:
+            try:
+                data = PriceSnapshot.get_many(snapshot_source(path), keys + list(SNAPSHOT_META_KEYS))
+            except sqlite3.Error:
+                data = None
+        else:
+            data = None
+        if data is None and from_database is not None:
+            data = _load_json_file(path)
+        if data is None:
+            continue
+
+        meta = {key: data[key] for key in SNAPSHOT_META_KEYS if key in data}
+        for key in keys:
+            if isinstance(data.get(key), dict):
+                return key, data[key], meta
+        return None, None, meta
+    return None, None, {}
+
+
+def _price_per_kg(price, unit):
+    unit = (unit or '').lower()
+    if 'quintal' in unit:
+        return price / 100
+    if 'ton' in unit:
+        return price / 1000
+    return price
+
+
+@dataclass
+class PriceObservation:
+    """One day's price for a commodity at a market (prices in ₹/kg)."""
+    commodity: str
+    market: str
+    obs_date: str
+    modal_price: float
+    min_price: Optional[float] = None
+    max_price: Optional[float] = None
+    district: str = ''
+    state: str = ''
+    source: Optional[str] = None
+    arrivals: Optional[float] = None
+
+    _UPSERT_SQL = '''
+        INSERT INTO price_observations
+        (commodity_id, market_id, obs_date, min_price, max_price, modal_price, source, arrivals)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (commodity_id, market_id, obs_date) DO UPDATE SET
+            min_price = excluded.min_price,
+            max_price = excluded.max_price,
+            modal_price = excluded.modal_price,
+            source = excluded.source,
+            arrivals = excluded.arrivals
+    '''
+
+    @classmethod
+    def from_record(cls, commodity, record, source=None):
+        """Builds an observation from a raw data.gov.in record (dd/mm/YYYY date, ₹/quintal prices)."""
+        try:
+            obs_date = datetime.strptime(str(record.get('arrival_date', '')).strip()[:10], '%d/%m/%Y').date().isoformat()
+            unit = record.get('unit', 'Quintal')
+            modal_price = _price_per_kg(float(str(record['modal_price']).replace(',', '')), unit)
+            min_price = _price_per_kg(float(str(record.get('min_price') or record['modal_price']).replace(',', '')), unit)
+            max_price = _price_per_kg(float(str(record.get('max_price') or record['modal_price']).replace(',', '')), unit)
+        except (KeyError, TypeError, ValueError):
+            return None
+        if modal_price <= 0 or not str(record.get('market') or '').strip() or record['market'].strip() == CROP_WIDE:
+            return None
+        try:
+            arrivals = float(record['arrivals']) if record.get('arrivals') not in (None, '') else None
+        except (TypeError, ValueError):
+            arrivals = None
+        return cls(
+            commodity=commodity,
+            market=record['market'].strip(),
+            obs_date=obs_date,
+            modal_price=round(modal_price, 2),
+            min_price=round(min_price, 2),
+            max_price=round(max_price, 2),
+            district=(record.get('district') or '').strip(),
+            state=(record.get('state') or '').strip(),
+            source=source,
+            arrivals=arrivals
+        )
+
+    @classmethod
+    def merge_varieties(cls, observations: Iterable['PriceObservation']) -> List['PriceObservation']:
+        """
+        One observation per commodity, market and date.
+
+        Upstream lists each variety of a commodity separately; their modal
+        prices are averaged, min/max widened and arrivals summed, so no
+        variety silently overwrites another.
+        """
+        groups: Dict[Tuple, List['PriceObservation']] = {}
+        for observation in observations:
+            if observation is None:
+                continue
+            key = (observation.commodity.lower(), observation.market, observation.district or '', observation.state or '', observation.obs_date)
+            groups.setdefault(key, []).append(observation)
+
+        merged = []
+        for group in groups.values():
+            first = group[0]
+            if len(group) == 1:
+                merged.append(first)
+                continue
+            arrivals = [observation.arrivals for observation in group if observation.arrivals is not None]
+            merged.append(cls(
+                commodity=first.commodity,
+                market=first.market,
+                obs_date=first.obs_date,
+                modal_price=round(sum(observation.modal_price for observation in group) / len(group), 2),
+                min_price=min(observation.min_price if observation.min_price is not None else observation.modal_price for observation in group),
+                max_price=max(observation.max_price if observation.max_price is not None else observation.modal_price for observation in group),
+                district=first.district,
+                state=first.state,
+                source=first.source,
+                arrivals=sum(arrivals) if arrivals else None
+            ))
+        return merged
+
+    @classmethod
+    def bulk_upsert(cls, observations: Iterable['PriceObservation']) -> int:
+        """Inserts or updates observations (varieties merged) in one transaction; returns the number written."""
+        observations = cls.merge_varieties(observations)
+        if not observations:
+            return 0
+
+        with transaction() as conn:
+            commodity_names = sorted({observation.commodity.lower() for observation in observations})
+            market_keys = sorted({(observation.market, observation.district or '', observation.state or '') for observation in observations})
+
+            conn.executemany('INSERT OR IGNORE INTO commodities (name) VALUES (?)', [(name,) for name in commodity_names])
+            conn.executemany('INSERT OR IGNORE INTO markets (name, district, state) VALUES (?, ?, ?)', market_keys)
+
+            commodity_ids = {row['name']: row['id'] for row in conn.execute('SELECT id, name FROM commodities')}
+            market_ids = {
+                (row['name'], row['district'], row['state']): row['id']
+                for row in conn.execute('SELECT id, name, district, state FROM markets')
+            }
+
+            rows = [
+                (
+                    commodity_ids[observation.commodity.lower()],
+                    market_ids[(observation.market, observation.district or '', observation.state or '')],
+                    observation.obs_date,
+                    observation.min_price,
+                    observation.max_price,
+                    observation.modal_price,
+                    observation.source,
+                    observation.arrivals
+                )
+                for observation in observations
+            ]
+            conn.executemany(cls._UPSERT_SQL, rows)
+
+            # Refresh only the weeks/months these rows fall into
+            PriceRollup.refresh({(row[0], row[1], row[2]) for row in rows})
+        return len(observations)
+
+
+def _rollup_periods(obs_date):
+    """(period, start, end) of the week (Monday start) and month containing an ISO date."""
+    day = date.fromisoformat(obs_date)
+    week_start = day - timedelta(days=day.weekday())
+    month_start = day.replace(day=1)
+    next_month = (month_start + timedelta(days=32)).replace(day=1)
+    return (
+        ('week', week_start.isoformat(), (week_start + timedelta(days=6)).isoformat()),
+        ('month', month_start.isoformat(), (next_month - timedelta(days=1)).isoformat()),
+    )
+
+
+@dataclass
+class PriceRollup:
+    """Weekly or monthly aggregate of daily observations (prices in ₹/kg)."""
+    commodity: str
+    market: str
+    period: str
+    period_start: str
+    days: int
+    min_price: Optional[float]
+    max_price: Optional[float]
+    mean_price: Optional[float]
+    modal_price: Optional[float]
+    arrivals: Optional[float] = None
+
+    # Recomputes one (commodity, market, period) row from its daily observations.
+    # market_id 0 aggregates every real market; the legacy ALL_MARKETS pseudo-market
+    # is left out so its rows never widen the commodity-wide min/max.
+    _REFRESH_SQL = '''
+        WITH daily AS (
+            SELECT obs_date,
+                   AVG(modal_price) AS modal_price,
+                   MIN(COALESCE(min_price, modal_price)) AS min_price,
+                   MAX(COALESCE(max_price, modal_price)) AS max_price,
+                   SUM(arrivals) AS arrivals
+            FROM price_observations
+            WHERE commodity_id = :commodity_id
+              AND (market_id = :market_id OR (
+                  :market_id = 0 AND market_id NOT IN (SELECT id FROM markets WHERE name = :all_markets)
+              ))
+              AND obs_date BETWEEN :start AND :end
+            GROUP BY obs_date
+        )
+        INSERT INTO price_rollups
+        (commodity_id, market_id, period, period_start, days, min_price, max_price, mean_price, modal_price, arrivals)
+        SELECT :commodity_id, :market_id, :period, :start, COUNT(*), MIN(min_price), MAX(max_price),
+               ROUND(AVG(modal_price), 2),
+               (SELECT ROUND(modal_price, 2) FROM daily ORDER BY obs_date DESC LIMIT 1),
+               SUM(arrivals)
+        FROM daily
+        WHERE true
+        GROUP BY 1
+        ON CONFLICT (commodity_id, market_id, period, period_start) DO UPDATE SET
+            days = excluded.days,
+            min_price = excluded.min_price,
+            max_price = excluded.max_price,
+            mean_price = excluded.mean_price,
+            modal_price = excluded.modal_price,
+            arrivals = excluded.arrivals
+    '''
+
+    @classmethod
+    def refresh(cls, keys):
+        """Recomputes the rollups covering (commodity_id, market_id, obs_date) keys, plus their commodity-wide rows."""
+        periods = set()
+        for commodity_id, market_id, obs_date in keys:
+            for period, start, end in _rollup_periods(obs_date):
+                periods.add((commodity_id, market_id, period, start, end))
+                periods.add((commodity_id, 0, period, start, end))
+        if not periods:
+            return 0
+
+        with transaction() as conn:
+            conn.executemany(cls._REFRESH_SQL, [
+                {
+                    'all_markets': ALL_MARKETS,
+                    'commodity_id': commodity_id,
+                    'market_id': market_id,
+                    'period': period,
+                    'start': start,
+                    'end': end,
+                }
+                for commodity_id, market_id, period, start, end in sorted(periods)
+            ])
+        return len(periods)
+
+    @classmethod
+    def rebuild(cls):
+        """Recomputes every rollup from scratch (after bulk loads that bypassed bulk_upsert)."""
+        with transaction() as conn:
+            conn.execute('DELETE FROM price_rollups')
+            keys = conn.execute('''
+                SELECT DISTINCT commodity_id, market_id, obs_date FROM price_observations
+            ''').fetchall()
+            return cls.refresh([tuple(key) for key in keys])
+
+    @classmethod
+    def latest(cls, commodity: str, period: str = 'week', market: Optional[str] = None, n: int = 8) -> List['PriceRollup']:
+        """
+        The n most recent rollups for a commodity, oldest first.
+
+        Without a market, the commodity-wide rollup across markets. A market
+        is named the way series_by_market keys it: 'Name (District)' picks
+        one of several same-named markets, a bare name shared by several
+        is aggregated across them. Names match case-insensitively.
+        """
         conn = get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT INTO market_prices (crop_id, market_name, district, price)
-            VALUES (?, ?, ?, ?)
-        ''', (crop_id, market_name, district, price))
-        
-        record_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
-        return record_id
+        market_ids = [0]
+        if market:
+            market_ids = cls._market_ids(conn, commodity, period, market)
+            if not market_ids:
+                return []
+
+        placeholders = ', '.join('?' * len(market_ids))
+        rows = conn.execute(f'''
+            SELECT c.name AS commodity, ? AS market, r.period, r.period_start, MAX(r.days) AS days,
+                   MIN(r.min_price) AS min_price, MAX(r.max_price) AS max_price,
+                   AVG(r.mean_price) AS mean_price, AVG(r.modal_price) AS modal_price,
+                   SUM(r.arrivals) AS arrivals
+            FROM price_rollups r
+            JOIN commodities c ON c.id = r.commodity_id
+            WHERE c.name = ? AND r.market_id IN ({placeholders}) AND r.period = ?
+            GROUP BY r.period_start
+            ORDER BY r.period_start DESC
+            LIMIT ?
+        ''', (market or ALL_MARKETS, commodity.lower(), *market_ids, period, n)).fetchall()
+        return [cls(**dict(row)) for row in reversed(rows)]
+
+    @staticmethod
+    def _market_ids(conn, commodity: str, period: str, market: str) -> List[int]:
+        """Ids of the markets with rollups that a series_by_market key or bare name refers to."""
+        rows = conn.execute('''
+            SELECT DISTINCT m.id, m.name, m.district
+            FROM price_rollups r
+            JOIN commodities c ON c.id = r.commodity_id
+            JOIN markets m ON m.id = r.market_id
+            WHERE c.name = ? AND r.period = ? AND m.name != ?
+        ''', (commodity.lower(), period, ALL_MARKETS)).fetchall()
+        key = market.strip().lower()
+        exact = [row['id'] for row in rows if f"{row['name']} ({row['district'] or row['id']})".lower() == key]
+        return exact or sorted(row['id'] for row in rows if row['name'].lower() == key)
+
+    @classmethod
+    def series_by_market(cls, commodity: str, period: str = 'week', n: int = 104) -> Dict[str, List[Tuple[str, float]]]:
+        """
+        The n most recent (period_start, modal_price) points per market, oldest first.
+
+        One query for every market of a commodity. The commodity-wide rollup
+        is keyed CROP_WIDE; a market name shared by markets in different
+        districts is keyed 'Name (District)' so their series stay separate.
+        """
+        rows = get_connection().execute('''
+            SELECT market_id, name, district, period_start, modal_price FROM (
+                SELECT r.market_id, m.name, m.district, r.period_start, r.modal_price,
+                       ROW_NUMBER() OVER (PARTITION BY r.market_id ORDER BY r.period_start DESC) AS recency
+                FROM price_rollups r
+                JOIN commodities c ON c.id = r.commodity_id
+                LEFT JOIN markets m ON m.id = r.market_id
+                WHERE c.name = ? AND r.period = ? AND r.modal_price IS NOT NULL
+                  AND (r.market_id = 0 OR m.name != ?)
+            )
+            WHERE recency <= ?
+            ORDER BY market_id, period_start
+        ''', (commodity.lower(), period, ALL_MARKETS, n)).fetchall()
+
+        names = {}
+        for row in rows:
+            if row['market_id']:
+                names.setdefault(row['name'], set()).add(row['market_id'])
+
+        series: Dict[str, List[Tuple[str, float]]] = {}
+        for row in rows:
+            if not row['market_id']:
+                key = CROP_WIDE
+            elif len(names[row['name']]) > 1:
+                key = f"{row['name']} ({row['district'] or row['market_id']})"
+            else:
+                key = row['name']
+            series.setdefault(key, []).append((row['period_start'], row['modal_price']))
+        return series
 
 if __name__ == '__main__':
     # Initializing DB when running directly
@@ -10,6 +10,10 @@ import logging
 from typing import Dict, List, Optional
 import json
 
+from http_client import http_get
+from lookup_memory import get_negative_cache
+from price_history_store import record_api_records
+
 logger = logging.getLogger(__name__)
 
 class AgMarkNetScraper:
@@ -18,11 +22,11 @@ class AgMarkNetScraper:
     def __init__(self):
         self.base_url = "https://agmarknet.gov.in"
         self.api_url = "https://api.data.gov.in/resource/9ef84268-d588-465a-a308-a864a43d0070"
-        self.session = requests.Session()
-        self.session.headers.update({
+        # Requests go through the shared pooled session; these headers are sent per call
+        self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
             'Accept': 'application/json'
-        })
+        }
         
         # Maharashtra markets
         self.maharashtra_markets = {
@@ -62,20 +66,33 @@ class AgMarkNetScraper:
         crop_lower = crop.lower()
         crop_names = self.crop_mappings.get(crop_lower, [crop.capitalize()])
         
+        negative_cache = get_negative_cache()
+        if negative_cache.is_negative(crop_lower, state):
+            logger.info(f"⏭️ Skipping AgMarkNet for {crop}: no records today (negative cache)")
+            return None
+        
         all_prices = []
         all_markets = []
+        had_error = False
         
         for commodity_name in crop_names:
             # Try data.gov.in API first (reliable source)
-            api_data = self._fetch_from_api(commodity_name, state)
-            if api_data:
-                all_prices.extend(api_data['prices'])
-                all_markets.extend(api_data['markets'])
+            api_data = self._fetch_from_api(commodity_name, state, crop_lower)
+            if api_data is None:
+                had_error = True
+                continue
+            all_prices.extend(api_data['prices'])
+            all_markets.extend(api_data['markets'])
         
         if not all_prices:
+            # Only a clean "no records" answer for every alias is remembered
+            if not had_error:
+                negative_cache.mark_negative(crop_lower, state)
             logger.warning(f"⚠️ No AgMarkNet data found for {crop} in {state}")
             return None
         
+        negative_cache.clear(crop_lower, state)
+        
         # Calculate modal price from top markets
         avg_price = round(sum(all_prices[:10]) / min(len(all_prices), 10))
         
@@ -93,8 +110,14 @@ class AgMarkNetScraper:
             'source_type': 'api'
         }
     
-    def _fetch_from_api(self, commodity: str, state: str) -> Optional[Dict]:
-        """Fetch from data.gov.in AgMarkNet API"""
+    def _fetch_from_api(self, commodity: str, state: str, crop_key: Optional[str] = None) -> Optional[Dict]:
+        """
+        Fetch from data.gov.in AgMarkNet API
+        
+        Returns None on request errors and empty price/market lists when the
+        API answered without usable records. Records are added to the price
+        history under crop_key when one is given.
+        """
         try:
             # Updated API endpoint with proper parameters
             params = {
@@ -116,14 +139,14 @@ class AgMarkNetScraper:
             
             logger.info(f"🌐 Fetching {commodity} from AgMarkNet API...")
             
-            response = self.session.get(url, timeout=15)
+            response = http_get(url, headers=self.headers, timeout=15)
             
             if response.status_code != 200:
                 logger.warning(f"⚠️ AgMarkNet API returned {response.status_code}")
                 # Try yesterday's date
                 yesterday = (today - timedelta(days=1)).strftime('%d/%m/%Y')
                 url_yesterday = url.replace(date_str, yesterday)
-                response = self.session.get(url_yesterday, timeout=15)
+                response = http_get(url_yesterday, headers=self.headers, timeout=15)
                 
                 if response.status_code != 200:
                     return None
@@ -133,9 +156,11 @@ class AgMarkNetScraper:
             
             if not records:
                 logger.warning(f"⚠️ No records for {commodity}")
-                return None
+                return {'prices': [], 'markets': []}
             
             logger.info(f"✅ Found {len(records)} records from AgMarkNet")
+            if crop_key:
+                record_api_records(crop_key, records)
             
             prices = []
             markets = []
@@ -176,7 +201,7 @@ class AgMarkNetScraper:
                     'markets': sorted(markets, key=lambda x: x['price'], reverse=True)
                 }
             
-            return None
+            return {'prices': [], 'markets': []}
             
         except requests.RequestException as e:
             logger.error(f"❌ AgMarkNet API error: {e}")
@@ -0,0 +1,208 @@
+"""
+HTTP validators, freshness and compression for SmartSheti price APIs
+Strong ETags, If-None-Match handling, per-origin Cache-Control and
+gzip/brotli content negotiation
+
+Clients polling the same crop card get a bodyless 304 while the payload
+is unchanged. The serverless API encodes each payload once and caches
+the body together with its ETag, so a matching revalidation never
+serializes or compresses anything. Compressed variants are cached by ETag, so an
+unchanged payload is compressed once per encoding, not once per request.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, NamedTuple, Optional, Tuple
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+# Browser freshness by data origin: live prices are worth keeping longest,
+# estimates should be re-checked soon in case real data has arrived
+CACHE_CONTROL_BY_ORIGIN = {
+    'live': 'public, max-age=300, stale-while-revalidate=1500',
+    'cached': 'public, max-age=120, stale-while-revalidate=600',
+    'estimate': 'public, max-age=60, stale-while-revalidate=240',
+}
+DEFAULT_CACHE_CONTROL = 'public, max-age=60'
+NO_CACHE = 'no-cache'
+
+# Bodies smaller than this go out uncompressed (headers would eat the saving)
+COMPRESSION_MIN_BYTES = int(os.environ.get('COMPRESSION_MIN_BYTES', '1024'))
+COMPRESSION_CACHE_SIZE = int(os.environ.get('COMPRESSION_CACHE_SIZE', '256'))
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+class EncodedResponse(NamedTuple):
+    """A JSON payload with its encoded body and strong ETag"""
+    payload: Dict
+    body: bytes
+    etag: str
+
+
+def make_etag(body: bytes) -> str:
+    """Strong ETag for an encoded body"""
+    return f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+
+
+def encode_response(payload: Optional[Dict]) -> Optional[EncodedResponse]:
+    """Serialize a payload once and compute its ETag (None passes through)"""
+    if payload is None:
+        return None
+    body = json.dumps(payload).encode()
+    return EncodedResponse(payload, body, make_etag(body))
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    If-None-Match evaluation (weak comparison, as RFC 9110 requires for it)
+
+    Accepts '*', a single tag or a comma-separated list, with or without
+    the W/ prefix.
+    """
+    if not if_none_match or not etag:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+
+    opaque = etag[2:] if etag.startswith('W/') else etag
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """Pick 'br' or 'gzip' from an Accept-Encoding header; None for identity"""
+    if not accept_encoding:
+        return None
+
+    weights = {}
+    for item in accept_encoding.split(','):
+        name, _, params = item.strip().partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        weights[name.strip().lower()] = quality
+
+    wildcard = weights.get('*', 0.0)
+    candidates = (['br'] if BROTLI_AVAILABLE else []) + ['gzip']
+    best = max(candidates, key=lambda name: weights.get(name, wildcard))
+    return best if weights.get(best, wildcard) > 0 else None
+
+
+class _CompressionCache:
+    """Bounded LRU of compressed bodies keyed by (ETag, encoding)"""
+
+    def __init__(self, max_entries: int = COMPRESSION_CACHE_SIZE):
+        self.max_entries = max(1, max_entries)
+        self._entries: 'OrderedDict[Tuple[str, str], bytes]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_compress(self, etag: str, encoding: str, body: bytes) -> bytes:
+        key = (etag, encoding)
+        with self._lock:
+            compressed = self._entries.get(key)
+            if compressed is not None:
+                self._entries.move_to_end(key)
+                return compressed
+
+        if encoding == 'br':
+            compressed = brotli.compress(body, quality=BROTLI_QUALITY)
+        else:
+            compressed = gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+        with self._lock:
+            self._entries[key] = compressed
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return compressed
+
+
+_compression_cache = _CompressionCache()
+
+
+def representation_etag(etag: str, encoding: Optional[str]) -> str:
+    """Strong ETags differ per content coding: '"abc"' -> '"abc-gzip"'"""
+    return f'{etag[:-1]}-{encoding}"' if encoding else etag
+
+
+def select_representation(body: bytes, accept_encoding: Optional[str], etag: Optional[str] = None) -> Tuple[Optional[str], str]:
+    """
+    Content coding and representation ETag for a body, without encoding it
+
+    Lets a handler answer If-None-Match before paying for compression.
+    Small bodies and clients that accept neither coding get identity.
+    """
+    etag = etag or make_etag(body)
+    encoding = negotiate_encoding(accept_encoding) if len(body) >= COMPRESSION_MIN_BYTES else None
+    return encoding, representation_etag(etag, encoding)
+
+
+def encode_body(body: bytes, encoding: Optional[str], etag: Optional[str] = None) -> bytes:
+    """Apply a coding chosen by select_representation (cached by the body's ETag)"""
+    if not encoding:
+        return body
+    return _compression_cache.get_or_compress(etag or make_etag(body), encoding, body)
+
+
+def compress_body(body: bytes, accept_encoding: Optional[str], etag: Optional[str] = None) -> Tuple[bytes, Optional[str], str]:
+    """
+    Negotiate and apply a content coding
+
+    Returns (body, encoding or None for identity, representation ETag).
+    """
+    etag = etag or make_etag(body)
+    encoding, representation = select_representation(body, accept_encoding, etag)
+    return encode_body(body, encoding, etag), encoding, representation
+
+
+def cache_control_for(payload: Optional[Dict], default: str = DEFAULT_CACHE_CONTROL) -> str:
+    """Cache-Control for a price payload, by its data_origin"""
+    if not isinstance(payload, dict):
+        return default
+    origin = payload.get('data_origin')
+    if origin is None and payload.get('is_estimate'):
+        origin = 'estimate'
+    return CACHE_CONTROL_BY_ORIGIN.get(origin, default)
+
+
+def add_cache_validators(response, request, cache_control: str = DEFAULT_CACHE_CONTROL):
+    """
+    Flask after_request hook body: compression, strong ETag and 304 for unchanged GETs
+
+    Only successful JSON GET responses are touched; Cache-Control set by
+    a view is kept.
+    """
+    if request.method not in ('GET', 'HEAD') or response.status_code != 200 or not response.is_json:
+        return response
+
+    if 'Cache-Control' not in response.headers:
+        response.headers['Cache-Control'] = cache_control_for(response.get_json(silent=True), cache_control)
+
+    body = response.get_data()
+    base_etag = make_etag(body)
+    encoding, etag = select_representation(body, request.headers.get('Accept-Encoding'), base_etag)
+    response.vary.add('Accept-Encoding')
+    response.set_etag(etag.strip('"'))
+
+    # A revalidation that matches is answered before anything is compressed
+    if encoding and not etag_matches(request.headers.get('If-None-Match'), etag):
+        response.set_data(encode_body(body, encoding, base_etag))
+        response.headers['Content-Encoding'] = encoding
+    return response.make_conditional(request)
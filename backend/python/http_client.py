@@ -0,0 +1,149 @@
+"""
+Shared HTTP client for SmartSheti upstream price sources
+One process-wide pooled session with keep-alive, bounded retries and
+per-host concurrency limits
+
+Every data.gov.in / mandiprices.com caller goes through http_get() so
+TCP+TLS connections are reused across lookups instead of being
+re-established for every alias attempt.
+"""
+
+import threading
+import time
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Connection pool sizing
+POOL_CONNECTIONS = 10  # Distinct hosts kept in the pool
+POOL_MAXSIZE = 20  # Keep-alive connections per host
+
+# Retry policy (connection errors and retryable statuses only; read timeouts are not retried)
+MAX_RETRIES = 2
+BACKOFF_FACTOR = 0.5
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+RETRY_AFTER_CAP_SECONDS = 5
+
+# Maximum concurrent requests per upstream host
+HOST_CONCURRENCY_LIMITS = {
+    'api.data.gov.in': 8,
+    'www.mandiprices.com': 4,
+}
+DEFAULT_HOST_CONCURRENCY = 8
+
+# Longest wait for a host slot when the caller passes no timeout
+HOST_WAIT_SECONDS = 10
+# A request that waited for its slot still gets at least this much time
+MIN_REQUEST_TIMEOUT_SECONDS = 1.0
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'SmartSheti Agricultural Platform/1.0',
+}
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+_host_limits: Dict[str, threading.BoundedSemaphore] = {}
+_host_limits_lock = threading.Lock()
+
+
+class HostBusy(Exception):
+    """
+    No per-host slot freed up within the caller's timeout
+
+    Local back-pressure, not an upstream failure: the request was never
+    sent, so it must not count against a source's circuit breaker.
+    """
+
+
+class _CappedRetry(Retry):
+    """Retry that honours Retry-After but never sleeps longer than the cap"""
+
+    def get_retry_after(self, response):
+        retry_after = super().get_retry_after(response)
+        if retry_after is None:
+            return None
+        return min(retry_after, RETRY_AFTER_CAP_SECONDS)
+
+
+def _build_session() -> requests.Session:
+    retry = _CappedRetry(
+        total=MAX_RETRIES,
+        connect=MAX_RETRIES,
+        read=0,
+        status=MAX_RETRIES,
+        backoff_factor=BACKOFF_FACTOR,
+        status_forcelist=RETRY_STATUS_CODES,
+        allowed_methods=frozenset(['GET', 'HEAD']),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE, max_retries=retry)
+
+    session = requests.Session()
+    session.headers.update(DEFAULT_HEADERS)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def get_session() -> requests.Session:
+    """Return the process-wide pooled session"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _build_session()
+    return _session
+
+
+def _get_host_limit(url: str) -> threading.BoundedSemaphore:
+    host = (urlparse(url).hostname or '').lower()
+    with _host_limits_lock:
+        limit = _host_limits.get(host)
+        if limit is None:
+            limit = threading.BoundedSemaphore(HOST_CONCURRENCY_LIMITS.get(host, DEFAULT_HOST_CONCURRENCY))
+            _host_limits[host] = limit
+    return limit
+
+
+def _wait_budget(timeout) -> float:
+    """Seconds to wait for a host slot: the (connect) timeout, or HOST_WAIT_SECONDS"""
+    if isinstance(timeout, tuple):
+        timeout = timeout[0]
+    return HOST_WAIT_SECONDS if timeout is None else float(timeout)
+
+
+def _after_wait(timeout, waited: float):
+    """The caller's timeout less the time spent waiting for a slot"""
+    if timeout is None:
+        return None
+    if isinstance(timeout, tuple):
+        return (_after_wait(timeout[0], waited), timeout[1])
+    return max(MIN_REQUEST_TIMEOUT_SECONDS, float(timeout) - waited)
+
+
+def http_get(url: str, **kwargs) -> requests.Response:
+    """
+    GET through the shared session, respecting the per-host concurrency limit
+
+    Accepts the same keyword arguments as requests.get (params, headers,
+    timeout, ...). Waiting for a host slot counts against the timeout;
+    when none frees up in time HostBusy is raised (deliberately not a
+    requests exception, so it is not mistaken for an upstream failure).
+    """
+    timeout = kwargs.get('timeout')
+    limit = _get_host_limit(url)
+    started = time.monotonic()
+    if not limit.acquire(timeout=_wait_budget(timeout)):
+        host = urlparse(url).hostname
+        raise HostBusy(f"All {host} connection slots busy for {time.monotonic() - started:.1f}s")
+
+    try:
+        if 'timeout' in kwargs:
+            kwargs['timeout'] = _after_wait(timeout, time.monotonic() - started)
+        return get_session().get(url, **kwargs)
+    finally:
+        limit.release()
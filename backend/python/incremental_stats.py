@@ -0,0 +1,259 @@
+"""
+Incremental price statistics for SmartSheti forecasts
+Running mean, Welford variance and regression slope over a sliding
+window, updated in O(1) per observation
+
+One RunningPriceStats per (commodity, market) is kept by PriceStatsStore
+and persisted between cron runs, so the forecast cost stays flat however
+long the recorded history gets. The series are the weekly rollups (one
+point per week, varieties already merged), synced by the forecast step.
+"""
+
+import json
+import logging
+import math
+import os
+import threading
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from snapshot_writer import write_atomic
+
+logger = logging.getLogger(__name__)
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'data', 'json')
+PRICE_STATS_FILE = os.environ.get('PRICE_STATS_FILE', os.path.join(DATA_DIR, 'price_stats.json'))
+
+# Points kept per series (weekly points: a quarter)
+DEFAULT_WINDOW = 12
+
+# Rebuild the running sums from the window this often to cap float drift
+RESYNC_INTERVAL = 1000
+
+
+class RunningPriceStats:
+    """
+    Sliding-window statistics for one price series
+
+    append() adds the newest point (evicting the oldest once the window
+    is full) and keeps the count, Welford mean/M2 and the sums needed for
+    the least-squares slope over window positions 0..n-1, all in O(1).
+    """
+
+    __slots__ = ('window', 'dates', 'values', 'mean', 'm2', 'sum_y', 'sum_iy', 'updates')
+
+    def __init__(self, window: int = DEFAULT_WINDOW):
+        self.window = max(3, int(window))
+        self.dates: deque = deque()
+        self.values: deque = deque()
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.sum_y = 0.0
+        self.sum_iy = 0.0
+        self.updates = 0
+
+    @property
+    def count(self) -> int:
+        return len(self.values)
+
+    @property
+    def last_date(self) -> Optional[str]:
+        return self.dates[-1] if self.dates else None
+
+    def append(self, obs_date: str, price: float) -> bool:
+        """
+        Add the newest observation; False if it is older than the last one
+
+        A second value for the last date replaces it (a re-fetched day).
+        """
+        price = float(price)
+        if self.dates and obs_date < self.dates[-1]:
+            return False
+        if self.dates and obs_date == self.dates[-1]:
+            self._pop_newest()
+        elif len(self.values) == self.window:
+            self._pop_oldest()
+
+        position = len(self.values)
+        self.dates.append(obs_date)
+        self.values.append(price)
+        delta = price - self.mean
+        self.mean += delta / len(self.values)
+        self.m2 += delta * (price - self.mean)
+        self.sum_y += price
+        self.sum_iy += position * price
+
+        self.updates += 1
+        if self.updates % RESYNC_INTERVAL == 0:
+            self._resync()
+        return True
+
+    def extend(self, points: Iterable[Tuple[str, float]]) -> int:
+        """Append (obs_date, price) pairs in date order; returns how many were used"""
+        return sum(1 for obs_date, price in sorted(points) if self.append(obs_date, price))
+
+    def variance(self) -> float:
+        """Population variance of the window (what _calculate_volatility squares)"""
+        return max(0.0, self.m2 / self.count) if self.count >= 2 else 0.0
+
+    def stddev(self) -> float:
+        return math.sqrt(self.variance())
+
+    def slope(self) -> float:
+        """Least-squares slope of price against window position"""
+        n = self.count
+        if n < 2:
+            return 0.0
+        x_mean = (n - 1) / 2
+        numerator = self.sum_iy - x_mean * self.sum_y
+        denominator = n * (n * n - 1) / 12
+        return numerator / denominator
+
+    def trend(self) -> float:
+        """Slope normalized by the mean (what _calculate_trend returns)"""
+        return self.slope() / self.mean if self.mean > 0 else 0.0
+
+    def recent(self, n: int = 3) -> List[float]:
+        """Last n prices, oldest first (deque ends are O(1) to index)"""
+        return [self.values[index] for index in range(-min(n, len(self.values)), 0)]
+
+    def _pop_oldest(self):
+        self.dates.popleft()
+        price = self.values.popleft()
+        # Remaining points move down one position
+        self.sum_y -= price
+        self.sum_iy -= self.sum_y
+        self._welford_remove(price)
+
+    def _pop_newest(self):
+        self.dates.pop()
+        price = self.values.pop()
+        self.sum_y -= price
+        self.sum_iy -= len(self.values) * price
+        self._welford_remove(price)
+
+    def _welford_remove(self, price: float):
+        n = len(self.values)
+        if n == 0:
+            self.mean = 0.0
+            self.m2 = 0.0
+            return
+        delta = price - self.mean
+        self.mean -= delta / n
+        self.m2 -= delta * (price - self.mean)
+
+    def _resync(self):
+        values = list(self.values)
+        n = len(values)
+        self.sum_y = sum(values)
+        self.sum_iy = sum(index * value for index, value in enumerate(values))
+        self.mean = self.sum_y / n if n else 0.0
+        self.m2 = sum((value - self.mean) ** 2 for value in values)
+
+    def to_dict(self) -> Dict:
+        """JSON-serializable state (the window; sums are rebuilt on load)"""
+        return {
+            'window': self.window,
+            'points': [[obs_date, price] for obs_date, price in zip(self.dates, self.values)],
+            'updates': self.updates,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'RunningPriceStats':
+        stats = cls(data.get('window', DEFAULT_WINDOW))
+        for obs_date, price in data.get('points', []):
+            stats.dates.append(obs_date)
+            stats.values.append(float(price))
+        stats._resync()
+        stats.updates = int(data.get('updates', 0))
+        return stats
+
+
+class PriceStatsStore:
+    """RunningPriceStats per (commodity, market), saved as one JSON file"""
+
+    def __init__(self, path: str = PRICE_STATS_FILE, window: int = DEFAULT_WINDOW):
+        self.path = path
+        self.window = window
+        self._series: Dict[str, RunningPriceStats] = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    @staticmethod
+    def _key(commodity: str, market: str) -> str:
+        return f"{(commodity or '').strip().lower()}|{(market or '').strip().lower()}"
+
+    def get(self, commodity: str, market: str) -> Optional[RunningPriceStats]:
+        with self._lock:
+            return self._series.get(self._key(commodity, market))
+
+    def update(self, commodity: str, market: str, obs_date: str, price: float) -> bool:
+        """Append one observation to a series, creating it on first sight"""
+        key = self._key(commodity, market)
+        with self._lock:
+            stats = self._series.get(key)
+            if stats is None:
+                stats = self._series[key] = RunningPriceStats(self.window)
+            return stats.append(obs_date, price)
+
+    def sync(self, commodity: str, market: str, points: List[Tuple[str, float]]) -> RunningPriceStats:
+        """
+        Bring a series up to date with its weekly (week_start, price) points
+
+        Only points from the stored last week on are appended (the last
+        week's revised value replaces it). A series is rebuilt from the
+        newest window when its stored weeks before the last one no longer
+        match the points (an earlier week was revised, added or dropped).
+        """
+        points = sorted((obs_date, float(price)) for obs_date, price in points)
+        key = self._key(commodity, market)
+        with self._lock:
+            stats = self._series.get(key)
+            if stats is None or not self._window_matches(stats, points):
+                stats = self._series[key] = RunningPriceStats(self.window)
+                points = points[-self.window:]
+            else:
+                points = [(obs_date, price) for obs_date, price in points if obs_date >= stats.last_date]
+            for obs_date, price in points:
+                stats.append(obs_date, price)
+            return stats
+
+    @staticmethod
+    def _window_matches(stats: RunningPriceStats, points: List[Tuple[str, float]]) -> bool:
+        """True if the points hold the stored window unchanged, apart from its last week"""
+        if stats.last_date is None:
+            return False
+        stored = list(zip(stats.dates, stats.values))
+        settled = [point for point in points if stored[0][0] <= point[0] < stats.last_date]
+        return settled == stored[:-1] and any(obs_date == stats.last_date for obs_date, _ in points)
+
+    def items(self) -> List[Tuple[str, str, RunningPriceStats]]:
+        """(commodity, market, stats) for every series"""
+        with self._lock:
+            return [(*key.split('|', 1), stats) for key, stats in self._series.items()]
+
+    def save(self) -> bool:
+        with self._lock:
+            data = {'window': self.window, 'series': {key: stats.to_dict() for key, stats in self._series.items()}}
+        try:
+            write_atomic(self.path, json.dumps(data, separators=(',', ':')).encode('utf-8'))
+            return True
+        except OSError as e:
+            logger.warning(f"⚠️ Could not save price stats to {self.path}: {e}")
+            return False
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as file_handle:
+                data = json.load(file_handle)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️ Ignoring unreadable price stats file {self.path}: {e}")
+            return
+
+        for key, state in (data.get('series') or {}).items():
+            try:
+                self._series[key] = RunningPriceStats.from_dict(state)
+            except (TypeError, ValueError):
+                continue
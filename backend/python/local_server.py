@@ -0,0 +1,162 @@
+"""
+Production local-serving mode for SmartSheti's serverless handlers
+Runs a BaseHTTPRequestHandler (e.g. api/index.py's handler) on a bounded
+worker pool with HTTP/1.1 keep-alive, socket timeouts and a graceful drain
+
+Vercel keeps using the handler class unchanged; only the local entry
+point wraps it. One slow upstream lookup now ties up one worker instead
+of the whole server.
+"""
+
+import logging
+import os
+import signal
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from http.server import ThreadingHTTPServer
+from typing import Type
+
+logger = logging.getLogger(__name__)
+
+LOCAL_SERVER_WORKERS = int(os.environ.get('LOCAL_SERVER_WORKERS', '16'))
+
+# Socket timeout per read while a request is being received: bounds slow clients
+LOCAL_REQUEST_TIMEOUT_SECONDS = float(os.environ.get('LOCAL_REQUEST_TIMEOUT_SECONDS', '15'))
+
+# How long a keep-alive connection may sit idle between requests holding a worker
+LOCAL_IDLE_TIMEOUT_SECONDS = float(os.environ.get('LOCAL_IDLE_TIMEOUT_SECONDS', '2'))
+
+# How long shutdown waits for in-flight requests
+LOCAL_DRAIN_SECONDS = float(os.environ.get('LOCAL_DRAIN_SECONDS', '30'))
+
+LISTEN_BACKLOG = 128
+
+
+def make_local_handler(
+    handler_class: Type,
+    request_timeout: float = LOCAL_REQUEST_TIMEOUT_SECONDS,
+    idle_timeout: float = LOCAL_IDLE_TIMEOUT_SECONDS
+) -> Type:
+    """
+    Subclass a handler for HTTP/1.1 keep-alive with socket timeouts
+
+    The first request gets request_timeout; waiting for a further request
+    on the same connection only idle_timeout. Keep-alive connections are
+    closed after their current request while the server is draining or
+    connections are queued for a worker.
+    """
+
+    class LocalHandler(handler_class):
+        protocol_version = 'HTTP/1.1'
+        timeout = request_timeout
+
+        def setup(self):
+            super().setup()
+            self.requests_served = 0
+            self.waiting_idle = False
+
+        def handle_one_request(self):
+            if self.requests_served:
+                self.waiting_idle = True
+                self.connection.settimeout(idle_timeout)
+            super().handle_one_request()
+            self.requests_served += 1
+            if self.server.draining or self.server.saturated():
+                self.close_connection = True
+
+        def parse_request(self):
+            # The request line arrived: the rest of it gets the full read timeout
+            self.waiting_idle = False
+            self.connection.settimeout(request_timeout)
+            return super().parse_request()
+
+        def log_error(self, format, *args):
+            # An idle keep-alive connection timing out is routine, not an error
+            if not self.waiting_idle:
+                super().log_error(format, *args)
+
+    LocalHandler.__name__ = LocalHandler.__qualname__ = f'Local{handler_class.__name__}'
+    return LocalHandler
+
+
+class BoundedThreadingHTTPServer(ThreadingHTTPServer):
+    """
+    Threading HTTP server whose connections run on a fixed-size pool
+
+    Connections beyond max_workers wait in the pool queue instead of
+    each getting a new thread.
+    """
+
+    daemon_threads = True
+    block_on_close = False
+    request_queue_size = LISTEN_BACKLOG
+
+    def __init__(self, server_address, handler_class, max_workers: int = LOCAL_SERVER_WORKERS):
+        super().__init__(server_address, handler_class)
+        self.max_workers = max(1, max_workers)
+        self.draining = False
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='smartsheti-http')
+        self._in_flight = set()
+        self._in_flight_lock = threading.Lock()
+
+    def process_request(self, request, client_address):
+        future = self._executor.submit(self.process_request_thread, request, client_address)
+        with self._in_flight_lock:
+            self._in_flight.add(future)
+        future.add_done_callback(self._forget)
+
+    def saturated(self) -> bool:
+        """True while connections are queued waiting for a worker"""
+        with self._in_flight_lock:
+            return len(self._in_flight) > self.max_workers
+
+    def _forget(self, future):
+        with self._in_flight_lock:
+            self._in_flight.discard(future)
+
+    def drain(self, timeout: float = LOCAL_DRAIN_SECONDS) -> int:
+        """Wait for in-flight connections to finish; returns how many were still running"""
+        self.draining = True
+        with self._in_flight_lock:
+            pending = set(self._in_flight)
+        _, not_done = wait(pending, timeout=timeout)
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        return len(not_done)
+
+
+def serve_local(
+    handler_class: Type,
+    host: str = '',
+    port: int = 5000,
+    max_workers: int = LOCAL_SERVER_WORKERS,
+    request_timeout: float = LOCAL_REQUEST_TIMEOUT_SECONDS,
+    drain_seconds: float = LOCAL_DRAIN_SECONDS,
+    idle_timeout: float = LOCAL_IDLE_TIMEOUT_SECONDS
+):
+    """
+    Serve handler_class until Ctrl+C or SIGTERM, then drain and stop
+
+    New connections stop being accepted immediately; requests already
+    running get up to drain_seconds to finish.
+    """
+    server = BoundedThreadingHTTPServer((host, port), make_local_handler(handler_class, request_timeout, idle_timeout), max_workers)
+
+    def _request_shutdown(signum, frame):
+        # shutdown() blocks until serve_forever() returns, so not on this thread
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    if threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGTERM, _request_shutdown)
+
+    logger.info(f"🚀 Serving on port {port} with {server.max_workers} workers (HTTP/1.1 keep-alive, {request_timeout:g}s timeout, {idle_timeout:g}s idle)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        logger.info(f"🛑 Stopping: draining in-flight requests (up to {drain_seconds:g}s)")
+        unfinished = server.drain(drain_seconds)
+        if unfinished:
+            logger.warning(f"⚠️ {unfinished} connections still open after drain")
+        server.server_close()
+        logger.info("✅ Server stopped")
@@ -0,0 +1,293 @@
+"""
+Learned upstream lookup state for SmartSheti scrapers
+Remembers which commodity alias actually returns data.gov.in records and
+which crop/state combinations currently have no records at all
+
+State is kept in memory and periodically saved to a small JSON file so a
+cold start inherits what previous processes learned.
+"""
+
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from datetime import date
+from typing import Dict, List, Optional
+
+from snapshot_writer import FileLock
+
+logger = logging.getLogger(__name__)
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'data', 'json')
+ALIAS_STATS_FILE = os.environ.get('ALIAS_STATS_FILE', os.path.join(DATA_DIR, 'alias_stats.json'))
+NEGATIVE_CACHE_FILE = os.environ.get('NEGATIVE_CACHE_FILE', os.path.join(DATA_DIR, 'negative_results.json'))
+
+# "No records" answers are trusted for this long, and only on the same arrival date
+NEGATIVE_CACHE_TTL_SECONDS = int(os.environ.get('NEGATIVE_CACHE_TTL_SECONDS', '3600'))
+
+# Aliases that come back empty this many times in a row are tried last
+DEMOTE_AFTER_MISSES = 3
+SAVE_INTERVAL_SECONDS = 30
+
+
+def _load_json_state(path: str) -> Dict:
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as file_handle:
+            data = json.load(file_handle)
+        return data if isinstance(data, dict) else {}
+    except (OSError, json.JSONDecodeError) as e:
+        logger.warning(f"⚠️ Ignoring unreadable state file {path}: {e}")
+        return {}
+
+
+def _save_json_state(path: str, data: Dict) -> bool:
+    """Write state atomically (temp file + rename); read-only deployments just skip"""
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(tmp_path, 'w', encoding='utf-8') as file_handle:
+            json.dump(data, file_handle, indent=2, sort_keys=True)
+        os.replace(tmp_path, path)
+        return True
+    except OSError as e:
+        logger.warning(f"⚠️ Could not save state file {path}: {e}")
+        return False
+
+
+class AliasOrderLearner:
+    """
+    Per (crop, state) record of which upstream commodity alias returns records
+
+    order() puts the alias that most recently returned records first,
+    followed by untried aliases in their configured order, and finally
+    aliases that have come back empty DEMOTE_AFTER_MISSES times in a row.
+    """
+
+    def __init__(self, path: str = ALIAS_STATS_FILE, save_interval_seconds: float = SAVE_INTERVAL_SECONDS):
+        self.path = path
+        self.save_interval_seconds = save_interval_seconds
+        self._stats: Dict[str, Dict[str, Dict]] = _load_json_state(path)
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._last_saved = time.monotonic()
+
+    @staticmethod
+    def _key(crop: str, state: Optional[str]) -> str:
+        return f"{crop.strip().lower()}|{(state or 'all').strip().lower()}"
+
+    def order(self, crop: str, state: Optional[str], aliases: List[str]) -> List[str]:
+        """Return aliases reordered by learned hit history"""
+        with self._lock:
+            stats = dict(self._stats.get(self._key(crop, state), {}))
+
+        def rank(item):
+            index, alias = item
+            alias_stats = stats.get(alias)
+            if not alias_stats:
+                return (1, 0.0, index)
+            if alias_stats.get('consecutive_misses', 0) >= DEMOTE_AFTER_MISSES:
+                return (2, 0.0, index)
+            if alias_stats.get('hits', 0) > 0:
+                return (0, -alias_stats.get('last_hit', 0.0), index)
+            return (1, 0.0, index)
+
+        return [alias for _, alias in sorted(enumerate(aliases), key=rank)]
+
+    def record_hit(self, crop: str, state: Optional[str], alias: str):
+        """The alias returned records"""
+        self._update(crop, state, alias, hit=True)
+
+    def record_miss(self, crop: str, state: Optional[str], alias: str):
+        """The alias was answered but returned no usable records"""
+        self._update(crop, state, alias, hit=False)
+
+    def flush(self):
+        """Save pending changes now"""
+        with self._lock:
+            if not self._dirty:
+                return
+            snapshot = json.loads(json.dumps(self._stats))
+            self._dirty = False
+            self._last_saved = time.monotonic()
+        _save_json_state(self.path, snapshot)
+
+    def _update(self, crop: str, state: Optional[str], alias: str, hit: bool):
+        with self._lock:
+            crop_stats = self._stats.setdefault(self._key(crop, state), {})
+            alias_stats = crop_stats.setdefault(alias, {'hits': 0, 'misses': 0, 'consecutive_misses': 0})
+            if hit:
+                alias_stats['hits'] += 1
+                alias_stats['consecutive_misses'] = 0
+                alias_stats['last_hit'] = time.time()
+            else:
+                alias_stats['misses'] += 1
+                alias_stats['consecutive_misses'] += 1
+            self._dirty = True
+            save_due = time.monotonic() - self._last_saved >= self.save_interval_seconds
+
+        if save_due:
+            self.flush()
+
+
+_alias_learner: Optional[AliasOrderLearner] = None
+_alias_learner_lock = threading.Lock()
+
+
+def get_alias_learner() -> AliasOrderLearner:
+    """Return the process-wide alias learner (saved again at exit)"""
+    global _alias_learner
+    if _alias_learner is None:
+        with _alias_learner_lock:
+            if _alias_learner is None:
+                _alias_learner = AliasOrderLearner()
+                atexit.register(_alias_learner.flush)
+    return _alias_learner
+
+
+class NegativeResultCache:
+    """
+    Remembers "no records for crop X in state Y as of date D"
+
+    Entries expire after ttl_seconds or when the date changes. The file is
+    re-read whenever another process (e.g. the cron job) rewrites it, so a
+    clear() there is seen by the API on its next lookup.
+
+    Marks and clears apply in memory at once and are written in batches
+    (every save_interval_seconds, on flush() and at exit). A write re-reads
+    the file under its lock and merges only this process's changes, so a
+    clear made by another process is never overwritten.
+    """
+
+    def __init__(
+        self,
+        path: str = NEGATIVE_CACHE_FILE,
+        ttl_seconds: float = NEGATIVE_CACHE_TTL_SECONDS,
+        save_interval_seconds: float = SAVE_INTERVAL_SECONDS
+    ):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.save_interval_seconds = save_interval_seconds
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict] = {}
+        # Unsaved changes: key -> entry to write, or None to delete
+        self._pending: Dict[str, Optional[Dict]] = {}
+        self._loaded_mtime = None
+        self._last_saved = time.monotonic()
+        self._reload_if_changed()
+
+    @staticmethod
+    def _key(crop: str, state: Optional[str]) -> str:
+        return f"{crop.strip().lower()}|{(state or 'all').strip().lower()}"
+
+    def is_negative(self, crop: str, state: Optional[str]) -> bool:
+        """True if the crop/state was recently answered with no records today"""
+        self._reload_if_changed()
+        with self._lock:
+            entry = self._entries.get(self._key(crop, state))
+        if not entry:
+            return False
+        if entry.get('date') != date.today().isoformat():
+            return False
+        return time.time() - entry.get('recorded_at', 0) < self.ttl_seconds
+
+    def mark_negative(self, crop: str, state: Optional[str], arrival_date: Optional[date] = None):
+        """Record that every alias for the crop/state came back empty"""
+        self.mark_many_negative([crop], state, arrival_date)
+
+    def mark_many_negative(self, crops: List[str], state: Optional[str], arrival_date: Optional[date] = None):
+        """
+        Mark several crops negative as one batch
+
+        arrival_date is the date the empty answer was for (default
+        today); only today's entries are ever treated as negative.
+        """
+        day = (arrival_date or date.today()).isoformat()
+        with self._lock:
+            for crop in crops:
+                key = self._key(crop, state)
+                entry = {'date': day, 'recorded_at': time.time()}
+                self._entries[key] = entry
+                self._pending[key] = entry
+        self._flush_if_due()
+
+    def clear(self, crop: str, state: Optional[str]):
+        """Forget a negative entry once records are seen again"""
+        self._reload_if_changed()
+        key = self._key(crop, state)
+        with self._lock:
+            if self._entries.pop(key, None) is None:
+                return
+            self._pending[key] = None
+        self._flush_if_due()
+
+    def flush(self) -> bool:
+        """Merge pending changes into the file under its lock; False if it could not be written"""
+        with self._lock:
+            if not self._pending:
+                return True
+            pending = self._pending
+            self._pending = {}
+            self._last_saved = time.monotonic()
+
+        today = date.today().isoformat()
+        with FileLock(self.path):
+            merged = self._merge(_load_json_state(self.path), pending)
+            # Drop entries from previous days while we are writing anyway
+            merged = {key: entry for key, entry in merged.items() if entry.get('date') == today}
+            saved = _save_json_state(self.path, merged)
+            mtime = self._mtime() if saved else None
+
+        with self._lock:
+            # Changes made while writing stay pending and still win
+            self._entries = self._merge(merged, self._pending)
+            if saved:
+                self._loaded_mtime = mtime
+        return saved
+
+    @staticmethod
+    def _merge(entries: Dict[str, Dict], changes: Dict[str, Optional[Dict]]) -> Dict[str, Dict]:
+        merged = dict(entries)
+        for key, entry in changes.items():
+            if entry is None:
+                merged.pop(key, None)
+            else:
+                merged[key] = entry
+        return merged
+
+    def _mtime(self) -> Optional[float]:
+        try:
+            return os.path.getmtime(self.path)
+        except OSError:
+            return None
+
+    def _flush_if_due(self):
+        if time.monotonic() - self._last_saved >= self.save_interval_seconds:
+            self.flush()
+
+    def _reload_if_changed(self):
+        mtime = self._mtime()
+        if mtime is None or mtime == self._loaded_mtime:
+            return
+        entries = _load_json_state(self.path)
+        with self._lock:
+            self._entries = self._merge(entries, self._pending)
+            self._loaded_mtime = mtime
+
+
+_negative_cache: Optional[NegativeResultCache] = None
+_negative_cache_lock = threading.Lock()
+
+
+def get_negative_cache() -> NegativeResultCache:
+    """Return the process-wide negative result cache (saved again at exit)"""
+    global _negative_cache
+    if _negative_cache is None:
+        with _negative_cache_lock:
+            if _negative_cache is None:
+                _negative_cache = NegativeResultCache()
+                atexit.register(_negative_cache.flush)
+    return _negative_cache
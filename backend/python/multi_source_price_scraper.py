@@ -11,15 +11,161 @@ import requests
 from bs4 import BeautifulSoup
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple
+import copy
 import json
 import time
 from functools import lru_cache
 import logging
+import threading
+
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from concurrency import SingleFlight, TokenBucket
+from http_client import HostBusy, http_get
+from lookup_memory import get_alias_learner, get_negative_cache
+from price_canonical import observed_weekly_series
+from price_history_store import record_api_records
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Bulk lookup tuning
+BULK_MAX_WORKERS = 6
+BULK_RATE_PER_SECOND = 4
+BULK_RATE_BURST = 4
+BULK_DEADLINE_SECONDS = 20
+
+# Racing mode tuning for get_price(deadline_seconds=...)
+RACE_HEDGE_DELAY_SECONDS = 1.5
+RACE_MIN_CONFIDENCE = 80
+# Source fetches running at once across all races; losers finish in the background
+RACE_MAX_WORKERS = 16
+
+# Circuit breaker tuning per source
+BREAKER_FAILURE_THRESHOLD = 3
+BREAKER_RESET_TIMEOUT_SECONDS = 60
+
+# Spelling variants that resolve to the same upstream commodity
+CROP_ALIASES = {
+    'soyabean': 'soybean',
+    'soya bean': 'soybean',
+    'chili': 'chilli',
+    'chillies': 'chilli',
+}
+
+
+_race_executor: Optional[ThreadPoolExecutor] = None
+_race_executor_lock = threading.Lock()
+
+
+def get_race_executor() -> ThreadPoolExecutor:
+    """Return the process-wide pool every race submits its source fetches to"""
+    global _race_executor
+    if _race_executor is None:
+        with _race_executor_lock:
+            if _race_executor is None:
+                _race_executor = ThreadPoolExecutor(max_workers=RACE_MAX_WORKERS, thread_name_prefix='price-race')
+    return _race_executor
+
+
+def canonical_crop_key(crop: str) -> str:
+    """Map a crop name to the key shared by all of its spelling variants"""
+    crop_key = crop.strip().lower()
+    return CROP_ALIASES.get(crop_key, crop_key)
+
+
+class CircuitBreaker:
+    """
+    Per-source circuit breaker (closed -> open -> half-open)
+    
+    Consecutive failures or timeouts open the circuit so the source is
+    skipped immediately. After reset_timeout_seconds one probe request is
+    let through (half-open); its outcome closes or re-opens the circuit.
+    """
+    
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+    
+    def __init__(self, name: str, failure_threshold: int = 3, reset_timeout_seconds: float = 60):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout_seconds = reset_timeout_seconds
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self._opened_at = 0.0
+        self._probe_started_at = None
+        self._lock = threading.Lock()
+        self.transitions = {self.OPEN: 0, self.HALF_OPEN: 0, self.CLOSED: 0}
+        self.counters = {'successes': 0, 'failures': 0, 'timeouts': 0, 'rejected': 0}
+    
+    def allow_request(self) -> bool:
+        """Return True if a request may be sent to the source now"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            
+            now = time.monotonic()
+            if self.state == self.OPEN:
+                if now - self._opened_at < self.reset_timeout_seconds:
+                    self.counters['rejected'] += 1
+                    return False
+                self._transition(self.HALF_OPEN)
+            
+            # Half-open: a single probe at a time (a stuck probe expires after the reset timeout)
+            if self._probe_started_at is not None and now - self._probe_started_at < self.reset_timeout_seconds:
+                self.counters['rejected'] += 1
+                return False
+            self._probe_started_at = now
+            return True
+    
+    def record_success(self):
+        """Source answered; close the circuit"""
+        with self._lock:
+            self.counters['successes'] += 1
+            self.consecutive_failures = 0
+            self._probe_started_at = None
+            if self.state != self.CLOSED:
+                self._transition(self.CLOSED)
+    
+    def release(self):
+        """The request was never sent (local back-pressure); free the half-open probe slot"""
+        with self._lock:
+            self._probe_started_at = None
+    
+    def record_failure(self, timeout: bool = False):
+        """Source failed or timed out; open the circuit past the threshold"""
+        with self._lock:
+            self.counters['timeouts' if timeout else 'failures'] += 1
+            self.consecutive_failures += 1
+            self._probe_started_at = None
+            if self.state == self.HALF_OPEN or (
+                self.state == self.CLOSED and self.consecutive_failures >= self.failure_threshold
+            ):
+                self._opened_at = time.monotonic()
+                self._transition(self.OPEN)
+    
+    def snapshot(self) -> Dict:
+        """Current state and counters for health reporting"""
+        with self._lock:
+            retry_in = 0.0
+            if self.state == self.OPEN:
+                retry_in = max(0.0, self.reset_timeout_seconds - (time.monotonic() - self._opened_at))
+            return {
+                'state': self.state,
+                'consecutive_failures': self.consecutive_failures,
+                'failure_threshold': self.failure_threshold,
+                'retry_in_seconds': round(retry_in, 1),
+                'transitions': dict(self.transitions),
+                **self.counters
+            }
+    
+    def _transition(self, new_state: str):
+        logger.warning(f"🔌 Circuit for {self.name}: {self.state} -> {new_state}")
+        self.state = new_state
+        self.transitions[new_state] += 1
+
 
 class PriceDataSource:
     """Base class for all price data sources"""
@@ -30,6 +176,11 @@ class PriceDataSource:
         self.cache_duration = cache_duration_minutes
         self.last_fetch_time = None
         self.cache = {}
+        self.breaker = CircuitBreaker(
+            name,
+            failure_threshold=BREAKER_FAILURE_THRESHOLD,
+            reset_timeout_seconds=BREAKER_RESET_TIMEOUT_SECONDS
+        )
         
     def is_cache_valid(self, crop: str) -> bool:
         """Check if cached data for crop is still valid"""
@@ -48,6 +199,13 @@ class PriceDataSource:
             return self.cache[crop]['data']
         return None
     
+    def get_last_known_price(self, crop: str) -> Optional[Dict]:
+        """Retrieve cached price data regardless of age"""
+        cache_entry = self.cache.get(crop)
+        if cache_entry:
+            return cache_entry['data']
+        return None
+    
     def set_cache(self, crop: str, data: Dict):
         """Store price data in cache"""
         self.cache[crop] = {
@@ -55,6 +213,13 @@ class PriceDataSource:
             'timestamp': datetime.now()
         }
     
+    def _record_response(self, status_code: int):
+        """Feed an upstream HTTP status into the circuit breaker"""
+        if status_code == 429 or status_code >= 500:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+    
     def fetch_price(self, crop: str, state: str = 'Maharashtra') -> Optional[Dict]:
         """Fetch price data - to be implemented by subclasses"""
         raise NotImplementedError("Subclasses must implement fetch_price()")
@@ -79,8 +244,10 @@ class PriceDataSource:
 class DataGovAPISource(PriceDataSource):
     """Fetches prices from data.gov.in official API"""
     
-    def __init__(self):
+    def __init__(self, use_negative_cache: bool = True):
         super().__init__("data.gov.in API", priority=1, cache_duration_minutes=30)
+        # The cron job turns this off so it re-probes and clears stale negatives
+        self.use_negative_cache = use_negative_cache
         self.api_url = 'https://api.data.gov.in/resource/9ef84268-d588-465a-a308-a864a43d0070'
         self.api_key = '579b464db66ec23bdd000001cdd3946e44ce4aad7209ff7b23ac571b'
         
@@ -124,15 +291,31 @@ class DataGovAPISource(PriceDataSource):
             return cached
         
         crop_lower = crop.lower()
-        crop_names = self.crop_mappings.get(crop_lower, [crop.capitalize()])
+        negative_cache = get_negative_cache()
+        if self.use_negative_cache and negative_cache.is_negative(crop_lower, state):
+            logger.info(f"⏭️ Skipping {self.name} for {crop}: no records today (negative cache)")
+            return None
+        
+        alias_learner = get_alias_learner()
+        crop_names = alias_learner.order(
+            crop_lower,
+            state,
+            self.crop_mappings.get(crop_lower, [crop.capitalize()])
+        )
+        empty_answers = 0
         
         for commodity_name in crop_names:
+            if not self.breaker.allow_request():
+                logger.warning(f"🔌 Skipping {self.name} for {crop}: circuit {self.breaker.state}")
+                return None
+            
             try:
                 url = f"{self.api_url}?api-key={self.api_key}&format=json&limit=30&filters[commodity]={commodity_name}&filters[state]={state}"
                 
                 logger.info(f"🌐 Fetching {commodity_name} from data.gov.in...")
                 
-                response = requests.get(url, timeout=10)
+                response = http_get(url, timeout=10)
+                self._record_response(response.status_code)
                 if response.status_code != 200:
                     logger.warning(f"⚠️ API returned status {response.status_code}")
                     continue
@@ -142,68 +325,104 @@ class DataGovAPISource(PriceDataSource):
                 
                 if not records:
                     logger.warning(f"⚠️ No records found for {commodity_name}")
+                    alias_learner.record_miss(crop_lower, state, commodity_name)
+                    empty_answers += 1
                     continue
                 
                 logger.info(f"✅ Found {len(records)} records from data.gov.in")
                 
-                # Process records
-                prices = []
-                markets = []
-                
-                for record in records:
-                    modal_price = self._parse_float(record.get('modal_price', 0))
-                    if modal_price <= 0:
-                        continue
-                    
-                    # Convert to per kg
-                    unit = (record.get('unit', '')).lower()
-                    price_per_kg = self._convert_to_kg(modal_price, unit)
-                    
-                    if 0 < price_per_kg < 10000:  # Sanity check
-                        prices.append(price_per_kg)
-                        markets.append({
-                            'name': record.get('market', 'Unknown'),
-                            'price': price_per_kg,
-                            'district': record.get('district', ''),
-                            'min_price': self._convert_to_kg(self._parse_float(record.get('min_price', modal_price)), unit),
-                            'max_price': self._convert_to_kg(self._parse_float(record.get('max_price', modal_price)), unit),
-                            'arrival_date': record.get('arrival_date', '')
-                        })
-                
-                if not prices:
+                normalized = self._build_price_from_records(crop, state, records)
+                if not normalized:
+                    alias_learner.record_miss(crop_lower, state, commodity_name)
+                    empty_answers += 1
                     continue
                 
-                # Calculate aggregated price (modal price from top markets)
-                avg_price = round(sum(prices[:5]) / min(len(prices), 5))
-                
-                result = {
-                    'crop': crop,
-                    'price': avg_price,
-                    'unit': 'kg',
-                    'market': markets[0]['name'] if markets else 'Multiple Markets',
-                    'state': state,
-                    'timestamp': records[0].get('arrival_date', datetime.now().isoformat()),
-                    'confidence': 95,  # High confidence for government data
-                    'min_price': min(prices),
-                    'max_price': max(prices),
-                    'markets': markets[:5],
-                    'source_type': 'api'
-                }
-                
-                normalized = self.normalize_price_data(result)
+                alias_learner.record_hit(crop_lower, state, commodity_name)
+                negative_cache.clear(crop_lower, state)
+                record_api_records(crop_lower, records)
                 self.set_cache(crop, normalized)
                 return normalized
                 
+            except HostBusy as e:
+                # Our own slots are exhausted; the other aliases would wait the same
+                self.breaker.release()
+                logger.warning(f"🚦 {self.name} busy for {crop}: {str(e)}")
+                return None
+            except requests.Timeout as e:
+                self.breaker.record_failure(timeout=True)
+                logger.error(f"⏱️ Timeout for {commodity_name}: {str(e)}")
+                continue
             except requests.RequestException as e:
+                self.breaker.record_failure()
                 logger.error(f"❌ Request error for {commodity_name}: {str(e)}")
                 continue
             except Exception as e:
                 logger.error(f"❌ Error processing {commodity_name}: {str(e)}")
                 continue
         
+        # Every alias was answered and none had records: remember that for today
+        if empty_answers == len(crop_names):
+            negative_cache.mark_negative(crop_lower, state)
+        
         logger.warning(f"⚠️ No data found from data.gov.in for {crop}")
         return None
     
+    def prime_cache(self, crop: str, state: str, records: List[Dict]) -> Optional[Dict]:
+        """Fill the cache for a crop from already-fetched records (bulk ingest stores them itself)"""
+        normalized = self._build_price_from_records(crop, state, records)
+        if normalized:
+            self.set_cache(crop, normalized)
+        return normalized
+    
+    def _build_price_from_records(self, crop: str, state: str, records: List[Dict]) -> Optional[Dict]:
+        """Aggregate raw data.gov.in records into a normalized price, or None"""
+        
+        # Process records
+        prices = []
+        markets = []
+        
+        for record in records:
+            modal_price = self._parse_float(record.get('modal_price', 0))
+            if modal_price <= 0:
+                continue
+            
+            # Convert to per kg
+            unit = (record.get('unit', '')).lower()
+            price_per_kg = self._convert_to_kg(modal_price, unit)
+            
+            if 0 < price_per_kg < 10000:  # Sanity check
+                prices.append(price_per_kg)
+                markets.append({
+                    'name': record.get('market', 'Unknown'),
+                    'price': price_per_kg,
+                    'district': record.get('district', ''),
+                    'min_price': self._convert_to_kg(self._parse_float(record.get('min_price', modal_price)), unit),
+                    'max_price': self._convert_to_kg(self._parse_float(record.get('max_price', modal_price)), unit),
+                    'arrival_date': record.get('arrival_date', '')
+                })
+        
+        if not prices:
+            return None
+        
+        # Calculate aggregated price (modal price from top markets)
+        avg_price = round(sum(prices[:5]) / min(len(prices), 5))
+        
+        result = {
+            'crop': crop,
+            'price': avg_price,
+            'unit': 'kg',
+            'market': markets[0]['name'] if markets else 'Multiple Markets',
+            'state': state,
+            'timestamp': records[0].get('arrival_date', datetime.now().isoformat()),
+            'confidence': 95,  # High confidence for government data
+            'min_price': min(prices),
+            'max_price': max(prices),
+            'markets': markets[:5],
+            'source_type': 'api'
+        }
+        
+        return self.normalize_price_data(result)
+    
     def _parse_float(self, value) -> float:
         """Safely parse float value"""
         try:
@@ -236,6 +455,10 @@ class MandiPricesSource(PriceDataSource):
         if cached:
             return cached
         
+        if not self.breaker.allow_request():
+            logger.warning(f"🔌 Skipping {self.name} for {crop}: circuit {self.breaker.state}")
+            return None
+        
         try:
             # Construct URL - mandiprices uses lowercase with hyphens
             crop_url = crop.lower().replace(' ', '-')
@@ -248,7 +471,19 @@ class MandiPricesSource(PriceDataSource):
                 'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
             }
             
-            response = requests.get(url, headers=headers, timeout=15)
+            try:
+                response = http_get(url, headers=headers, timeout=15)
+            except HostBusy as e:
+                self.breaker.release()
+                logger.warning(f"🚦 {self.name} busy for {crop}: {str(e)}")
+                return None
+            except requests.Timeout:
+                self.breaker.record_failure(timeout=True)
+                raise
+            except requests.RequestException:
+                self.breaker.record_failure()
+                raise
+            self._record_response(response.status_code)
             if response.status_code != 200:
                 logger.warning(f"⚠️ MandiPrices returned status {response.status_code}")
                 return None
@@ -377,29 +612,74 @@ class MSPFallbackSource(PriceDataSource):
 class MultiSourcePriceScraper:
     """Main scraper that aggregates data from multiple sources"""
     
-    def __init__(self):
+    def __init__(self, use_negative_cache: bool = True):
         self.sources = [
-            DataGovAPISource(),
+            DataGovAPISource(use_negative_cache=use_negative_cache),
             MandiPricesSource(),
             MSPFallbackSource()
         ]
         # Sort by priority
         self.sources.sort(key=lambda x: x.priority)
+        # Concurrent lookups for the same commodity share one upstream fetch
+        self._inflight = SingleFlight()
+        # Shared across bulk requests in place of a fixed sleep between crops
+        self._bulk_rate_limiter = TokenBucket(rate=BULK_RATE_PER_SECOND, capacity=BULK_RATE_BURST)
         logger.info(f"✅ MultiSourcePriceScraper initialized with {len(self.sources)} sources")
     
-    def get_price(self, crop: str, state: str = 'Maharashtra', use_fallback: bool = True) -> Dict:
+    def get_price(
+        self,
+        crop: str,
+        state: str = 'Maharashtra',
+        use_fallback: bool = True,
+        deadline_seconds: Optional[float] = None,
+        hedge_delay_seconds: float = RACE_HEDGE_DELAY_SECONDS,
+        min_confidence: int = RACE_MIN_CONFIDENCE
+    ) -> Dict:
         """
         Get price from first available source
         
+        Concurrent callers asking for the same commodity (including spelling
+        variants such as soybean/soyabean) in the same state wait on a single
+        upstream fetch and each receive their own copy of the result.
+        
+        Passing deadline_seconds switches to racing mode: sources are started
+        in priority order, each next one launched if nothing acceptable has
+        arrived within hedge_delay_seconds, and the first result reaching
+        min_confidence wins. The lookup never runs past the deadline.
+        
         Args:
             crop: Crop name
             state: State name (default: Maharashtra)
             use_fallback: Whether to use MSP fallback if all sources fail
+            deadline_seconds: Overall time budget; enables racing mode
+            hedge_delay_seconds: Wait before launching the next source
+            min_confidence: Confidence that ends the race immediately
             
         Returns:
             Dict with price data and metadata
         """
         
+        crop_key = canonical_crop_key(crop)
+        racing = deadline_seconds is not None
+        flight_key = (crop_key, state.strip().lower(), use_fallback, racing)
+        
+        if racing:
+            fetch = lambda: self._race_sources(crop_key, state, use_fallback, deadline_seconds, hedge_delay_seconds, min_confidence)
+        else:
+            fetch = lambda: self._fetch_price(crop_key, state, use_fallback)
+        
+        price_data = self._inflight.do(flight_key, fetch)
+        
+        if price_data is None:
+            return None
+        
+        result = copy.deepcopy(price_data)
+        result['crop'] = crop
+        return result
+    
+    def _fetch_price(self, crop: str, state: str, use_fallback: bool) -> Optional[Dict]:
+        """Walk the sources in priority order for a canonical crop key"""
+        
         logger.info(f"🔍 Fetching price for {crop} in {state}")
         
         errors = []
@@ -415,29 +695,7 @@ class MultiSourcePriceScraper:
                 
                 if price_data and price_data.get('price', 0) > 0:
                     logger.info(f"✅ Success! Got price ₹{price_data['price']}/kg from {source.name}")
-                    
-                    # Add source metadata
-                    price_data['data_source'] = source.name
-                    price_data['source_priority'] = source.priority
-                    price_data['is_fallback'] = source.priority == 99
-                    
-                    # Generate historical prices
-                    price_data['historical_prices'] = self._generate_historical(
-                        price_data['price'],
-                        weeks=8
-                    )
-                    
-                    # Generate market comparison
-                    if 'markets' in price_data:
-                        price_data['market_comparison'] = self._format_market_comparison(
-                            price_data['markets']
-                        )
-                    else:
-                        price_data['market_comparison'] = self._generate_market_comparison(
-                            price_data['price']
-                        )
-                    
-                    return price_data
+                    return self._attach_source_metadata(price_data, source)
                     
             except Exception as e:
                 error_msg = f"{source.name}: {str(e)}"
@@ -451,7 +709,10 @@ class MultiSourcePriceScraper:
         if not use_fallback:
             return None
 
-        # Last resort - return MSP fallback anyway
+        return self._get_msp_fallback(crop, state, errors)
+    
+    def _get_msp_fallback(self, crop: str, state: str, errors: List[str]) -> Dict:
+        """Last resort - return MSP fallback anyway"""
         fallback_source = [s for s in self.sources if s.priority == 99][0]
         fallback_data = fallback_source.fetch_price(crop, state)
         fallback_data['data_source'] = 'MSP Fallback (All sources failed)'
@@ -461,17 +722,238 @@ class MultiSourcePriceScraper:
         
         return fallback_data
     
-    def get_bulk_prices(self, crops: List[str], state: str = 'Maharashtra') -> Dict[str, Dict]:
-        """Fetch prices for multiple crops"""
+    def _race_sources(
+        self,
+        crop: str,
+        state: str,
+        use_fallback: bool,
+        deadline_seconds: float,
+        hedge_delay_seconds: float,
+        min_confidence: int
+    ) -> Optional[Dict]:
+        """Race live sources with hedged starts under an overall deadline"""
+        
+        logger.info(f"🏁 Racing sources for {crop} in {state} ({deadline_seconds}s deadline)")
+        
+        deadline = time.monotonic() + deadline_seconds
+        candidates = [source for source in self.sources if source.priority != 99]
+        pending = {}
+        errors = []
+        best = None
+        next_index = 0
+        next_hedge_at = deadline
+        
+        executor = get_race_executor()
+        try:
+            while True:
+                now = time.monotonic()
+                if now >= deadline:
+                    break
+                
+                # Launch the next source when the hedge delay has passed or nothing is running
+                if next_index < len(candidates) and (not pending or now >= next_hedge_at):
+                    source = candidates[next_index]
+                    next_index += 1
+                    logger.info(f"Starting source: {source.name} (priority {source.priority})")
+                    pending[executor.submit(source.fetch_price, crop, state)] = source
+                    next_hedge_at = now + hedge_delay_seconds
+                
+                if not pending:
+                    break
+                
+                timeout = deadline - now
+                if next_index < len(candidates):
+                    timeout = min(timeout, max(0.0, next_hedge_at - now))
+                
+                done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+                
+                for future in done:
+                    source = pending.pop(future)
+                    try:
+                        price_data = future.result()
+                    except Exception as e:
+                        error_msg = f"{source.name}: {str(e)}"
+                        errors.append(error_msg)
+                        logger.error(f"❌ {error_msg}")
+                        continue
+                    
+                    if not price_data or price_data.get('price', 0) <= 0:
+                        continue
+                    
+                    confidence = price_data.get('confidence', 0)
+                    if confidence >= min_confidence:
+                        logger.info(f"✅ {source.name} won the race with ₹{price_data['price']}/kg")
+                        return self._attach_source_metadata(price_data, source)
+                    
+                    if best is None or confidence > best[0]:
+                        best = (confidence, source, price_data)
+        finally:
+            # Queued fetches are dropped; running ones finish and free their worker
+            for future in pending:
+                future.cancel()
+        
+        if best is not None:
+            confidence, source, price_data = best
+            logger.info(f"✅ Using best result below confidence bar from {source.name} ({confidence}%)")
+            return self._attach_source_metadata(price_data, source)
+        
+        if pending:
+            errors.append(f"Deadline of {deadline_seconds}s reached")
+        logger.error(f"❌ No source returned a price for {crop}. Errors: {errors}")
+        
+        if not use_fallback:
+            return None
+        
+        return self._get_msp_fallback(crop, state, errors)
+    
+    def _attach_source_metadata(self, price_data: Dict, source: PriceDataSource) -> Dict:
+        """
+        A copy of a source result with source metadata, history and market comparison
+
+        The result itself is the dict kept in source.cache and may be read
+        by other races at the same time, so it is never modified; only
+        top-level keys are set, so a shallow copy is enough.
+        """
+        price_data = dict(price_data)
+        
+        # Add source metadata
+        price_data['data_source'] = source.name
+        price_data['source_priority'] = source.priority
+        price_data['is_fallback'] = source.priority == 99
+        
+        # Weekly rollups when recorded, generated trend otherwise
+        observed = observed_weekly_series(price_data.get('crop', ''))
+        if observed:
+            price_data['historical_prices'] = [price for _, price in observed]
+            price_data['history_dates'] = [week_start for week_start, _ in observed]
+            price_data['history_origin'] = 'observed'
+        else:
+            price_data['historical_prices'] = self._generate_historical(
+                price_data['price'],
+                weeks=8
+            )
+            price_data['history_origin'] = 'generated'
+        
+        # Generate market comparison
+        if 'markets' in price_data:
+            price_data['market_comparison'] = self._format_market_comparison(
+                price_data['markets']
+            )
+        else:
+            price_data['market_comparison'] = self._generate_market_comparison(
+                price_data['price']
+            )
+        
+        return price_data
+    
+    def get_bulk_prices(
+        self,
+        crops: List[str],
+        state: str = 'Maharashtra',
+        deadline_seconds: Optional[float] = None,
+        max_workers: Optional[int] = None
+    ) -> Dict[str, Dict]:
+        """
+        Fetch prices for multiple crops concurrently
+        
+        Lookups run on a bounded worker pool and draw from a shared token
+        bucket instead of sleeping between crops. Crops that fail or are
+        still running when the deadline passes fall back to the last cached
+        source data, then to MSP/estimates.
+        
+        Args:
+            crops: Crop names
+            state: State name (default: Maharashtra)
+            deadline_seconds: Overall time budget for live lookups
+            max_workers: Worker pool size (default: BULK_MAX_WORKERS)
+            
+        Returns:
+            Dict of crop -> price data, each tagged with data_origin
+            ('live', 'cached' or 'estimate')
+        """
+        
+        crop_list = list(dict.fromkeys(crop.strip() for crop in crops if crop and crop.strip()))
+        if not crop_list:
+            return {}
+        
+        if deadline_seconds is None:
+            deadline_seconds = BULK_DEADLINE_SECONDS
+        deadline = time.monotonic() + deadline_seconds
+        worker_count = min(len(crop_list), max_workers or BULK_MAX_WORKERS)
+        
+        logger.info(f"📦 Fetching bulk prices for {len(crop_list)} crops ({worker_count} workers, {deadline_seconds}s budget)")
         
-        logger.info(f"📦 Fetching bulk prices for {len(crops)} crops")
         results = {}
+        executor = ThreadPoolExecutor(max_workers=worker_count, thread_name_prefix='bulk-price')
+        try:
+            futures = {
+                executor.submit(self._fetch_bulk_item, crop, state, deadline): crop
+                for crop in crop_list
+            }
+            done, not_done = wait(futures, timeout=max(0.0, deadline - time.monotonic()))
+            
+            for future in done:
+                crop = futures[future]
+                try:
+                    price_data = future.result()
+                except Exception as e:
+                    logger.error(f"❌ Bulk lookup failed for {crop}: {str(e)}")
+                    continue
+                if price_data:
+                    price_data['data_origin'] = 'live'
+                    results[crop] = price_data
+            
+            if not_done:
+                logger.warning(f"⏱️ Bulk deadline reached with {len(not_done)} crops unfinished")
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+        
+        for crop in crop_list:
+            if crop not in results:
+                results[crop] = self._get_bulk_fallback(crop, state)
+        
+        return {crop: results[crop] for crop in crop_list}
+    
+    def _fetch_bulk_item(self, crop: str, state: str, deadline: float) -> Optional[Dict]:
+        """Live lookup for one bulk crop, gated by the shared rate limiter"""
+        if not self._bulk_rate_limiter.acquire(timeout=deadline - time.monotonic()):
+            return None
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return None
+        return self.get_price(crop, state, use_fallback=False, deadline_seconds=remaining)
+    
+    def _get_bulk_fallback(self, crop: str, state: str) -> Dict:
+        """Last cached source data for a crop, else the MSP/estimate"""
+        crop_key = canonical_crop_key(crop)
         
-        for crop in crops:
-            results[crop] = self.get_price(crop, state)
-            time.sleep(0.5)  # Rate limiting
+        for source in self.sources:
+            if source.priority == 99:
+                continue
+            cached = source.get_last_known_price(crop_key)
+            if cached and cached.get('price', 0) > 0:
+                price_data = self._attach_source_metadata(cached, source)
+                price_data['crop'] = crop
+                price_data['is_fallback'] = True
+                price_data['data_origin'] = 'cached'
+                return price_data
         
-        return results
+        fallback_source = [s for s in self.sources if s.priority == 99][0]
+        price_data = self._attach_source_metadata(fallback_source.fetch_price(crop_key, state), fallback_source)
+        price_data['crop'] = crop
+        price_data['data_origin'] = 'estimate'
+        return price_data
+    
+    def get_source_health(self) -> List[Dict]:
+        """Circuit breaker state for every source"""
+        return [
+            {
+                'name': source.name,
+                'priority': source.priority,
+                'circuit': source.breaker.snapshot()
+            }
+            for source in self.sources
+        ]
     
     def get_markets_for_crop(self, crop: str, state: str = 'Maharashtra') -> List[Dict]:
         """Get list of markets with prices for a specific crop"""
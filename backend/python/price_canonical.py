@@ -0,0 +1,358 @@
+"""
+Canonical /api/realprice payloads for SmartSheti
+Shared by the serverless API and the cron job, so the static per-crop
+shards the cron writes have exactly the shape the API returns
+"""
+
+import logging
+import os
+import sqlite3
+import sys
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from price_history_store import MIN_OBSERVED_POINTS
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+try:
+    from database import PriceRollup
+    DATABASE_AVAILABLE = True
+except ImportError:
+    DATABASE_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+CROP_ALIASES = {
+    'soybean': ['soybean', 'soyabean'],
+    'soyabean': ['soyabean', 'soybean'],
+    'chili': ['chili', 'chilli'],
+    'chilli': ['chilli', 'chili'],
+}
+
+
+def get_crop_lookup_keys(crop: str) -> List[str]:
+    crop_key = crop.strip().lower()
+    keys = [crop_key]
+    for alias in CROP_ALIASES.get(crop_key, []):
+        if alias not in keys:
+            keys.append(alias)
+    return keys
+
+
+def observed_weekly_series(crop: str, market: str = '', points: int = 8, per: str = 'kg') -> List[Tuple[str, float]]:
+    """
+    Recorded weekly modal prices as (week_start, price), oldest first
+
+    Read from the SQLite weekly rollups, at one market if given, else
+    across markets. Prices are ₹/kg, or ₹/quintal with per='quintal'.
+    Empty when fewer than MIN_OBSERVED_POINTS weeks are recorded.
+    """
+    if not DATABASE_AVAILABLE:
+        return []
+    scale = 100 if per == 'quintal' else 1
+    for crop_key in get_crop_lookup_keys(crop):
+        try:
+            rollups = PriceRollup.latest(crop_key, 'week', market or None, points)
+        except sqlite3.Error as e:
+            logger.warning(f"⚠️ Could not read weekly rollups for {crop_key}: {e}")
+            return []
+        series = [(rollup.period_start, round(rollup.modal_price * scale, 2)) for rollup in rollups if rollup.modal_price]
+        if len(series) >= MIN_OBSERVED_POINTS:
+            return series
+    return []
+
+
+def observed_history(crop: str, market: str = '', points: int = 8) -> List[float]:
+    """Recorded weekly per-kg modal prices (oldest first) for a crop, at one market if given"""
+    return [price for _, price in observed_weekly_series(crop, market, points)]
+
+
+def safe_float(value, default: float = 0.0) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def clamp_history(history: List[float], current_price: float, desired_points: int = 8) -> List[float]:
+    normalized = [round(safe_float(price), 2) for price in history if safe_float(price) > 0]
+
+    if not normalized and current_price > 0:
+        normalized = generate_historical_trend(current_price, desired_points)
+
+    if normalized and len(normalized) < desired_points:
+        seed_price = normalized[-1]
+        generated = generate_historical_trend(seed_price, desired_points)
+        normalized = generated[:desired_points - len(normalized)] + normalized
+
+    if not normalized:
+        normalized = [round(current_price, 2)] * desired_points
+
+    return [round(price, 2) for price in normalized[-desired_points:]]
+
+
+def build_market_comparison_from_price(base_price: float) -> List[Dict]:
+    if base_price <= 0:
+        return []
+
+    market_defaults = [
+        ('Pune APMC', 1.00),
+        ('Mumbai APMC', 1.08),
+        ('Nashik APMC', 0.97),
+        ('Nagpur APMC', 1.03),
+        ('Aurangabad APMC', 0.99),
+    ]
+    comparison = []
+
+    for market_name, multiplier in market_defaults:
+        market_price = round(base_price * multiplier, 2)
+        change = ((market_price - base_price) / base_price) * 100 if base_price else 0
+        comparison.append({
+            'market': market_name,
+            'price': market_price,
+            'change': f"{'+' if change >= 0 else ''}{change:.1f}%"
+        })
+
+    return comparison
+
+
+def normalize_market_rows(markets: Optional[List[Dict]], current_price: float) -> List[Dict]:
+    normalized = []
+    seen = set()
+
+    for market in markets or []:
+        market_name = (
+            market.get('market')
+            or market.get('name')
+            or market.get('district')
+            or 'Unknown Market'
+        )
+        market_key = market_name.strip().lower()
+        if market_key in seen:
+            continue
+
+        price = safe_float(
+            market.get('price', market.get('price_per_kg', market.get('modal_price', current_price))),
+            current_price
+        )
+        if price <= 0:
+            continue
+
+        change_value = market.get('change')
+        if isinstance(change_value, str) and change_value:
+            change_text = change_value
+        else:
+            min_price = safe_float(market.get('min_price'), price)
+            max_price = safe_float(market.get('max_price'), price)
+            baseline = price or current_price or 1
+            change_pct = ((max_price - min_price) / baseline) * 100 if baseline else 0
+            change_text = f"{'+' if change_pct >= 0 else ''}{change_pct:.1f}%"
+
+        normalized.append({
+            'market': market_name,
+            'price': round(price, 2),
+            'change': change_text
+        })
+        seen.add(market_key)
+
+    if not normalized and current_price > 0:
+        normalized = build_market_comparison_from_price(current_price)
+
+    return normalized[:5]
+
+
+def resolve_market_selection(requested_market: str, market_rows: List[Dict], current_price: float, historical_prices: List[float]) -> Dict:
+    requested_market = (requested_market or '').strip()
+    if not requested_market:
+        resolved_market = market_rows[0]['market'] if market_rows else 'Multiple Markets'
+        return {
+            'market': resolved_market,
+            'current_price': round(current_price, 2),
+            'historical_prices': historical_prices,
+            'market_requested': '',
+            'market_matched': bool(market_rows)
+        }
+
+    requested_key = requested_market.lower()
+    selected_market = None
+
+    for market_row in market_rows:
+        market_name = market_row['market']
+        market_key = market_name.lower()
+        if market_key == requested_key or requested_key in market_key or market_key in requested_key:
+            selected_market = market_row
+            break
+
+    if selected_market:
+        selected_price = round(safe_float(selected_market.get('price'), current_price), 2)
+        delta = selected_price - current_price
+        adjusted_history = [round(price + delta, 2) for price in historical_prices] if historical_prices else [selected_price] * 8
+        return {
+            'market': selected_market['market'],
+            'current_price': selected_price,
+            'historical_prices': adjusted_history,
+            'market_requested': requested_market,
+            'market_matched': True
+        }
+
+    resolved_market = market_rows[0]['market'] if market_rows else requested_market
+    return {
+        'market': resolved_market,
+        'current_price': round(current_price, 2),
+        'historical_prices': historical_prices,
+        'market_requested': requested_market,
+        'market_matched': False
+    }
+
+
+def generate_historical_trend(current_price: float, num_points: int = 8) -> List[float]:
+    """Generate realistic historical price trend"""
+    import random
+    
+    # Use deterministic seed based on current price
+    random.seed(int(current_price * 100))
+    
+    prices = []
+    for i in range(num_points):
+        if i == num_points - 1:
+            prices.append(current_price)
+        else:
+            # Add realistic variation
+            variation = random.uniform(-0.08, 0.08)
+            historical_price = current_price * (1 + variation * (num_points - i - 1) / num_points)
+            prices.append(round(historical_price, 2))
+    
+    # Reset seed so it doesn't affect other random calls
+    random.seed()
+    return prices
+
+
+def calculate_change(historical_prices: List[float]) -> str:
+    """Calculate price change percentage"""
+    if len(historical_prices) < 2:
+        return "+0.0%"
+    current = historical_prices[-1]
+    previous = historical_prices[-2]
+    change = ((current - previous) / previous) * 100
+    return f"{'+' if change >= 0 else ''}{change:.1f}%"
+
+
+def get_source_badge(price_data: Dict) -> str:
+    """Get display badge for data source"""
+    if price_data.get('is_estimate'):
+        return '⚪ MSP/Estimate'
+
+    if price_data.get('data_origin') == 'cached':
+        return '🔵 Cached Real Data'
+
+    confidence = price_data.get('confidence', 0)
+    source = price_data.get('source', price_data.get('data_source', '')).lower()
+
+    if 'data.gov' in source or confidence >= 90:
+        return '🟢 LIVE Data'
+    elif confidence >= 70:
+        return '🔵 Recent Data'
+    elif confidence >= 50:
+        return '🟡 Cached Data'
+    else:
+        return '⚪ Estimated'
+
+
+def canonicalize_price_data(
+    crop: str,
+    state: str,
+    requested_market: str,
+    price_data: Optional[Dict],
+    data_origin: str,
+    default_source: str = 'Unknown'
+) -> Optional[Dict]:
+    """Shape any scraper, API or cached price dict into the /api/realprice payload"""
+    if not price_data:
+        return None
+
+    history = price_data.get('historical_prices', [])
+    base_price = safe_float(price_data.get('current_price', price_data.get('price', 0)))
+    if 'data' in price_data and isinstance(price_data.get('data'), list):
+        price_series = [safe_float(value) for value in price_data.get('data', []) if safe_float(value) > 0]
+        unit = (price_data.get('unit') or '').lower()
+        if 'quintal' in unit:
+            history = [round(value / 100, 2) for value in price_series]
+        else:
+            history = [round(value, 2) for value in price_series]
+        if history:
+            base_price = history[-1]
+
+    if base_price <= 0 and history:
+        base_price = round(history[-1], 2)
+
+    if base_price <= 0:
+        return None
+
+    historical_prices = clamp_history(history, base_price)
+    current_price = round(base_price, 2)
+    market_rows = normalize_market_rows(
+        price_data.get('market_comparison', price_data.get('markets')),
+        current_price
+    )
+    market_resolution = resolve_market_selection(
+        requested_market,
+        market_rows,
+        current_price,
+        historical_prices
+    )
+
+    current_price = market_resolution['current_price']
+    recorded_market = market_resolution['market'] if requested_market and market_resolution['market_matched'] else ''
+    historical_prices = (
+        observed_history(crop, recorded_market)
+        or clamp_history(market_resolution['historical_prices'], current_price)
+    )
+    change_percentage = calculate_change(historical_prices)
+    source = price_data.get('source', price_data.get('data_source', default_source))
+    confidence = int(round(safe_float(price_data.get('confidence', 0), 0)))
+    is_estimate = bool(price_data.get('is_estimate', False)) or data_origin == 'estimate'
+    is_fallback = bool(price_data.get('is_fallback', False)) or data_origin in ('cached', 'estimate')
+
+    canonical = {
+        'success': True,
+        'crop': price_data.get('crop', crop).lower(),
+        'current_price': round(current_price, 2),
+        'change_percentage': change_percentage,
+        'historical_prices': historical_prices,
+        'market_comparison': market_rows,
+        'timestamp': price_data.get('timestamp', price_data.get('last_updated', datetime.now().isoformat())),
+        'source': source,
+        'confidence': confidence,
+        'state': price_data.get('state', state),
+        'market': market_resolution['market'],
+        'market_requested': market_resolution['market_requested'],
+        'market_matched': market_resolution['market_matched'],
+        'is_fallback': is_fallback,
+        'is_estimate': is_estimate,
+        'data_origin': data_origin,
+    }
+    canonical['source_badge'] = get_source_badge(canonical)
+    return canonical
+
+
+def canonicalize_cached_entry(crop: str, state: str, requested_market: str, crop_entry: Dict, meta: Dict) -> Optional[Dict]:
+    """Canonical payload for a prices.json entry (meta holds the snapshot's source/lastUpdated)"""
+    cached_payload = {
+        **crop_entry,
+        'crop': crop,
+        'state': crop_entry.get('state', state),
+        'source': crop_entry.get('source', meta.get('source', 'Cached Price Data')),
+        'timestamp': crop_entry.get('timestamp', crop_entry.get('last_updated', meta.get('lastUpdated', datetime.now().isoformat()))),
+        'is_fallback': True,
+        'is_estimate': bool(crop_entry.get('is_estimate', False)),
+    }
+
+    return canonicalize_price_data(
+        crop,
+        state,
+        requested_market,
+        cached_payload,
+        data_origin='cached',
+        default_source='Cached Price Data'
+    )
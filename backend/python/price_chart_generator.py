@@ -94,6 +94,7 @@ class MarketDataScraper:
             return {'success': False, 'error': str(e)}
 
 from python.real_agmarknet_scraper import RealAGMARKNETScraper
+from price_canonical import observed_weekly_series
 
 class PriceChartGenerator:
     """Generates price chart data with historical trends using Real AGMARKNET Data"""
@@ -202,8 +203,9 @@ class PriceChartGenerator:
                  # Actually, price_chart_generator seemed to work with ~2500 range (Quintal)
                  pass
             
-            # Generate historical data if not present (Real scraper provides current, we generate history)
-            historical_prices = self.generate_historical_prices(current_price, crop)
+            # Weekly rollups at this market (or across markets) when recorded, generated otherwise
+            observed = observed_weekly_series(crop, market, per='quintal') or observed_weekly_series(crop, per='quintal')
+            historical_prices = [price for _, price in observed] or self.generate_historical_prices(current_price, crop)
             
             # Calculate metrics
             metrics = self.calculate_chart_metrics(historical_prices)
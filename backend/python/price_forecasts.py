@@ -0,0 +1,274 @@
+"""
+Precomputed next-week price forecasts for SmartSheti
+Built by the cron next to prices.json so /api/predict is a lookup
+
+    data/json/predictions.json
+    {
+      "onion": {
+        "crop": "onion",
+        "unit": "₹/kg",
+        "overall": {"predicted_price": 31.4, "model": "holt_winters", ...},
+        "markets": {"Lasalgaon": {...}, "Pune": {...}}
+      },
+      "lastUpdated": "...", "prices_version": 42, "snapshot_version": 7
+    }
+
+Series with enough weekly rollups go through the fitted-model cache
+(Holt-Winters, Holt or AR, refit only on drift or schedule); shorter ones
+use the moving-average predictor over the persisted running stats
+(incremental_stats), updated with just the newest weeks. The file is
+written with the snapshot writer, so an unchanged forecast keeps its
+version.
+"""
+
+import logging
+import os
+import time
+from datetime import date
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from database import ALL_MARKETS, CROP_WIDE
+from price_canonical import get_crop_lookup_keys
+from snapshot_writer import VERSION_KEY, write_snapshot
+
+logger = logging.getLogger(__name__)
+
+PREDICTIONS_FILE = os.environ.get(
+    'PRICE_PREDICTIONS_FILE',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'data', 'json', 'predictions.json')
+)
+
+# Weekly points needed before a fitted model is tried, and how many are used
+FITTED_MIN_POINTS = 12
+FORECAST_HISTORY_WEEKS = int(os.environ.get('FORECAST_HISTORY_WEEKS', '156'))
+
+# Points handed to the moving-average predictor
+MOVING_AVERAGE_POINTS = 12
+
+# Top-level predictions.json keys that are not crops
+PREDICTION_META_KEYS = ('lastUpdated', 'source', 'prices_version', 'snapshot_version', 'snapshot_hash')
+
+
+def _direction(predicted: float, current: float) -> str:
+    if current <= 0:
+        return 'unknown'
+    change = (predicted - current) / current
+    if change > 0.02:
+        return 'upward'
+    if change < -0.02:
+        return 'downward'
+    return 'stable'
+
+
+def _fitted_prediction(result: Dict, current: float, based_on: str) -> Dict:
+    """
+    Shape a ForecastModelCache result; the range is +/- one mean one-step error
+
+    Holt-Winters fits also carry next week's seasonal_factor, computed
+    here in the cron rather than per request.
+    """
+    predicted = result['predicted_price']
+    mae = result['mae']
+    confidence = max(0.0, 1 - mae / current) if current > 0 else 0.0
+    prediction = {
+        'predicted_price': predicted,
+        'current_price': round(current, 2),
+        'min_price': round(max(0.0, predicted - mae), 2),
+        'max_price': round(predicted + mae, 2),
+        'confidence': round(confidence * 100, 1),
+        'trend_direction': _direction(predicted, current),
+        'model': result['model'],
+        'points': result['points'],
+        'fitted_at': result['fitted_at'],
+        'based_on': based_on,
+    }
+    if result.get('seasonal_factor') is not None:
+        prediction['seasonal_factor'] = result['seasonal_factor']
+    return prediction
+
+
+def _moving_average_prediction(prediction: Dict, current: float, points: int, based_on: Optional[str]) -> Optional[Dict]:
+    """Shape a SimplePricePredictor result (None if it reported an error)"""
+    if 'error' in prediction:
+        return None
+    return {
+        'predicted_price': prediction['predicted_price'],
+        'current_price': round(current, 2),
+        'min_price': prediction['min_price'],
+        'max_price': prediction['max_price'],
+        'confidence': prediction['confidence'],
+        'trend_direction': prediction['trend_direction'],
+        'model': 'moving_average',
+        'points': points,
+        'based_on': based_on,
+    }
+
+
+def forecast_series(
+    commodity: str,
+    market: str,
+    points: Sequence[Tuple[str, float]],
+    model_cache,
+    predictor,
+    allow_refit: bool = True,
+    today: Optional[date] = None,
+    stats_store=None
+) -> Optional[Dict]:
+    """
+    Next-week prediction for one dated weekly series (oldest first)
+
+    Without a fitted model the moving average comes from stats_store
+    (an incremental_stats.PriceStatsStore) when given, else from the
+    last MOVING_AVERAGE_POINTS points.
+    """
+    points = [(obs_date, float(price)) for obs_date, price in points if price and float(price) > 0]
+    if not points:
+        return None
+
+    current = points[-1][1]
+    if len(points) >= FITTED_MIN_POINTS:
+        result = model_cache.forecast(commodity, market, points, horizon=1, today=today, allow_refit=allow_refit)
+        if result is not None:
+            return _fitted_prediction(result, current, points[-1][0])
+
+    if stats_store is not None:
+        stats = stats_store.sync(commodity, market, points)
+        return _moving_average_prediction(predictor.predict_from_stats(stats), current, stats.count, points[-1][0])
+    values = [price for _, price in points[-MOVING_AVERAGE_POINTS:]]
+    return _moving_average_prediction(predictor.predict_next_week(values), current, len(values), points[-1][0])
+
+
+def build_predictions(
+    all_prices: Dict,
+    rollups: Optional[Dict[str, Dict[str, List[Tuple[str, float]]]]] = None,
+    model_cache=None,
+    deadline: Optional[float] = None,
+    today: Optional[date] = None,
+    stats_store=None
+) -> Dict:
+    """
+    Forecasts for every crop in a prices.json snapshot and every market with rollups
+
+    Args:
+        all_prices: prices.json content (crop entries plus metadata keys)
+        rollups: {crop: {market: [(week_start, ₹/kg), ...]}} from
+            PriceRollup.series_by_market; CROP_WIDE is the crop-wide series
+        model_cache: price_predictor.ForecastModelCache for fitted models
+        stats_store: incremental_stats.PriceStatsStore for the moving average
+        deadline: time.monotonic() after which no model is (re)fitted;
+            stored fits are still applied, other series use the moving average
+    """
+    # Kept out of the API's import path: only the cron builds forecasts
+    from price_predictor import ForecastModelCache, SimplePricePredictor
+
+    rollups = rollups or {}
+    model_cache = model_cache if model_cache is not None else ForecastModelCache()
+    predictor = SimplePricePredictor()
+    predictions = {}
+
+    for crop, entry in all_prices.items():
+        if crop in PREDICTION_META_KEYS or not isinstance(entry, dict) or 'error' in entry:
+            continue
+
+        allow_refit = deadline is None or time.monotonic() < deadline
+        crop_rollups = rollups.get(crop, {})
+        overall = forecast_series(
+            crop, CROP_WIDE, crop_rollups.get(CROP_WIDE, []), model_cache, predictor, allow_refit, today, stats_store
+        )
+        if overall is None:
+            # No rollups yet: the snapshot's own weekly history
+            history = [float(value) for value in entry.get('historical_prices', []) if isinstance(value, (int, float)) and value > 0]
+            if history:
+                values = history[-MOVING_AVERAGE_POINTS:]
+                overall = _moving_average_prediction(predictor.predict_next_week(values), values[-1], len(values), entry.get('last_updated'))
+
+        markets = {}
+        for market, points in sorted(crop_rollups.items()):
+            if market == CROP_WIDE:
+                continue
+            allow_refit = deadline is None or time.monotonic() < deadline
+            prediction = forecast_series(crop, market, points, model_cache, predictor, allow_refit, today, stats_store)
+            if prediction is not None:
+                markets[market] = prediction
+
+        if overall is None and not markets:
+            continue
+        predictions[crop] = {
+            'crop': crop,
+            'unit': '₹/kg',
+            'overall': overall,
+            'markets': markets,
+        }
+
+    return predictions
+
+
+def write_predictions(
+    all_prices: Dict,
+    rollups: Optional[Dict] = None,
+    path: str = PREDICTIONS_FILE,
+    deadline: Optional[float] = None
+) -> Dict:
+    """Build and atomically write predictions.json; returns write stats"""
+    from incremental_stats import PriceStatsStore
+    from price_predictor import ForecastModelCache
+
+    model_cache = ForecastModelCache()
+    stats_store = PriceStatsStore(window=MOVING_AVERAGE_POINTS)
+    refits_before = model_cache.refits
+    data = build_predictions(all_prices, rollups, model_cache, deadline, stats_store=stats_store)
+    crops = len(data)
+    markets = sum(len(crop_data['markets']) for crop_data in data.values())
+
+    data['lastUpdated'] = all_prices.get('lastUpdated')
+    data['prices_version'] = all_prices.get(VERSION_KEY)
+    model_cache.save()
+    stats_store.save()
+    result = write_snapshot(path, data)
+
+    logger.info(f"🔮 Forecasts for {crops} crops / {markets} markets (v{result['version']})")
+    return {
+        'written': result['written'],
+        'version': result['version'],
+        'crops': crops,
+        'markets': markets,
+        'refits': model_cache.refits - refits_before,
+    }
+
+
+def find_prediction(predictions: Dict, crop: str, market: str = '') -> Optional[Dict]:
+    """
+    /api/predict payload for a crop (and optional market) from predictions.json
+
+    An unknown market falls back to the crop-wide forecast with
+    market_matched False. None when the crop has no forecast.
+    """
+    for crop_key in get_crop_lookup_keys(crop):
+        crop_data = predictions.get(crop_key)
+        if crop_key not in PREDICTION_META_KEYS and isinstance(crop_data, dict):
+            break
+    else:
+        return None
+
+    markets = crop_data.get('markets') or {}
+    requested = (market or '').strip().lower()
+    market_name = next((name for name in markets if name.lower() == requested), None) if requested else None
+
+    prediction = markets[market_name] if market_name else crop_data.get('overall')
+    if prediction is None:
+        return None
+
+    return {
+        'success': True,
+        'crop': crop_key,
+        'market': market_name or ALL_MARKETS,
+        'market_matched': bool(market_name) if requested else None,
+        'unit': crop_data.get('unit', '₹/kg'),
+        'horizon': 'next_week',
+        'prediction': prediction,
+        'markets': sorted(markets),
+        'data_origin': 'cached',
+        'predictions_version': predictions.get(VERSION_KEY),
+        'prices_version': predictions.get('prices_version'),
+        'generated_at': predictions.get('lastUpdated'),
+    }
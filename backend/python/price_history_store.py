@@ -0,0 +1,178 @@
+"""
+Observed mandi price history for SmartSheti
+Raw data.gov.in records fetched by any source are recorded as daily
+observations in SQLite (price_observations), the one history store;
+readers get weekly points from its rollups through
+price_canonical.observed_weekly_series()
+
+Recording is idempotent: observations are keyed on commodity, market and
+arrival date, so re-fetching the same day's arrivals every hour adds
+nothing. Commodity keys are the lowercase crop keys the scrapers use
+(e.g. 'soybean'), not the upstream commodity names.
+
+Scrapers run on the request path, so record_api_records() only queues
+the records; one background thread writes them, batched, and requests
+never wait on SQLite's writer lock. The cron job writes its whole-state
+ingest directly.
+
+JSON Lines partitions written by earlier versions (data/history/*.jsonl)
+are imported by scripts/python/migrate_json_to_sqlite.py.
+"""
+
+import atexit
+import logging
+import os
+import queue
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Iterable, Optional
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+try:
+    from database import PriceObservation
+    DATABASE_AVAILABLE = True
+except ImportError:
+    DATABASE_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Legacy JSON Lines partitions, read only by the migration script
+HISTORY_DIR = os.environ.get(
+    'PRICE_HISTORY_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'data', 'history')
+)
+
+# Fewer observed points than this and callers keep their previous behaviour
+MIN_OBSERVED_POINTS = 2
+
+# Record batches waiting for the writer thread; beyond this new ones are dropped
+HISTORY_QUEUE_SIZE = int(os.environ.get('HISTORY_QUEUE_SIZE', '256'))
+# Batches written per transaction
+HISTORY_WRITE_BATCH = 32
+# How long exit waits for queued batches
+HISTORY_FLUSH_SECONDS = 5
+
+
+def to_per_kg(price: float, unit: str) -> float:
+    """Convert an upstream price to ₹/kg using its unit label"""
+    unit = (unit or '').lower()
+    if 'quintal' in unit:
+        return price / 100
+    if 'ton' in unit:
+        return price / 1000
+    return price
+
+
+class HistoryRecorder:
+    """
+    Queue of raw record batches written to price_observations by one thread
+
+    submit() never blocks: a full queue drops the batch (the same records
+    come back on the next fetch or with the cron ingest). The writer
+    drains up to HISTORY_WRITE_BATCH batches into one bulk_upsert.
+    """
+
+    def __init__(self, max_pending: int = HISTORY_QUEUE_SIZE):
+        self._queue: queue.Queue = queue.Queue(maxsize=max(1, max_pending))
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.counters = {'queued': 0, 'dropped': 0, 'written': 0, 'errors': 0}
+        self.last_written_at: Optional[str] = None
+
+    def submit(self, commodity: str, records: Iterable[Dict], source: str) -> bool:
+        """Queue records for writing; False when the queue is full"""
+        try:
+            self._queue.put_nowait((commodity, list(records), source))
+        except queue.Full:
+            with self._lock:
+                self.counters['dropped'] += 1
+            return False
+        with self._lock:
+            self.counters['queued'] += 1
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='price-history', daemon=True)
+                self._thread.start()
+        return True
+
+    def flush(self, timeout: float = HISTORY_FLUSH_SECONDS) -> bool:
+        """Wait until every queued batch is written; False if the timeout ran out first"""
+        deadline = time.monotonic() + timeout
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._queue.all_tasks_done.wait(remaining)
+        return True
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {**self.counters, 'pending': self._queue.qsize(), 'last_written_at': self.last_written_at}
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < HISTORY_WRITE_BATCH:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._write(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _write(self, batch):
+        try:
+            written = PriceObservation.bulk_upsert(
+                PriceObservation.from_record(commodity, record, source=source)
+                for commodity, records, source in batch
+                for record in records
+            )
+        except sqlite3.Error as e:
+            logger.warning(f"⚠️ Price history not recorded for {len(batch)} batches: {e}")
+            with self._lock:
+                self.counters['errors'] += 1
+            return
+        with self._lock:
+            self.counters['written'] += written
+            self.last_written_at = datetime.now().isoformat()
+
+
+_recorder: Optional[HistoryRecorder] = None
+_recorder_lock = threading.Lock()
+
+
+def get_history_recorder() -> HistoryRecorder:
+    """Return the process-wide history recorder (drained again at exit)"""
+    global _recorder
+    if _recorder is None:
+        with _recorder_lock:
+            if _recorder is None:
+                _recorder = HistoryRecorder()
+                atexit.register(_recorder.flush)
+    return _recorder
+
+
+def record_api_records(commodity: str, records: Iterable[Dict], source: str = 'data.gov.in') -> bool:
+    """
+    Queue raw data.gov.in records to be recorded under a scraper crop key
+
+    Returns at once; False when the database is unavailable or the
+    writer is too far behind to take more.
+    """
+    if not DATABASE_AVAILABLE:
+        return False
+    return get_history_recorder().submit(commodity, records, source)
+
+
+def history_stats() -> Dict:
+    """Recorder counters for health reporting (no database query)"""
+    if not DATABASE_AVAILABLE:
+        return {'available': False}
+    return {'available': True, **get_history_recorder().stats()}
@@ -1,11 +1,57 @@
 """
 Simple Price Prediction Module
 Uses moving averages to predict next week's prices
+
+predict_next_week() handles one series; predict_batch() computes the
+same forecast for thousands of series (e.g. crops x markets x weeks) in
+one NumPy pass.
+
+Fitted models (Holt, Holt-Winters with yearly seasonality, AR) implement
+the Forecaster interface. ForecastModelCache keeps their fitted state per
+(commodity, market) and refits only on drift or on a schedule, so serving
+a forecast is a cheap state update rather than a refit.
 """
 
-from typing import List, Dict, Tuple
+from typing import List, Dict, Optional, Sequence, Tuple
 from statistics import mean
+from datetime import date
+import copy
+import json
+import logging
 import math
+import os
+import threading
+
+from snapshot_writer import write_atomic
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Weights for the last 3 weeks, oldest first
+RECENT_WEIGHTS = (0.2, 0.3, 0.5)
+
+# Weekly points per seasonal cycle (yearly seasonality)
+SEASON_LENGTH_WEEKS = 52
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'data', 'json')
+FORECAST_MODELS_FILE = os.environ.get('FORECAST_MODELS_FILE', os.path.join(DATA_DIR, 'forecast_models.json'))
+
+# Refit when recent one-step errors exceed this multiple of the fitted error
+FORECAST_DRIFT_RATIO = float(os.environ.get('FORECAST_DRIFT_RATIO', '2.0'))
+# ...or when the fit is this old
+FORECAST_REFIT_DAYS = int(os.environ.get('FORECAST_REFIT_DAYS', '28'))
+
+# Recent one-step errors kept per series, and how many trigger a drift check
+DRIFT_WINDOW = 8
+DRIFT_MIN_POINTS = 3
+
+# Trailing one-step errors used to choose between fitted models
+SELECTION_POINTS = 13
 
 
 class SimplePricePredictor:
@@ -45,12 +91,28 @@ class SimplePricePredictor:
         # Calculate volatility (standard deviation)
         volatility = self._calculate_volatility(historical_prices)
         
+        return self._forecast(historical_prices[-3:], trend, volatility, len(historical_prices))
+    
+    def predict_from_stats(self, stats) -> Dict:
+        """
+        predict_next_week from an incremental_stats.RunningPriceStats
+
+        Uses the running mean, slope and Welford variance instead of
+        rescanning the history, so the cost is O(1) in the window length.
+        """
+        if stats.count < 3:
+            return self.predict_next_week(list(stats.values))
+        return self._forecast(stats.recent(3), stats.trend(), stats.stddev(), stats.count)
+    
+    def _forecast(self, recent_prices: List[float], trend: float, volatility: float, data_points: int) -> Dict:
+        """Turn the last 3 prices, normalized trend and volatility into a prediction"""
+        
         # Predict next price using weighted average with trend
-        current_price = historical_prices[-1]
+        current_price = recent_prices[-1]
         
         # Weight recent data more heavily
-        weights = [0.2, 0.3, 0.5]  # For last 3 weeks
-        weighted_recent = sum(p * w for p, w in zip(historical_prices[-3:], weights))
+        weights = RECENT_WEIGHTS  # For last 3 weeks
+        weighted_recent = sum(p * w for p, w in zip(recent_prices, weights))
         
         # Apply trend
         predicted = weighted_recent + (trend * current_price * 0.1)
@@ -66,7 +128,7 @@ class SimplePricePredictor:
         max_price = predicted + margin
         
         # Determine confidence based on volatility
-        confidence = self._calculate_confidence(volatility, len(historical_prices))
+        confidence = self._calculate_confidence(volatility, data_points)
         
         # Determine trend direction
         if trend > 0.02:
@@ -142,14 +204,146 @@ class SimplePricePredictor:
         
         return max(0.0, min(1.0, confidence))
     
-    def analyze_seasonal_pattern(self, prices: List[float], weeks: int = 8) -> Dict:
+    def predict_batch(self, series, mask=None) -> Dict:
+        """
+        Vectorized predict_next_week for many series at once
+
+        Args:
+            series: Array shaped (..., weeks), oldest to newest, e.g.
+                crops x markets x weeks. NaN marks a missing week; the
+                remaining values of each series are used in order, exactly
+                as if they had been passed to predict_next_week as a list.
+            mask: Optional boolean array of the same shape, True where a
+                value is present (combined with the NaN check)
+
+        Returns:
+            Dict of arrays shaped series.shape[:-1]: predicted_price,
+            confidence (0-100), trend, trend_direction, min_price,
+            max_price, volatility, trend_strength, points and valid
+            (False where fewer than 3 points exist; those rows follow the
+            scalar "insufficient data" result)
+        """
+        if not NUMPY_AVAILABLE:
+            raise ImportError('numpy is required for predict_batch')
+
+        values = np.asarray(series, dtype=float)
+        if values.ndim == 1:
+            values = values[np.newaxis, :]
+        present = ~np.isnan(values)
+        if mask is not None:
+            present &= np.asarray(mask, dtype=bool)
+
+        lead_shape = values.shape[:-1]
+        weeks = values.shape[-1]
+        values = values.reshape(-1, weeks)
+        present = present.reshape(-1, weeks)
+
+        # Compact each row so its present values sit at positions 0..n-1, in order
+        order = np.argsort(~present, axis=1, kind='stable')
+        present = np.take_along_axis(present, order, axis=1)
+        values = np.where(present, np.take_along_axis(values, order, axis=1), 0.0)
+
+        points = present.sum(axis=1)
+        valid = points >= 3
+        count = np.maximum(points, 1)
+        zeros = np.zeros(len(points))
+
+        # Moving averages and linear-regression trend (see _calculate_trend)
+        avg = values.sum(axis=1) / count
+        positions = np.arange(weeks, dtype=float)
+        x_dev = np.where(present, positions - ((points - 1) / 2)[:, np.newaxis], 0.0)
+        y_dev = np.where(present, values - avg[:, np.newaxis], 0.0)
+        numerator = (x_dev * y_dev).sum(axis=1)
+        denominator = (x_dev ** 2).sum(axis=1)
+        slope = np.divide(numerator, denominator, out=zeros.copy(), where=denominator != 0)
+        trend = np.divide(slope, avg, out=zeros.copy(), where=avg > 0)
+
+        # Population standard deviation (see _calculate_volatility)
+        volatility = np.sqrt((y_dev ** 2).sum(axis=1) / count)
+
+        last_index = np.maximum(points - 1, 0)
+        recent_index = np.clip(last_index[:, np.newaxis] - np.array([2, 1, 0]), 0, None)
+        recent = np.take_along_axis(values, recent_index, axis=1)
+        current = recent[:, 2]
+
+        weighted_recent = recent[:, 0] * RECENT_WEIGHTS[0] + recent[:, 1] * RECENT_WEIGHTS[1] + recent[:, 2] * RECENT_WEIGHTS[2]
+        predicted = weighted_recent + (trend * current * 0.1)
+        predicted = np.maximum(current * 0.85, np.minimum(current * 1.15, predicted))
+
+        margin = volatility * 0.5
+        min_price = np.maximum(0, predicted - margin)
+        max_price = predicted + margin
+
+        # Same weighting as _calculate_confidence
+        volatility_factor = np.maximum(0, 1 - (volatility / 100))
+        data_factor = np.minimum(1.0, points / 12)
+        confidence = np.clip((volatility_factor * 0.7) + (data_factor * 0.3), 0.0, 1.0) * 100
+
+        direction = np.where(trend > 0.02, 'upward', np.where(trend < -0.02, 'downward', 'stable'))
+
+        # Fewer than 3 points: last value (or 0), no confidence, unknown trend
+        result = {
+            'predicted_price': np.where(valid, predicted, np.where(points > 0, current, 0.0)),
+            'confidence': np.where(valid, confidence, 0.0),
+            'trend': np.where(valid, trend, 0.0),
+            'trend_direction': np.where(valid, direction, 'unknown'),
+            'min_price': np.where(valid, min_price, 0.0),
+            'max_price': np.where(valid, max_price, 0.0),
+            'volatility': np.where(valid, volatility, 0.0),
+            'trend_strength': np.where(valid, np.abs(trend), 0.0),
+            'points': points,
+            'valid': valid,
+        }
+        return {key: value.reshape(lead_shape) for key, value in result.items()}
+
+    def predict_many(self, histories: Sequence[Sequence[float]]) -> List[Dict]:
+        """
+        predict_next_week for a list of (ragged) price histories
+
+        Returns the same dicts predict_next_week would, computed in one
+        vectorized pass when NumPy is available.
+        """
+        if not NUMPY_AVAILABLE:
+            return [self.predict_next_week(list(history)) for history in histories]
+        if not histories:
+            return []
+
+        weeks = max(1, max(len(history) for history in histories))
+        matrix = np.full((len(histories), weeks), np.nan)
+        for row, history in enumerate(histories):
+            if len(history):
+                matrix[row, :len(history)] = history
+
+        return batch_to_dicts(self.predict_batch(matrix))
+
+    def analyze_seasonal_pattern(self, prices: List[float], weeks: int = 8, fitted_state: Optional[Dict] = None) -> Dict:
         """
         Analyze if there's a seasonal pattern in price data
-        
+
+        Given a Holt-Winters state already fitted by ForecastModelCache
+        (never fitted here, so this stays cheap on request paths), its
+        yearly indices give the factor for next week; otherwise it falls
+        back to counting recent up-moves.
+
         Returns:
             Dict with seasonal_factor, pattern_detected, description
         """
-        
+
+        factor = seasonal_factor(fitted_state)
+        if factor is not None:
+            detected = abs(factor - 1) >= 0.05
+            if not detected:
+                description = 'No clear seasonal pattern'
+            elif factor > 1:
+                description = f'Seasonal high: prices usually {round((factor - 1) * 100)}% above trend this week'
+            else:
+                description = f'Seasonal low: prices usually {round((1 - factor) * 100)}% below trend this week'
+            return {
+                'seasonal_factor': factor,
+                'pattern_detected': detected,
+                'description': description
+            }
+
         if len(prices) < weeks:
             return {
                 'seasonal_factor': 1.0,
@@ -184,6 +378,451 @@ class SimplePricePredictor:
             }
 
 
+def batch_to_dicts(batch: Dict) -> List[Dict]:
+    """Flatten a predict_batch result into predict_next_week-style dicts"""
+    columns = {key: np.asarray(value).reshape(-1).tolist() for key, value in batch.items()}
+    results = []
+    for row in range(len(columns['valid'])):
+        if not columns['valid'][row]:
+            results.append({
+                'predicted_price': columns['predicted_price'][row],
+                'confidence': 0,
+                'trend_direction': 'unknown',
+                'min_price': 0,
+                'max_price': 0,
+                'error': 'Insufficient historical data'
+            })
+            continue
+
+        results.append({
+            'predicted_price': round(columns['predicted_price'][row], 2),
+            'confidence': round(columns['confidence'][row], 1),
+            'trend_direction': columns['trend_direction'][row],
+            'min_price': round(columns['min_price'][row], 2),
+            'max_price': round(columns['max_price'][row], 2),
+            'volatility': round(columns['volatility'][row], 2),
+            'trend_strength': columns['trend_strength'][row]
+        })
+    return results
+
+
+class Forecaster:
+    """
+    Interface for fitted forecast models
+
+    fit() estimates parameters and returns a JSON-serializable state;
+    update() folds one new observation into that state with the
+    parameters held fixed; forecast() reads predictions off the state.
+    Subclasses provide parameter_grid(), initial_state() and the two
+    state methods; fit() picks the grid point with the lowest one-step
+    squared error.
+    """
+
+    name = ''
+
+    def min_points(self) -> int:
+        raise NotImplementedError
+
+    def parameter_grid(self, values: List[float]):
+        raise NotImplementedError
+
+    def initial_state(self, values: List[float], params: Dict) -> Dict:
+        """State after the first state['seen'] values"""
+        raise NotImplementedError
+
+    def update(self, state: Dict, value: float) -> float:
+        """Apply one observation in place; returns the one-step error"""
+        raise NotImplementedError
+
+    def forecast(self, state: Dict, horizon: int = 1) -> List[float]:
+        raise NotImplementedError
+
+    def fit(self, values: List[float]) -> Optional[Tuple[Dict, List[float]]]:
+        """
+        Fit to a series (oldest to newest)
+
+        Returns (state, one-step errors over the non-warm-up points), or
+        None if the series is too short for this model.
+        """
+        values = [float(value) for value in values]
+        if len(values) < self.min_points():
+            return None
+
+        best = None
+        for params in self.parameter_grid(values):
+            state = self.initial_state(values, params)
+            errors = [self.update(state, value) for value in values[state['seen']:]]
+            sse = sum(error * error for error in errors)
+            if best is None or sse < best[0]:
+                best = (sse, state, errors)
+
+        if best is None:
+            return None
+        _, state, errors = best
+        return state, errors
+
+
+class HoltForecaster(Forecaster):
+    """Double exponential smoothing: level + trend"""
+
+    name = 'holt'
+    ALPHAS = (0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9)
+    BETAS = (0.01, 0.05, 0.1, 0.2, 0.3)
+
+    def min_points(self) -> int:
+        return 4
+
+    def parameter_grid(self, values):
+        for alpha in self.ALPHAS:
+            for beta in self.BETAS:
+                yield {'alpha': alpha, 'beta': beta}
+
+    def initial_state(self, values, params):
+        return {**params, 'level': values[0], 'trend': values[1] - values[0], 'seen': 1}
+
+    def update(self, state, value):
+        level, trend = state['level'], state['trend']
+        error = value - (level + trend)
+        state['level'] = state['alpha'] * value + (1 - state['alpha']) * (level + trend)
+        state['trend'] = state['beta'] * (state['level'] - level) + (1 - state['beta']) * trend
+        state['seen'] += 1
+        return error
+
+    def forecast(self, state, horizon=1):
+        return [state['level'] + step * state['trend'] for step in range(1, horizon + 1)]
+
+
+class HoltWintersForecaster(Forecaster):
+    """
+    Additive Holt-Winters: level + trend + seasonal index
+
+    With weekly points and season_length=52 this captures the yearly
+    cycle (e.g. tomato and onion gluts and shortages). Needs two full
+    seasons: the first initializes the indices, the rest are fitted.
+    """
+
+    name = 'holt_winters'
+    ALPHAS = (0.1, 0.3, 0.5, 0.7, 0.9)
+    BETAS = (0.01, 0.05, 0.2)
+    GAMMAS = (0.05, 0.2, 0.4)
+
+    def __init__(self, season_length: int = SEASON_LENGTH_WEEKS):
+        self.season_length = max(2, int(season_length))
+
+    def min_points(self) -> int:
+        return 2 * self.season_length
+
+    def parameter_grid(self, values):
+        for alpha in self.ALPHAS:
+            for beta in self.BETAS:
+                for gamma in self.GAMMAS:
+                    yield {'alpha': alpha, 'beta': beta, 'gamma': gamma}
+
+    def initial_state(self, values, params):
+        m = self.season_length
+        first = mean(values[:m])
+        trend = (mean(values[m:2 * m]) - first) / m
+        # Indices are deviations from the first season's trend line
+        seasonals = [values[i] - (first + trend * (i - (m - 1) / 2)) for i in range(m)]
+        return {
+            **params,
+            'season_length': m,
+            'level': first + trend * (m - 1) / 2,
+            'trend': trend,
+            'seasonals': seasonals,
+            'phase': 0,
+            'seen': m,
+        }
+
+    def update(self, state, value):
+        level, trend = state['level'], state['trend']
+        phase = state['phase']
+        seasonal = state['seasonals'][phase]
+        error = value - (level + trend + seasonal)
+
+        state['level'] = state['alpha'] * (value - seasonal) + (1 - state['alpha']) * (level + trend)
+        state['trend'] = state['beta'] * (state['level'] - level) + (1 - state['beta']) * trend
+        state['seasonals'][phase] = state['gamma'] * (value - state['level']) + (1 - state['gamma']) * seasonal
+        state['phase'] = (phase + 1) % state['season_length']
+        state['seen'] += 1
+        return error
+
+    def forecast(self, state, horizon=1):
+        m = state['season_length']
+        return [
+            state['level'] + step * state['trend'] + state['seasonals'][(state['phase'] + step - 1) % m]
+            for step in range(1, horizon + 1)
+        ]
+
+
+class ARForecaster(Forecaster):
+    """Autoregressive model y[t] = c + sum(phi[i] * y[t-1-i]), least-squares fit"""
+
+    name = 'ar'
+
+    def __init__(self, order: int = 3):
+        self.order = max(1, int(order))
+
+    def min_points(self) -> int:
+        # Enough rows to estimate order + 1 coefficients with some slack
+        return 3 * (self.order + 1)
+
+    def parameter_grid(self, values):
+        p = self.order
+        rows = [[1.0] + [values[t - 1 - i] for i in range(p)] for t in range(p, len(values))]
+        targets = values[p:]
+        coefficients = _least_squares(rows, targets)
+        yield {'intercept': coefficients[0], 'coefficients': coefficients[1:]}
+
+    def initial_state(self, values, params):
+        # lags: most recent value first
+        return {**params, 'lags': list(reversed(values[:self.order])), 'seen': self.order}
+
+    def _step(self, state, lags):
+        return state['intercept'] + sum(phi * lag for phi, lag in zip(state['coefficients'], lags))
+
+    def update(self, state, value):
+        error = value - self._step(state, state['lags'])
+        state['lags'] = [value] + state['lags'][:-1]
+        state['seen'] += 1
+        return error
+
+    def forecast(self, state, horizon=1):
+        lags = list(state['lags'])
+        predictions = []
+        for _ in range(horizon):
+            predicted = self._step(state, lags)
+            predictions.append(predicted)
+            lags = [predicted] + lags[:-1]
+        return predictions
+
+
+def _least_squares(rows: List[List[float]], targets: List[float]) -> List[float]:
+    """Solve min ||rows @ x - targets|| (NumPy lstsq, or normal equations)"""
+    if NUMPY_AVAILABLE:
+        solution, *_ = np.linalg.lstsq(np.asarray(rows), np.asarray(targets), rcond=None)
+        return [float(value) for value in solution]
+
+    k = len(rows[0])
+    # Normal equations with a tiny ridge so collinear lags stay solvable
+    matrix = [[sum(row[i] * row[j] for row in rows) + (1e-9 if i == j else 0.0) for j in range(k)] for i in range(k)]
+    vector = [sum(row[i] * target for row, target in zip(rows, targets)) for i in range(k)]
+
+    # Gaussian elimination with partial pivoting
+    for col in range(k):
+        pivot = max(range(col, k), key=lambda r: abs(matrix[r][col]))
+        matrix[col], matrix[pivot] = matrix[pivot], matrix[col]
+        vector[col], vector[pivot] = vector[pivot], vector[col]
+        if matrix[col][col] == 0:
+            continue
+        for r in range(col + 1, k):
+            factor = matrix[r][col] / matrix[col][col]
+            for c in range(col, k):
+                matrix[r][c] -= factor * matrix[col][c]
+            vector[r] -= factor * vector[col]
+
+    solution = [0.0] * k
+    for row in range(k - 1, -1, -1):
+        if matrix[row][row] == 0:
+            continue
+        residual = vector[row] - sum(matrix[row][c] * solution[c] for c in range(row + 1, k))
+        solution[row] = residual / matrix[row][row]
+    return solution
+
+
+# Registry of pluggable forecasters, by name
+FORECASTERS: Dict[str, Forecaster] = {
+    forecaster.name: forecaster
+    for forecaster in (HoltForecaster(), HoltWintersForecaster(), ARForecaster())
+}
+
+
+def fit_best_forecaster(values: Sequence[float], forecasters: Optional[Sequence[Forecaster]] = None) -> Optional[Dict]:
+    """
+    Fit every forecaster the series is long enough for and keep the best
+
+    Models are compared on their mean absolute one-step error over the
+    last SELECTION_POINTS points. Returns {'model', 'state', 'mae'} or
+    None when no model fits.
+    """
+    best = None
+    for forecaster in (forecasters or FORECASTERS.values()):
+        fitted = forecaster.fit(values)
+        if fitted is None:
+            continue
+        state, errors = fitted
+        if not errors:
+            continue
+        tail = errors[-SELECTION_POINTS:]
+        score = sum(abs(error) for error in tail) / len(tail)
+        if best is None or score < best['mae']:
+            best = {'model': forecaster.name, 'state': state, 'mae': score}
+    return best
+
+
+def seasonal_factor(state: Dict) -> Optional[float]:
+    """Next point's seasonal index relative to the level for a Holt-Winters state, else None"""
+    if not state or 'seasonals' not in state or state.get('level', 0) <= 0:
+        return None
+    return round((state['level'] + state['seasonals'][state['phase']]) / state['level'], 3)
+
+
+class ForecastModelCache:
+    """
+    Fitted forecaster state per (commodity, market), saved as one JSON file
+
+    forecast() applies new observations to the stored state with the
+    fitted parameters unchanged, and refits (choosing the model again)
+    only when the series is new, the fit is older than refit_days, or the
+    recent one-step error exceeds drift_ratio times the fitted error.
+
+    The newest point is provisional (the current week's rollup is revised
+    on every run), so the stored state only covers the points before it;
+    the newest value is applied to a copy of that state for each forecast.
+    """
+
+    def __init__(
+        self,
+        path: str = FORECAST_MODELS_FILE,
+        refit_days: int = FORECAST_REFIT_DAYS,
+        drift_ratio: float = FORECAST_DRIFT_RATIO
+    ):
+        self.path = path
+        self.refit_days = refit_days
+        self.drift_ratio = drift_ratio
+        self.refits = 0
+        self._entries: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    @staticmethod
+    def _key(commodity: str, market: str) -> str:
+        return f"{(commodity or '').strip().lower()}|{(market or '').strip().lower()}"
+
+    def forecast(
+        self,
+        commodity: str,
+        market: str,
+        points: Sequence[Tuple[str, float]],
+        horizon: int = 1,
+        today: Optional[date] = None,
+        allow_refit: bool = True
+    ) -> Optional[Dict]:
+        """
+        Forecast the next horizon points of a (date, price) series
+
+        With allow_refit False (e.g. past a time budget) a stored fit is
+        served even if it is due for a refit, and a series without one
+        returns None.
+
+        Returns {'model', 'forecast', 'predicted_price', 'mae',
+        'fitted_at', 'refitted', 'points', 'seasonal_factor'} or None if
+        the series is too short for any model. seasonal_factor is set
+        only for Holt-Winters fits.
+        """
+        today = today or date.today()
+        points = sorted((obs_date, float(price)) for obs_date, price in points)
+        if len(points) < 2:
+            return None
+        settled, (latest_date, latest_price) = points[:-1], points[-1]
+        key = self._key(commodity, market)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                drifted = not self._apply(entry, settled)
+                if allow_refit and (drifted or self._stale(entry, today)):
+                    entry = None
+
+            refitted = entry is None
+            if refitted:
+                if not allow_refit:
+                    return None
+                entry = self._fit(settled, today)
+                if entry is None:
+                    return None
+                self._entries[key] = entry
+
+            forecaster = FORECASTERS[entry['model']]
+            state = copy.deepcopy(entry['state'])
+            if latest_date > entry['last_date']:
+                forecaster.update(state, latest_price)
+            predictions = [max(0.0, value) for value in forecaster.forecast(state, horizon)]
+            return {
+                'model': entry['model'],
+                'forecast': [round(value, 2) for value in predictions],
+                'predicted_price': round(predictions[0], 2),
+                'mae': round(entry['mae'], 2),
+                'fitted_at': entry['fitted_at'],
+                'refitted': refitted,
+                'points': state['seen'],
+                'seasonal_factor': seasonal_factor(state),
+            }
+
+    def _stale(self, entry: Dict, today: date) -> bool:
+        try:
+            fitted_at = date.fromisoformat(entry['fitted_at'])
+        except (KeyError, TypeError, ValueError):
+            return True
+        return (today - fitted_at).days >= self.refit_days or entry.get('model') not in FORECASTERS
+
+    def _apply(self, entry: Dict, points: List[Tuple[str, float]]) -> bool:
+        """Fold settled points newer than the entry into its state; False if drift calls for a refit"""
+        forecaster = FORECASTERS.get(entry['model'])
+        if forecaster is None:
+            return False
+        errors = entry['errors']
+        for obs_date, price in points:
+            if obs_date <= entry['last_date']:
+                continue
+            errors.append(abs(forecaster.update(entry['state'], price)))
+            entry['last_date'] = obs_date
+        del errors[:-DRIFT_WINDOW]
+
+        if len(errors) < DRIFT_MIN_POINTS:
+            return True
+        # Floor the reference error so a near-perfect fit does not refit on noise
+        reference = max(entry['mae'], 0.01 * abs(points[-1][1]))
+        return mean(errors) <= self.drift_ratio * reference
+
+    def _fit(self, points: List[Tuple[str, float]], today: date) -> Optional[Dict]:
+        fitted = fit_best_forecaster([price for _, price in points])
+        if fitted is None:
+            return None
+        self.refits += 1
+        return {
+            **fitted,
+            'fitted_at': today.isoformat(),
+            'last_date': points[-1][0],
+            'errors': [],
+        }
+
+    def save(self) -> bool:
+        with self._lock:
+            data = json.dumps({'series': self._entries}, separators=(',', ':'))
+        try:
+            write_atomic(self.path, data.encode('utf-8'))
+            return True
+        except OSError as e:
+            logger.warning(f"⚠️ Could not save forecast models to {self.path}: {e}")
+            return False
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as file_handle:
+                data = json.load(file_handle)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️ Ignoring unreadable forecast models file {self.path}: {e}")
+            return
+
+        for key, entry in (data.get('series') or {}).items():
+            if isinstance(entry, dict) and {'model', 'state', 'mae', 'last_date'} <= entry.keys():
+                entry.setdefault('errors', [])
+                self._entries[key] = entry
+
+
 # Convenience function
 def predict_crop_price(historical_prices: List[float]) -> Dict:
     """Quick function to get price prediction"""
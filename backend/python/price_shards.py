@@ -0,0 +1,156 @@
+"""
+Static per-crop price shards for SmartSheti
+Pre-canonicalized /api/realprice payloads the CDN can serve directly
+
+    data/json/prices/onion.json               (what /api/realprice/onion returns)
+    data/json/prices/onion/lasalgaon.json     (...?market=Lasalgaon)
+    data/json/prices/manifest.json            (versions and hashes)
+
+Shards are built from the cached prices.json entries with the same code
+the API uses for its cached path, so a shard is byte-for-byte the payload
+the function would have produced. Unchanged shards are not rewritten and
+keep their version.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+from datetime import datetime
+from typing import Dict
+
+from price_canonical import canonicalize_cached_entry, get_crop_lookup_keys
+from snapshot_writer import VERSION_KEY, write_atomic
+
+logger = logging.getLogger(__name__)
+
+SHARDS_DIR = os.environ.get(
+    'PRICE_SHARDS_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'data', 'json', 'prices')
+)
+MANIFEST_NAME = 'manifest.json'
+
+
+def shard_slug(name: str) -> str:
+    """File-name form of a crop or market name ('Pune APMC' -> 'pune-apmc')"""
+    return re.sub(r'[^a-z0-9]+', '-', (name or '').lower()).strip('-')
+
+
+def _read_manifest(directory: str) -> Dict:
+    try:
+        with open(os.path.join(directory, MANIFEST_NAME), 'r', encoding='utf-8') as file_handle:
+            manifest = json.load(file_handle)
+        return manifest if isinstance(manifest, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+class _ShardWriter:
+    """Writes changed shards and tracks their manifest entries"""
+
+    def __init__(self, directory: str, previous: Dict):
+        self.directory = directory
+        self.previous = previous
+        self.files: Dict[str, Dict] = {}
+        self.written = 0
+
+    def write(self, relative_path: str, payload: Dict) -> Dict:
+        encoded = json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        digest = hashlib.sha256(encoded).hexdigest()
+        path = os.path.join(self.directory, relative_path)
+
+        known = self.previous.get(relative_path, {})
+        if known.get('hash') == digest and os.path.exists(path):
+            version = int(known.get('version', 1))
+        else:
+            write_atomic(path, encoded)
+            version = int(known.get('version', 0)) + 1
+            self.written += 1
+
+        entry = {'hash': digest, 'version': version}
+        self.files[relative_path] = entry
+        return {'path': relative_path, **entry}
+
+
+def write_price_shards(prices: Dict, state: str = 'Maharashtra', directory: str = SHARDS_DIR) -> Dict:
+    """
+    Emit per-crop and per-market shards plus a manifest from a prices.json snapshot
+
+    Args:
+        prices: prices.json content (crop entries plus lastUpdated/source)
+        state: State the cached entries belong to
+        directory: Shard directory
+
+    Returns:
+        Dict with crops, files, written and removed counts and the manifest version
+    """
+    meta = {key: prices[key] for key in ('lastUpdated', 'source') if key in prices}
+    previous = _read_manifest(directory)
+    writer = _ShardWriter(directory, previous.get('files', {}))
+    crops = {}
+
+    for crop, entry in prices.items():
+        if not isinstance(entry, dict) or 'error' in entry:
+            continue
+
+        # Shards under every alias the frontend might ask for (soybean/soyabean)
+        for crop_key in get_crop_lookup_keys(crop):
+            if crop_key != crop and isinstance(prices.get(crop_key), dict):
+                continue
+
+            payload = canonicalize_cached_entry(crop_key, state, '', entry, meta)
+            if not payload:
+                continue
+
+            crop_slug = shard_slug(crop_key)
+            markets = {}
+            for market_row in payload['market_comparison']:
+                market_payload = canonicalize_cached_entry(crop_key, state, market_row['market'], entry, meta)
+                if market_payload:
+                    markets[market_row['market']] = writer.write(
+                        f"{crop_slug}/{shard_slug(market_row['market'])}.json",
+                        market_payload
+                    )
+
+            crops[crop_key] = {
+                **writer.write(f'{crop_slug}.json', payload),
+                'timestamp': payload['timestamp'],
+                'markets': markets,
+            }
+
+    # Shards for markets (or crops) that dropped out of the snapshot
+    removed = 0
+    for relative_path in set(writer.previous) - set(writer.files):
+        try:
+            os.remove(os.path.join(directory, relative_path))
+            removed += 1
+        except OSError:
+            pass
+
+    manifest_version = int(previous.get('version', 0) or 0)
+    if writer.written or removed or not previous:
+        manifest_version += 1
+        manifest = {
+            'version': manifest_version,
+            'snapshot_version': prices.get(VERSION_KEY),
+            'generated_at': datetime.now().isoformat(),
+            'state': state,
+            'lastUpdated': meta.get('lastUpdated'),
+            'crops': crops,
+            'files': writer.files,
+        }
+        write_atomic(
+            os.path.join(directory, MANIFEST_NAME),
+            json.dumps(manifest, indent=2, ensure_ascii=False).encode('utf-8')
+        )
+        logger.info(f"💾 Wrote {writer.written} price shards for {len(crops)} crops (manifest v{manifest_version})")
+
+    return {
+        'crops': len(crops),
+        'files': len(writer.files),
+        'written': writer.written,
+        'removed': removed,
+        'manifest_version': manifest_version,
+    }
+
@@ -13,10 +13,25 @@ import json
 import time
 import logging
 import os
+import sys
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple
 from dataclasses import dataclass
 
+from http_client import http_get
+from lookup_memory import get_alias_learner
+from price_canonical import observed_weekly_series
+from price_history_store import record_api_records
+from snapshot_writer import publish_prices
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+try:
+    from database import init_db
+    DATABASE_AVAILABLE = True
+except ImportError:
+    DATABASE_AVAILABLE = False
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -71,12 +86,11 @@ class RealAGMARKNETScraper:
             'wholesale_prices': '35985678-0d79-46b4-9ed6-6f13308a1d24',  # Wholesale prices
         }
         
-        # Session for connection pooling
-        self.session = requests.Session()
-        self.session.headers.update({
+        # Requests go through the shared pooled session; these headers are sent per call
+        self.headers = {
             'User-Agent': 'SmartSheti Agricultural Platform/1.0',
             'Accept': 'application/json',
-        })
+        }
         
         # Crop name mappings (local names to API names)
         self.crop_mappings = {
@@ -163,8 +177,13 @@ class RealAGMARKNETScraper:
         if cached_data:
             return cached_data
         
-        # Get all possible names for this commodity
-        commodity_names = self.crop_mappings.get(commodity.lower(), [commodity.title()])
+        # Get all possible names for this commodity, best-performing alias first
+        alias_learner = get_alias_learner()
+        commodity_names = alias_learner.order(
+            commodity,
+            state,
+            self.crop_mappings.get(commodity.lower(), [commodity.title()])
+        )
         
         all_prices = []
         
@@ -185,7 +204,7 @@ class RealAGMARKNETScraper:
                 
                 # Make API request
                 url = f"{self.base_url}/{self.resource_ids['daily_prices']}"
-                response = self.session.get(url, params=params, timeout=15)
+                response = http_get(url, params=params, headers=self.headers, timeout=15)
                 
                 if response.status_code == 200:
                     data = response.json()
@@ -193,31 +212,16 @@ class RealAGMARKNETScraper:
                     
                     if records:
                         logger.info(f"✅ Found {len(records)} real price records for {commodity_name}")
-                        
-                        for record in records:
-                            try:
-                                price = CropPrice(
-                                    commodity=record.get('commodity', commodity_name),
-                                    variety=record.get('variety', 'Local'),
-                                    market=record.get('market', 'Unknown'),
-                                    district=record.get('district', 'Unknown'),
-                                    state=record.get('state', state),
-                                    min_price=float(record.get('min_price', 0)),
-                                    max_price=float(record.get('max_price', 0)),
-                                    modal_price=float(record.get('modal_price', 0)),
-                                    unit=record.get('unit', 'Quintal'),
-                                    arrival_date=record.get('arrival_date', datetime.now().strftime('%Y-%m-%d')),
-                                    source='REAL_API'
-                                )
-                                all_prices.append(price)
-                            except (ValueError, TypeError) as e:
-                                logger.warning(f"⚠️ Error parsing record: {e}")
-                                continue
+                        all_prices.extend(self._parse_records(records, commodity_name, state))
                         
                         # If we got data, break the loop (no need to try other names)
                         if all_prices:
+                            alias_learner.record_hit(commodity, state, commodity_name)
+                            record_api_records(commodity.lower(), records)
                             break
-                    else:
+                    
+                    alias_learner.record_miss(commodity, state, commodity_name)
+                    if not records:
                         logger.debug(f"No records found for {commodity_name}")
                         
                 elif response.status_code == 429:
@@ -242,6 +246,37 @@ class RealAGMARKNETScraper:
         
         return all_prices
     
+    def _parse_records(self, records: List[Dict], commodity_name: str, state: str) -> List[CropPrice]:
+        """Convert raw data.gov.in records into CropPrice objects"""
+        prices = []
+        for record in records:
+            try:
+                price = CropPrice(
+                    commodity=record.get('commodity', commodity_name),
+                    variety=record.get('variety', 'Local'),
+                    market=record.get('market', 'Unknown'),
+                    district=record.get('district', 'Unknown'),
+                    state=record.get('state', state),
+                    min_price=float(record.get('min_price', 0)),
+                    max_price=float(record.get('max_price', 0)),
+                    modal_price=float(record.get('modal_price', 0)),
+                    unit=record.get('unit', 'Quintal'),
+                    arrival_date=record.get('arrival_date', datetime.now().strftime('%Y-%m-%d')),
+                    source='REAL_API'
+                )
+                prices.append(price)
+            except (ValueError, TypeError) as e:
+                logger.warning(f"⚠️ Error parsing record: {e}")
+                continue
+        return prices
+    
+    def prime_cache(self, commodity: str, state: str, records: List[Dict]) -> List[CropPrice]:
+        """Fill the cache for a commodity from already-fetched records (bulk ingest stores them itself)"""
+        prices = self._parse_records(records, commodity, state)
+        if prices:
+            self._set_cache(self._get_cache_key(commodity, state), prices)
+        return prices
+    
     def get_current_price(
         self, 
         commodity: str, 
@@ -395,12 +430,18 @@ class RealAGMARKNETScraper:
             mock_count = 0
             
             for crop, price_data in all_prices.items():
-                # Generate historical trend data (last 8 weeks)
+                # Weekly rollups (₹/quintal) when recorded, generated trend otherwise
                 current = price_data['current_price']
-                historical = self._generate_historical_trend(current, crop)
+                observed = observed_weekly_series(crop, per='quintal')
+                if observed:
+                    labels = [week_start for week_start, _ in observed]
+                    historical = [price for _, price in observed]
+                else:
+                    labels = ['7W ago', '6W ago', '5W ago', '4W ago', '3W ago', '2W ago', '1W ago', 'Current']
+                    historical = self._generate_historical_trend(current, crop)
                 
                 output_data[crop] = {
-                    'labels': ['7W ago', '6W ago', '5W ago', '4W ago', '3W ago', '2W ago', '1W ago', 'Current'],
+                    'labels': labels,
                     'data': historical,
                     'color': self._get_crop_color(crop),
                     'state': price_data.get('state', 'Maharashtra'),
@@ -414,11 +455,22 @@ class RealAGMARKNETScraper:
                 else:
                     mock_count += 1
             
-            # Save to file
-            with open(output_file, 'w', encoding='utf-8') as f:
-                json.dump(output_data, f, indent=2, ensure_ascii=False)
+            # The API serves from the SQLite snapshot; the JSON file is an export
+            if DATABASE_AVAILABLE:
+                try:
+                    init_db()
+                except Exception as e:
+                    logger.warning(f"⚠️ Price snapshot database not initialized: {e}")
+            
+            # Save to file (atomic; skipped when no price changed) and replace the SQLite snapshot
+            snapshot = publish_prices(output_file, output_data)
             
-            logger.info(f"💾 Saved prices to {output_file}")
+            if snapshot['written']:
+                logger.info(f"💾 Saved prices to {output_file} (v{snapshot['version']})")
+            else:
+                logger.info(f"💾 Prices unchanged, kept {output_file} at v{snapshot['version']}")
+            if snapshot['database']:
+                logger.info(f"💾 Updated price snapshot with {len(all_prices)} crops")
             logger.info(f"📊 Summary: {real_count} real API, {mock_count} mock fallback")
             
             return True
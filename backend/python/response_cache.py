@@ -0,0 +1,153 @@
+"""
+In-process response cache for SmartSheti price APIs
+Bounded LRU cache with per-entry TTL and stale-while-revalidate
+
+Used by api/index.py to keep finished /api/realprice payloads warm so
+repeated lookups for the same crop/state/market skip the upstream chain.
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class _CacheEntry:
+    """Single cached value with its freshness deadline"""
+
+    __slots__ = ('value', 'expires_at')
+
+    def __init__(self, value: Any, expires_at: float):
+        self.value = value
+        self.expires_at = expires_at
+
+
+class ResponseCache:
+    """
+    Size-capped LRU cache with stale-while-revalidate semantics
+
+    Fresh entries are returned directly. Entries past their TTL but still
+    inside the stale window are returned immediately while a single
+    background thread reloads them. Entries older than that are reloaded
+    inline. The least recently accessed entry is evicted once the cache
+    is full.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl_seconds: float = 1800, max_stale_seconds: float = 7200):
+        self.max_entries = max(1, max_entries)
+        self.ttl_seconds = ttl_seconds
+        self.max_stale_seconds = max_stale_seconds
+        self._entries: 'OrderedDict[Hashable, _CacheEntry]' = OrderedDict()
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self._stats = {
+            'hits': 0,
+            'stale_hits': 0,
+            'misses': 0,
+            'refreshes': 0,
+            'evictions': 0,
+        }
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return a fresh cached value or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() >= entry.expires_at:
+                return None
+            self._entries.move_to_end(key)
+            return entry.value
+
+    def set(self, key: Hashable, value: Any, ttl_seconds: Optional[float] = None):
+        """Store a value, evicting the least recently used entries if needed"""
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        with self._lock:
+            self._entries[key] = _CacheEntry(value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    def invalidate(self, key: Hashable):
+        """Drop a single entry"""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        """Drop every entry"""
+        with self._lock:
+            self._entries.clear()
+
+    def get_or_load(
+        self,
+        key: Hashable,
+        loader: Callable[[], Any],
+        ttl_for: Optional[Callable[[Any], float]] = None
+    ) -> Any:
+        """
+        Return the cached value for key, loading it when missing or expired
+
+        Args:
+            key: Cache key
+            loader: Zero-argument callable producing the value
+            ttl_for: Optional callable mapping a loaded value to its TTL
+
+        Returns:
+            Cached or freshly loaded value (None results are not cached)
+        """
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+
+                if now < entry.expires_at:
+                    self._stats['hits'] += 1
+                    return entry.value
+
+                if now < entry.expires_at + self.max_stale_seconds:
+                    self._stats['stale_hits'] += 1
+                    if key not in self._refreshing:
+                        self._refreshing.add(key)
+                        self._stats['refreshes'] += 1
+                        threading.Thread(
+                            target=self._refresh,
+                            args=(key, loader, ttl_for),
+                            daemon=True
+                        ).start()
+                    return entry.value
+
+            self._stats['misses'] += 1
+
+        value = loader()
+        self._store(key, value, ttl_for)
+        return value
+
+    def stats(self) -> Dict:
+        """Return counters and current size for health reporting"""
+        with self._lock:
+            return {
+                **self._stats,
+                'size': len(self._entries),
+                'max_entries': self.max_entries,
+                'refreshing': len(self._refreshing),
+            }
+
+    def _store(self, key: Hashable, value: Any, ttl_for: Optional[Callable[[Any], float]]):
+        if value is None:
+            return
+        ttl = ttl_for(value) if ttl_for else None
+        self.set(key, value, ttl)
+
+    def _refresh(self, key: Hashable, loader: Callable[[], Any], ttl_for: Optional[Callable[[Any], float]]):
+        """Reload a stale entry in the background, keeping the old value on failure"""
+        try:
+            self._store(key, loader(), ttl_for)
+        except Exception as e:
+            logger.error(f"❌ Background refresh failed for {key}: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
@@ -0,0 +1,274 @@
+"""
+Atomic, versioned prices.json snapshots for SmartSheti
+Every prices writer (cron job, scraper, consolidator) goes through
+publish_prices(), which writes the file with write_snapshot() and replaces
+that file's SQLite copy (the one the API reads) with the same content
+
+A snapshot is written to a temp file, fsynced and renamed over the
+target, so readers see either the old or the new file, never half of
+one. Writes whose content is unchanged (ignoring timestamps) are skipped,
+and each real write bumps snapshot_version and keeps a copy in
+
+    data/json/generations/prices.000042.json
+
+so readers have a cheap value to key caches and ETags on and a last
+good generation to fall back to.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import sys
+import threading
+from typing import Dict, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: in-process locking only
+    fcntl = None
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+try:
+    from database import PriceSnapshot, file_signature, snapshot_source
+    DATABASE_AVAILABLE = True
+except ImportError:
+    DATABASE_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Generations kept next to each snapshot
+SNAPSHOT_GENERATIONS = int(os.environ.get('SNAPSHOT_GENERATIONS', '5'))
+GENERATIONS_DIRNAME = 'generations'
+
+VERSION_KEY = 'snapshot_version'
+HASH_KEY = 'snapshot_hash'
+
+# Keys that change on every run without the prices changing; ignored when hashing
+VOLATILE_KEYS = frozenset({'lastUpdated', 'last_updated', 'timestamp', VERSION_KEY, HASH_KEY})
+
+_write_lock = threading.Lock()
+_read_cache: Dict[str, Tuple[Tuple[int, int], Dict]] = {}
+_read_cache_lock = threading.Lock()
+
+
+def content_hash(data: Dict) -> str:
+    """SHA-256 of the snapshot content, ignoring timestamps and version fields"""
+    stable = {
+        key: ({k: v for k, v in value.items() if k not in VOLATILE_KEYS} if isinstance(value, dict) else value)
+        for key, value in data.items()
+        if key not in VOLATILE_KEYS
+    }
+    encoded = json.dumps(stable, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+def _read_json(path: str) -> Optional[Dict]:
+    try:
+        with open(path, 'r', encoding='utf-8') as file_handle:
+            data = json.load(file_handle)
+        return data if isinstance(data, dict) else None
+    except (OSError, ValueError):
+        return None
+
+
+def _generations_dir(path: str) -> str:
+    return os.path.join(os.path.dirname(os.path.abspath(path)), GENERATIONS_DIRNAME)
+
+
+def _generation_path(path: str, version: int) -> str:
+    stem, suffix = os.path.splitext(os.path.basename(path))
+    return os.path.join(_generations_dir(path), f'{stem}.{version:06d}{suffix}')
+
+
+def _list_generations(path: str):
+    """(version, path) pairs for the kept generations of a snapshot, newest first"""
+    stem, suffix = os.path.splitext(os.path.basename(path))
+    directory = _generations_dir(path)
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return []
+
+    generations = []
+    for name in names:
+        if not (name.startswith(f'{stem}.') and name.endswith(suffix)):
+            continue
+        version = name[len(stem) + 1:len(name) - len(suffix)]
+        if version.isdigit():
+            generations.append((int(version), os.path.join(directory, name)))
+    return sorted(generations, reverse=True)
+
+
+def write_atomic(path: str, payload: bytes):
+    """Write to a temp file, fsync, rename over path and fsync the directory"""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    try:
+        with open(tmp_path, 'wb') as file_handle:
+            file_handle.write(payload)
+            file_handle.flush()
+            os.fsync(file_handle.fileno())
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    if hasattr(os, 'O_DIRECTORY'):
+        try:
+            directory_fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+            try:
+                os.fsync(directory_fd)
+            finally:
+                os.close(directory_fd)
+        except OSError:
+            pass
+
+
+class FileLock:
+    """
+    Advisory lock on path + '.lock' for read-modify-write of a shared file
+
+    Concurrent processes writing snapshots agree on the next version;
+    other state files (e.g. the negative cache) merge under it.
+    """
+
+    def __init__(self, path: str):
+        self.path = f'{path}.lock'
+        self._handle = None
+
+    def __enter__(self):
+        _write_lock.acquire()
+        if fcntl is not None:
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                self._handle = open(self.path, 'a')
+                fcntl.flock(self._handle, fcntl.LOCK_EX)
+            except OSError:
+                self._handle = None
+        return self
+
+    def __exit__(self, *exc_info):
+        if self._handle is not None:
+            fcntl.flock(self._handle, fcntl.LOCK_UN)
+            self._handle.close()
+            self._handle = None
+        _write_lock.release()
+
+
+def write_snapshot(path: str, data: Dict, generations: int = SNAPSHOT_GENERATIONS) -> Dict:
+    """
+    Atomically write a prices snapshot unless its content is unchanged
+
+    Args:
+        path: Snapshot file (e.g. data/json/prices.json)
+        data: Snapshot content; snapshot_version/snapshot_hash are set on it
+        generations: Previous versions to keep in the generations directory
+
+    Returns:
+        Dict with written (False when skipped), version and hash
+    """
+    with FileLock(path):
+        result = _write_snapshot_locked(path, data, generations)
+    if result['written']:
+        logger.info(f"💾 Wrote {os.path.basename(path)} snapshot v{result['version']}")
+    return result
+
+
+def _write_snapshot_locked(path: str, data: Dict, generations: int) -> Dict:
+    """write_snapshot() body; the caller holds FileLock(path)"""
+    digest = content_hash(data)
+    current = _read_json(path) or {}
+    current_version = int(current.get(VERSION_KEY, 0) or 0)
+    kept = _list_generations(path)
+    if kept:
+        current_version = max(current_version, kept[0][0])
+
+    if current and current.get(HASH_KEY, content_hash(current)) == digest:
+        data[VERSION_KEY] = current_version
+        data[HASH_KEY] = digest
+        return {'written': False, 'version': current_version, 'hash': digest}
+
+    version = current_version + 1
+    data[VERSION_KEY] = version
+    data[HASH_KEY] = digest
+    payload = json.dumps(data, indent=2, ensure_ascii=False).encode('utf-8')
+
+    write_atomic(path, payload)
+
+    if generations > 0:
+        try:
+            os.makedirs(_generations_dir(path), exist_ok=True)
+            write_atomic(_generation_path(path, version), payload)
+            for _, old_path in _list_generations(path)[generations:]:
+                os.remove(old_path)
+        except OSError as e:
+            logger.warning(f"⚠️ Could not keep snapshot generation for {path}: {e}")
+
+    return {'written': True, 'version': version, 'hash': digest}
+
+
+def publish_prices(path: str, data: Dict, generations: int = SNAPSHOT_GENERATIONS) -> Dict:
+    """
+    Write a prices snapshot and make the SQLite snapshot match it
+
+    The file is written as by write_snapshot(); its rows in
+    price_snapshots are then replaced with the same content, together with
+    the file's stat, under the same lock. Each file has its own snapshot,
+    so publishing backend/prices.json never hides data/json/prices.json
+    crops. The database must already be initialized.
+
+    Returns:
+        write_snapshot()'s result plus database (False when the SQLite
+        copy could not be replaced; readers then serve the newer file)
+    """
+    with FileLock(path):
+        result = _write_snapshot_locked(path, data, generations)
+        result['database'] = False
+        if DATABASE_AVAILABLE:
+            try:
+                PriceSnapshot.replace(snapshot_source(path), data, file_signature(path))
+                result['database'] = True
+            except sqlite3.Error as e:
+                logger.warning(f"⚠️ Price snapshot database not updated: {e}")
+    if result['written']:
+        logger.info(f"💾 Wrote {os.path.basename(path)} snapshot v{result['version']}")
+    return result
+
+
+def load_snapshot(path: str) -> Tuple[Dict, int]:
+    """
+    Read a snapshot as (data, version), cached until the file changes
+
+    An unreadable file falls back to the newest kept generation instead
+    of an empty dict; ({}, 0) only when there is nothing to read at all.
+    """
+    try:
+        stat = os.stat(path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+    except OSError:
+        signature = None
+
+    if signature is not None:
+        with _read_cache_lock:
+            cached = _read_cache.get(path)
+        if cached and cached[0] == signature:
+            data = cached[1]
+            return data, int(data.get(VERSION_KEY, 0) or 0)
+
+        data = _read_json(path)
+        if data is not None:
+            with _read_cache_lock:
+                _read_cache[path] = (signature, data)
+            return data, int(data.get(VERSION_KEY, 0) or 0)
+
+    for version, generation_path in _list_generations(path):
+        data = _read_json(generation_path)
+        if data is not None:
+            logger.warning(f"⚠️ Serving {os.path.basename(path)} from generation v{version}")
+            return data, version
+
+    return {}, 0
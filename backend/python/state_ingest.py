@@ -0,0 +1,231 @@
+"""
+Whole-state bulk ingest from data.gov.in for SmartSheti
+Pages through the daily prices resource for one state and arrival date,
+then partitions the records locally by commodity and market
+
+One paged pass replaces the per-crop, per-alias filtered queries the
+scrapers would otherwise make, and covers every commodity traded that
+day instead of just the priority crops.
+"""
+
+import logging
+import os
+import time
+from datetime import date, timedelta
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional
+
+import requests
+
+from http_client import HostBusy, http_get
+from lookup_memory import get_alias_learner, get_negative_cache
+
+logger = logging.getLogger(__name__)
+
+RESOURCE_URL = 'https://api.data.gov.in/resource/9ef84268-d588-465a-a308-a864a43d0070'
+DEFAULT_API_KEY = '579b464db66ec23bdd000001cdd3946e44ce4aad7209ff7b23ac571b'
+
+PAGE_SIZE = 500
+MAX_PAGES = 100
+PAGE_TIMEOUT_SECONDS = 20
+# No new page is requested with less time than this left before the deadline
+MIN_PAGE_SECONDS = 2
+
+# commodity -> market -> records
+Partition = Dict[str, Dict[str, List[Dict]]]
+
+
+class StateIngestIncomplete(Exception):
+    """Pagination stopped before the last page (error, deadline or MAX_PAGES)"""
+
+
+class IngestResult(NamedTuple):
+    """An ingested partition, the arrival date it covers and whether every page was read"""
+    partition: Partition
+    arrival_date: Optional[date]
+    complete: bool
+
+
+def iter_state_records(
+    state: str,
+    arrival_date: Optional[date] = None,
+    api_key: Optional[str] = None,
+    page_size: int = PAGE_SIZE,
+    max_pages: int = MAX_PAGES,
+    deadline: Optional[float] = None
+) -> Iterator[Dict]:
+    """
+    Stream every record for a state (and optionally one arrival date)
+
+    Pages are requested lazily with offset/limit, so callers can stop
+    early without fetching the rest. Raises StateIngestIncomplete when a
+    page fails, max_pages is reached or the deadline (a time.monotonic()
+    value) leaves no time for another page, after yielding what was read.
+    """
+    params = {
+        'api-key': api_key or os.environ.get('DATA_GOV_IN_API_KEY') or DEFAULT_API_KEY,
+        'format': 'json',
+        'limit': str(page_size),
+        'filters[state]': state,
+    }
+    if arrival_date:
+        params['filters[arrival_date]'] = arrival_date.strftime('%d/%m/%Y')
+
+    offset = 0
+    for page in range(max_pages):
+        params['offset'] = str(offset)
+        timeout = PAGE_TIMEOUT_SECONDS
+        if deadline is not None:
+            remaining = deadline - time.monotonic()
+            if remaining < MIN_PAGE_SECONDS:
+                raise StateIngestIncomplete(f"deadline reached before page {page}")
+            timeout = min(timeout, remaining)
+
+        try:
+            response = http_get(RESOURCE_URL, params=params, timeout=timeout)
+        except (HostBusy, requests.RequestException) as e:
+            raise StateIngestIncomplete(f"page {page} failed: {e}") from e
+        if response.status_code != 200:
+            raise StateIngestIncomplete(f"page {page} returned status {response.status_code}")
+
+        data = response.json()
+        records = data.get('records', [])
+        yield from records
+
+        offset += len(records)
+        total = int(data.get('total', 0) or 0)
+        if len(records) < page_size or (total and offset >= total):
+            return
+
+    raise StateIngestIncomplete(f"stopped after {max_pages} pages for {state}")
+
+
+def partition_records(records: Iterable[Dict]) -> Partition:
+    """Group records by commodity, then by market"""
+    partition: Partition = {}
+    for record in records:
+        commodity = (record.get('commodity') or '').strip()
+        if not commodity:
+            continue
+        market = (record.get('market') or 'Unknown').strip()
+        partition.setdefault(commodity, {}).setdefault(market, []).append(record)
+    return partition
+
+
+def ingest_state(
+    state: str = 'Maharashtra',
+    arrival_date: Optional[date] = None,
+    deadline: Optional[float] = None
+) -> IngestResult:
+    """
+    Fetch and partition one day of records for a state
+
+    Without an explicit date, today is tried first and yesterday is used
+    when today's arrivals have not been published yet (and the deadline,
+    a time.monotonic() value, allows). A pass cut short by a failed page
+    or the deadline still returns what was read, with complete False.
+    """
+    dates = [arrival_date] if arrival_date else [date.today(), date.today() - timedelta(days=1)]
+
+    for day in dates:
+        if deadline is not None and deadline - time.monotonic() < MIN_PAGE_SECONDS:
+            logger.warning(f"⏱️ {state} ingest deadline reached before {day:%d/%m/%Y}")
+            break
+        records = []
+        complete = True
+        try:
+            for record in iter_state_records(state, day, deadline=deadline):
+                records.append(record)
+        except StateIngestIncomplete as e:
+            logger.warning(f"⚠️ Incomplete {state} ingest for {day:%d/%m/%Y}: {e}")
+            complete = False
+
+        partition = partition_records(records)
+        if partition:
+            record_count = sum(len(rows) for markets in partition.values() for rows in markets.values())
+            logger.info(
+                f"✅ Ingested {record_count} records for {len(partition)} commodities in {state} "
+                f"({day:%d/%m/%Y}{'' if complete else ', partial'})"
+            )
+            return IngestResult(partition, day, complete)
+        logger.info(f"ℹ️ No {state} records published for {day:%d/%m/%Y}")
+
+    return IngestResult({}, None, False)
+
+
+def records_for_aliases(partition: Partition, aliases: List[str]) -> Dict[str, List[Dict]]:
+    """Return {alias: records} for the aliases present in the partition (case-insensitive)"""
+    by_name = {commodity.lower(): commodity for commodity in partition}
+    matched = {}
+    for alias in aliases:
+        commodity = by_name.get(alias.lower())
+        if commodity:
+            matched[alias] = [record for rows in partition[commodity].values() for record in rows]
+    return matched
+
+
+def prime_scraper_caches(
+    partition: Partition,
+    state: str,
+    multi_source=None,
+    real_scraper=None,
+    arrival_date: Optional[date] = None,
+    complete: bool = False
+) -> Dict:
+    """
+    Feed an ingested partition into every scraper cache at once
+
+    Crops with records are cached (and their negative-cache entries
+    cleared). Crops the listing has no records for are marked negative
+    only when every page was read, and for the arrival date ingested: a
+    partial or undated pass proves nothing about what is missing.
+
+    Args:
+        partition: IngestResult.partition from ingest_state()
+        state: State the partition belongs to
+        multi_source: Optional MultiSourcePriceScraper
+        real_scraper: Optional RealAGMARKNETScraper
+        arrival_date: IngestResult.arrival_date
+        complete: IngestResult.complete
+
+    Returns:
+        Dict with the crops primed and the crops with no records
+    """
+    alias_learner = get_alias_learner()
+    negative_cache = get_negative_cache()
+    primed = set()
+    missing = set()
+
+    scraper_mappings = []
+    if multi_source is not None:
+        for source in multi_source.sources:
+            if hasattr(source, 'crop_mappings') and hasattr(source, 'prime_cache'):
+                scraper_mappings.append((source, source.crop_mappings))
+    if real_scraper is not None:
+        scraper_mappings.append((real_scraper, real_scraper.crop_mappings))
+
+    for scraper, crop_mappings in scraper_mappings:
+        for crop, aliases in crop_mappings.items():
+            matched = records_for_aliases(partition, aliases)
+            if not matched:
+                missing.add(crop)
+                continue
+
+            # Same alias the scraper would have settled on when probing one by one
+            alias = next(name for name in alias_learner.order(crop, state, aliases) if name in matched)
+            if scraper.prime_cache(crop, state, matched[alias]):
+                alias_learner.record_hit(crop, state, alias)
+                negative_cache.clear(crop, state)
+                primed.add(crop)
+
+    missing -= primed
+    negatives_recorded = bool(complete and arrival_date and missing)
+    if negatives_recorded:
+        negative_cache.mark_many_negative(sorted(missing), state, arrival_date)
+    # One merged write for every clear and mark of the ingest
+    negative_cache.flush()
+
+    return {
+        'primed': sorted(primed),
+        'no_records': sorted(missing),
+        'negatives_recorded': negatives_recorded,
+    }
@@ -490,8 +490,13 @@ class CropRecommendationEngine {
 
             // Try Method 1: Vercel Backend API (Secure & Real)
             try {
-                // Use the realprice endpoint which acts as a secure proxy to data.gov.in
-                const response = await fetch(`/api/realprice/${mappedCropName}?state=Maharashtra`);
+                // Static shard written by the cron job first, then the realprice endpoint
+                // which acts as a secure proxy to data.gov.in
+                const shardUrl = typeof priceShardUrl === 'function' ? priceShardUrl(mappedCropName, 'Maharashtra') : null;
+                let response = shardUrl ? await fetch(shardUrl).catch(() => null) : null;
+                if (!response || !response.ok) {
+                    response = await fetch(`/api/realprice/${mappedCropName}?state=Maharashtra`);
+                }
                 if (response.ok) {
                     const data = await response.json();
 
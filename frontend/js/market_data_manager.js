@@ -378,7 +378,7 @@ class MarketDataManager {
         try {
             // Fetch real data for this crop
             console.log(`🔄 Fetching real api data for ${crop}...`);
-            const response = await fetch(`/api/realprice/${crop}?state=${this.selectedState}`);
+            const response = await this.fetchCropPrice(crop);
 
             if (response.ok) {
                 const data = await response.json();
@@ -495,6 +495,28 @@ class MarketDataManager {
             marketSelect.value = this.selectedMarket;
         }
     }
+
+    /**
+     * Fetch a crop's price: static shard written by the cron job first,
+     * the /api/realprice function only when there is no shard.
+     * priceShardUrl comes from price_shards.js; a page that does not load
+     * it goes straight to the API.
+     */
+    async fetchCropPrice(crop) {
+        const shardUrl = typeof priceShardUrl === 'function' ? priceShardUrl(crop, this.selectedState) : null;
+        if (shardUrl) {
+            try {
+                const shard = await fetch(shardUrl);
+                if (shard.ok) {
+                    return shard;
+                }
+            } catch (error) {
+                console.log(`📁 No price shard for ${crop}, asking the API`);
+            }
+        }
+        return fetch(`/api/realprice/${crop}?state=${this.selectedState}`);
+    }
+
     async fetchMarketData() {
         try {
             const response = await fetch('../../data/json/market_data.json');
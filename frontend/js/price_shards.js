@@ -0,0 +1,28 @@
+// Static price shards written by the cron job (backend/python/price_shards.py)
+// Shards exist only for the ingested state:
+//   /data/json/prices/<crop>.json and /data/json/prices/<crop>/<market>.json
+const PRICE_SHARD_ROOT = '/data/json/prices';
+const PRICE_SHARD_STATE = 'Maharashtra';
+
+// File-name form of a crop or market name, same rule as shard_slug() ('Pune APMC' -> 'pune-apmc')
+function shardSlug(name) {
+    return String(name || '').toLowerCase().replace(/[^a-z0-9]+/g, '-').replace(/^-+|-+$/g, '');
+}
+
+// Shard URL for a crop (and market), or null when the state has no shards
+function priceShardUrl(crop, state, market) {
+    if (state !== PRICE_SHARD_STATE || !shardSlug(crop)) {
+        return null;
+    }
+    const wantsMarket = market && market.trim() && !market.toLowerCase().includes('all');
+    const path = wantsMarket ? `${shardSlug(crop)}/${shardSlug(market)}` : shardSlug(crop);
+    return `${PRICE_SHARD_ROOT}/${path}.json`;
+}
+
+// Export for use in other scripts
+if (typeof module !== 'undefined' && module.exports) {
+    module.exports = { PRICE_SHARD_ROOT, PRICE_SHARD_STATE, shardSlug, priceShardUrl };
+} else if (typeof window !== 'undefined') {
+    window.shardSlug = shardSlug;
+    window.priceShardUrl = priceShardUrl;
+}
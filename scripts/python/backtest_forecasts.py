@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+Forecast Backtesting Harness
+Replays weekly price series through each forecaster with rolling-origin
+evaluation and reports accuracy and cost as JSON
+
+For every series and every origin t the model sees prices[:t] and
+forecasts prices[t]. Fitted models (holt, holt_winters, ar, auto) are
+refit every --refit-every origins and otherwise only updated with the
+new point, the way ForecastModelCache serves them. All models are scored
+on the same origins.
+
+Report: per model, MAPE/RMSE per crop and overall, series/second,
+forecasts/second and peak traced memory. Keys are sorted so reports from
+two versions diff cleanly. Runs entirely offline.
+
+Usage:
+    python scripts/python/backtest_forecasts.py --output backtest.json
+    python scripts/python/backtest_forecasts.py --source csv --csv data/csv/market_data.csv
+    python scripts/python/backtest_forecasts.py --source db --models simple,auto
+"""
+
+import argparse
+import csv
+import json
+import math
+import random
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+# Resolve project root from scripts/python
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+
+sys.path.insert(0, str(PROJECT_ROOT))
+sys.path.insert(0, str(PROJECT_ROOT / 'backend' / 'python'))
+
+from price_history_store import to_per_kg
+from price_predictor import FORECASTERS, SimplePricePredictor, fit_best_forecaster
+
+DEFAULT_CSV = PROJECT_ROOT / 'data' / 'csv' / 'market_data.csv'
+DEFAULT_MODELS = ('simple', 'holt', 'holt_winters', 'ar', 'auto')
+
+# Synthetic crops: base ₹/kg, yearly seasonal amplitude, week of the peak,
+# weekly noise. Tomato and onion swing hardest, grains barely move.
+SYNTHETIC_CROPS = {
+    'tomato': (25.0, 0.45, 30, 0.08),
+    'onion': (28.0, 0.35, 44, 0.07),
+    'potato': (20.0, 0.15, 40, 0.05),
+    'wheat': (27.0, 0.05, 8, 0.02),
+    'rice': (36.0, 0.04, 36, 0.02),
+    'soybean': (45.0, 0.10, 20, 0.03),
+}
+
+Series = Dict[Tuple[str, str], List[float]]
+
+
+def synthetic_series(markets: int = 5, weeks: int = 156, seed: int = 42) -> Series:
+    """Seeded weekly series with trend, yearly seasonality and noise"""
+    rng = random.Random(seed)
+    series = {}
+    for crop, (base, amplitude, peak_week, noise) in SYNTHETIC_CROPS.items():
+        for index in range(markets):
+            level = base * rng.uniform(0.85, 1.15)
+            drift = rng.uniform(-0.001, 0.003)
+            values = []
+            for week in range(weeks):
+                seasonal = amplitude * math.cos(2 * math.pi * (week - peak_week) / 52)
+                price = level * (1 + drift) ** week * (1 + seasonal) * math.exp(rng.gauss(0, noise))
+                values.append(round(price, 2))
+            series[(crop, f'Market {index + 1}')] = values
+    return series
+
+
+def csv_series(path: Path) -> Series:
+    """Modal ₹/kg series per (commodity, market) from a market_data.csv-style file"""
+    rows = defaultdict(list)
+    with open(path, 'r', encoding='utf-8') as file_handle:
+        for row in csv.DictReader(file_handle):
+            try:
+                price = to_per_kg(float(row['modal_price']), row.get('unit', 'Quintal'))
+            except (KeyError, TypeError, ValueError):
+                continue
+            rows[(row['commodity'].strip().lower(), row['market'].strip())].append((row.get('date', ''), price))
+    return {key: [price for _, price in sorted(points)] for key, points in rows.items()}
+
+
+def db_series() -> Series:
+    """Weekly modal ₹/kg per (commodity, market) from the SQLite rollups"""
+    from backend.database import get_connection
+
+    series = defaultdict(list)
+    rows = get_connection().execute('''
+        SELECT c.name AS commodity, m.name AS market, r.modal_price
+        FROM price_rollups r
+        JOIN commodities c ON c.id = r.commodity_id
+        JOIN markets m ON m.id = r.market_id
+        WHERE r.period = 'week' AND r.modal_price IS NOT NULL
+        ORDER BY c.name, m.name, r.period_start
+    ''')
+    for row in rows:
+        series[(row['commodity'], row['market'])].append(row['modal_price'])
+    return dict(series)
+
+
+def _simple_runner(values: List[float], origins: range, refit_every: int) -> List[float]:
+    predictor = SimplePricePredictor()
+    return [predictor.predict_next_week(values[:t])['predicted_price'] for t in origins]
+
+
+def _fitted_runner(fit: Callable) -> Callable:
+    """Rolling-origin runner for a fit(values) -> (forecaster, state) function"""
+
+    def run(values: List[float], origins: range, refit_every: int) -> List[float]:
+        predictions = []
+        forecaster = state = None
+        for step, t in enumerate(origins):
+            if state is None or step % refit_every == 0:
+                fitted = fit(values[:t])
+                if fitted is None:
+                    predictions.append(None)
+                    continue
+                forecaster, state = fitted
+            else:
+                forecaster.update(state, values[t - 1])
+            predictions.append(max(0.0, forecaster.forecast(state, 1)[0]))
+        return predictions
+
+    return run
+
+
+def _fit_single(forecaster):
+    def fit(values):
+        fitted = forecaster.fit(values)
+        return (forecaster, fitted[0]) if fitted else None
+    return fit
+
+
+def _fit_auto(values):
+    best = fit_best_forecaster(values)
+    return (FORECASTERS[best['model']], best['state']) if best else None
+
+
+def model_runners() -> Dict[str, Tuple[Callable, int]]:
+    """name -> (runner, minimum training points)"""
+    runners = {'simple': (_simple_runner, 3)}
+    for name, forecaster in FORECASTERS.items():
+        runners[name] = (_fitted_runner(_fit_single(forecaster)), forecaster.min_points())
+    runners['auto'] = (_fitted_runner(_fit_auto), min(forecaster.min_points() for forecaster in FORECASTERS.values()))
+    return runners
+
+
+def _errors_summary(pairs: List[Tuple[float, float]]) -> Dict:
+    if not pairs:
+        return {'forecasts': 0, 'mape': None, 'rmse': None}
+    percentage = [abs(actual - predicted) / abs(actual) for actual, predicted in pairs if actual]
+    squared = [(actual - predicted) ** 2 for actual, predicted in pairs]
+    return {
+        'forecasts': len(pairs),
+        'mape': round(100 * sum(percentage) / len(percentage), 3) if percentage else None,
+        'rmse': round(math.sqrt(sum(squared) / len(squared)), 3),
+    }
+
+
+def _replay(runner: Callable, series: Series, origins_for: Dict, refit_every: int) -> Dict:
+    """Run one model over every series; (actual, predicted) pairs per crop"""
+    pairs = defaultdict(list)
+    for key, values in series.items():
+        origins = origins_for[key]
+        for t, predicted in zip(origins, runner(values, origins, refit_every)):
+            if predicted is not None:
+                pairs[key[0]].append((values[t], predicted))
+    return pairs
+
+
+def backtest(series: Series, models: List[str], min_train: int = 8, refit_every: int = 13, measure_memory: bool = True) -> Dict:
+    """
+    Rolling-origin backtest of each model over the same origins
+
+    Origins start once every selected model has enough history (and at
+    least min_train points); shorter series are skipped and counted.
+    """
+    runners = model_runners()
+    unknown = [name for name in models if name not in runners]
+    if unknown:
+        raise ValueError(f"Unknown models: {', '.join(unknown)} (available: {', '.join(runners)})")
+
+    first_origin = max([min_train] + [runners[name][1] for name in models])
+    usable = {key: values for key, values in series.items() if len(values) > first_origin}
+    origins_for = {key: range(first_origin, len(values)) for key, values in usable.items()}
+
+    report = {
+        'config': {
+            'models': list(models),
+            'min_train': min_train,
+            'first_origin': first_origin,
+            'refit_every': refit_every,
+            'horizon': 1,
+        },
+        'dataset': {
+            'series': len(series),
+            'series_used': len(usable),
+            'series_skipped': len(series) - len(usable),
+            'crops': len({crop for crop, _ in usable}),
+            'origins': sum(len(origins) for origins in origins_for.values()),
+        },
+        'models': {},
+    }
+
+    for name in models:
+        runner = runners[name][0]
+        print(f"⏱️  {name}: replaying {len(usable)} series...", file=sys.stderr)
+
+        started = time.perf_counter()
+        pairs = _replay(runner, usable, origins_for, refit_every)
+        seconds = time.perf_counter() - started
+
+        peak_kb = None
+        if measure_memory:
+            # Separate pass: tracing would distort the timing above
+            tracemalloc.start()
+            _replay(runner, usable, origins_for, refit_every)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            peak_kb = round(peak / 1024, 1)
+
+        all_pairs = [pair for crop_pairs in pairs.values() for pair in crop_pairs]
+        report['models'][name] = {
+            'overall': _errors_summary(all_pairs),
+            'per_crop': {crop: _errors_summary(crop_pairs) for crop, crop_pairs in sorted(pairs.items())},
+            'seconds': round(seconds, 4),
+            'series_per_second': round(len(usable) / seconds, 1) if seconds else None,
+            'forecasts_per_second': round(len(all_pairs) / seconds, 1) if seconds else None,
+            'peak_memory_kb': peak_kb,
+        }
+
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Rolling-origin backtest of SmartSheti price forecasters')
+    parser.add_argument('--source', choices=('synthetic', 'csv', 'db'), default='synthetic')
+    parser.add_argument('--csv', type=Path, default=DEFAULT_CSV, help='CSV for --source csv')
+    parser.add_argument('--markets', type=int, default=5, help='synthetic markets per crop')
+    parser.add_argument('--weeks', type=int, default=156, help='synthetic weeks per series')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--models', default=','.join(DEFAULT_MODELS), help='comma-separated model names')
+    parser.add_argument('--min-train', type=int, default=8)
+    parser.add_argument('--refit-every', type=int, default=13, help='origins between refits of fitted models')
+    parser.add_argument('--no-memory', action='store_true', help='skip the peak-memory pass')
+    parser.add_argument('--output', type=Path, help='write the JSON report here instead of stdout')
+    args = parser.parse_args(argv)
+
+    if args.source == 'csv':
+        series = csv_series(args.csv)
+        dataset = {'source': 'csv', 'path': str(args.csv)}
+    elif args.source == 'db':
+        series = db_series()
+        dataset = {'source': 'db'}
+    else:
+        series = synthetic_series(args.markets, args.weeks, args.seed)
+        dataset = {'source': 'synthetic', 'markets': args.markets, 'weeks': args.weeks, 'seed': args.seed}
+
+    models = [name.strip() for name in args.models.split(',') if name.strip()]
+    try:
+        report = backtest(series, models, args.min_train, max(1, args.refit_every), not args.no_memory)
+    except ValueError as e:
+        parser.error(str(e))
+    report['dataset'].update(dataset)
+
+    if not report['dataset']['series_used']:
+        print(f"⚠️  No series longer than {report['config']['first_origin']} points; nothing to score", file=sys.stderr)
+
+    output = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        args.output.write_text(output + '\n', encoding='utf-8')
+        print(f"✅ Report written to {args.output}", file=sys.stderr)
+    else:
+        print(output)
+
+    for name, result in report['models'].items():
+        overall = result['overall']
+        print(
+            f"📊 {name:<13} MAPE {overall['mape']}%  RMSE {overall['rmse']}  "
+            f"{result['series_per_second']} series/s  peak {result['peak_memory_kb']} KB",
+            file=sys.stderr
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -23,6 +23,8 @@ except ImportError:
     SCRAPER_AVAILABLE = False
     print("⚠️  Multi-source scraper not available")
 
+from snapshot_writer import publish_prices
+
 # Paths
 DATA_DIR = PROJECT_ROOT / 'data' / 'json'
 BACKEND_DIR = PROJECT_ROOT / 'backend'
@@ -86,18 +88,21 @@ def consolidate_prices():
             print(f"❌ Error: {str(e)}")
             failed += 1
     
-    # Save consolidated prices
-    DATA_DIR.mkdir(parents=True, exist_ok=True)
+    # Save consolidated prices (atomic; skipped when no price changed) and
+    # replace the SQLite snapshot the API reads
     prices_file = DATA_DIR / 'prices.json'
-    
-    with open(prices_file, 'w', encoding='utf-8') as f:
-        json.dump(consolidated, f, indent=2, ensure_ascii=False)
+    snapshot = publish_prices(str(prices_file), consolidated)
     
     print("\n" + "=" * 60)
     print(f"✅ Consolidation complete!")
     print(f"   Successful: {successful}/{len(PRIORITY_CROPS)}")
     print(f"   Failed: {failed}/{len(PRIORITY_CROPS)}")
-    print(f"   Saved to: {prices_file}")
+    if snapshot['written']:
+        print(f"   Saved to: {prices_file} (v{snapshot['version']})")
+    else:
+        print(f"   Unchanged: {prices_file} (v{snapshot['version']})")
+    if not snapshot['database']:
+        print("   ⚠️  SQLite snapshot not updated; the API serves the newer prices.json")
     print("=" * 60)
     
     # Remove old backend/prices.json (deprecated)
@@ -6,14 +6,37 @@ from datetime import datetime
 # Adjust module path to import backend
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 sys.path.insert(0, BASE_DIR)
+sys.path.insert(0, os.path.join(BASE_DIR, 'backend', 'python'))
+
+from backend.database import (
+    ALL_MARKETS, DB_PATH, MARKET_PRICES_INDEX_SQL, init_db, CropPrice, MarketPrice, PriceObservation, PriceRollup,
+    get_connection, transaction
+)
+from price_history_store import HISTORY_DIR, to_per_kg
+
+def dedupe_market_prices():
+    """
+    Keeps the newest market_prices row per crop/market and adds the unique
+    index init_db() leaves out while duplicates exist; returns rows deleted.
+    """
+    with transaction() as conn:
+        removed = conn.execute('''
+            DELETE FROM market_prices
+            WHERE id NOT IN (SELECT MAX(id) FROM market_prices GROUP BY crop_id, market_name)
+        ''').rowcount
+        conn.execute(MARKET_PRICES_INDEX_SQL)
+    return removed
 
-from backend.database import init_db, CropPrice, MarketPrice, get_connection
 
 def migrate():
     # Initialize the database
     init_db()
     print("Database initialized.")
 
+    removed = dedupe_market_prices()
+    if removed:
+        print(f"- Removed {removed} duplicate market_prices rows (kept the newest per crop/market)")
+
     # Paths to JSON files (check both possible locations)
     json_path_data = os.path.join(BASE_DIR, 'data', 'json', 'prices.json')
     json_path_backend = os.path.join(BASE_DIR, 'backend', 'prices.json')
@@ -40,18 +63,11 @@ def migrate():
     last_updated = data.get('lastUpdated', datetime.now().isoformat())
     global_source = data.get('source', 'Unknown')
     
-    crops_migrated = 0
-    markets_migrated = 0
-
     # Iterate through keys, avoiding known top-level metadata keys
     skip_keys = {'lastUpdated', 'source', 'api_version', 'timestamp'}
     
-    # Clean the old data first to avoid inserting duplicates if running multiple times
-    conn = get_connection()
-    conn.execute("DELETE FROM market_prices")
-    conn.execute("DELETE FROM crop_prices")
-    conn.commit()
-    conn.close()
+    crop_models = []
+    markets_by_crop = {}
 
     for key, value in data.items():
         if key in skip_keys or not isinstance(value, dict):
@@ -66,7 +82,7 @@ def migrate():
         current_price = hist_data[-1] if hist_data else 0.0
         
         # Create CropPrice model
-        crop_model = CropPrice(
+        crop_models.append(CropPrice(
             crop_name=crop_name,
             state=crop_data.get('state', 'Maharashtra'),
             unit=crop_data.get('unit', '₹/quintal'),
@@ -76,27 +92,127 @@ def migrate():
             last_updated=last_updated,
             historical_labels=hist_labels,
             historical_data=hist_data
-        )
-        
-        # Save Crop and get its ID
-        crop_id = CropPrice.save(crop_model)
-        crops_migrated += 1
-        
-        # Migrate markets for this crop
-        markets = crop_data.get('markets', [])
-        for market in markets:
-            MarketPrice.save(
-                crop_id=crop_id,
-                market_name=market.get('name', 'Unknown'),
-                district=market.get('district', 'Unknown'),
-                price=market.get('price', 0.0)
+        ))
+        markets_by_crop[crop_name] = crop_data.get('markets', [])
+
+    # Replace the old data in one transaction so a failed run leaves it untouched
+    with transaction() as conn:
+        conn.execute("DELETE FROM market_prices")
+        conn.execute("DELETE FROM crop_prices")
+
+        crop_ids = CropPrice.bulk_upsert(crop_models)
+        market_rows = [
+            (
+                crop_ids[crop_name],
+                market.get('name', 'Unknown'),
+                market.get('district', 'Unknown'),
+                market.get('price', 0.0)
             )
-            markets_migrated += 1
+            for crop_name, markets in markets_by_crop.items()
+            for market in markets
+        ]
+        MarketPrice.bulk_upsert(market_rows)
+
+    crops_migrated = len(crop_ids)
+    markets_migrated = len(market_rows)
 
     print(f"Migration completed successfully!")
     print(f"- Crops migrated: {crops_migrated}")
     print(f"- Market prices migrated: {markets_migrated}")
-    print(f"Data saved to data/farm_database.db")
+    print(f"Data saved to {DB_PATH}")
+
+def _parse_date(value):
+    try:
+        return datetime.fromisoformat(str(value)).date()
+    except (TypeError, ValueError):
+        return None
+
+
+def remove_pseudo_market_observations():
+    """
+    Deletes observations an earlier migration stored under a market named
+    ALL_MARKETS (crop-level history, not a real mandi) and rebuilds the
+    rollups so commodity-wide aggregates no longer include them.
+    """
+    with transaction() as conn:
+        market_ids = [row['id'] for row in conn.execute('SELECT id FROM markets WHERE name = ?', (ALL_MARKETS,))]
+        if not market_ids:
+            return 0
+        placeholders = ','.join('?' * len(market_ids))
+        removed = conn.execute(f'DELETE FROM price_observations WHERE market_id IN ({placeholders})', market_ids).rowcount
+        conn.execute(f'DELETE FROM markets WHERE id IN ({placeholders})', market_ids)
+        PriceRollup.rebuild()
+    return removed
+
+
+def migrate_normalized():
+    """
+    Fills commodities/markets/price_observations from the legacy market
+    prices and the recorded price history. The legacy tables are left
+    untouched and re-running only updates rows already copied.
+
+    Crop-level history (crop_prices.historical_data) is not copied: it is
+    not tied to a market, and the snapshot keeps serving it.
+    """
+    init_db()
+    conn = get_connection()
+    observations = []
+
+    removed = remove_pseudo_market_observations()
+    if removed:
+        print(f"- Removed {removed} crop-level observations stored under market '{ALL_MARKETS}'")
+
+    crops = conn.execute('SELECT * FROM crop_prices').fetchall()
+    crop_by_id = {
+        crop['id']: (crop, _parse_date(crop['last_updated']) or datetime.now().date())
+        for crop in crops
+    }
+
+    for market in conn.execute('SELECT * FROM market_prices').fetchall():
+        crop, anchor = crop_by_id.get(market['crop_id'], (None, None))
+        price = to_per_kg(float(market['price'] or 0), crop['unit']) if crop else 0
+        if price <= 0:
+            continue
+        observations.append(PriceObservation(
+            commodity=crop['crop_name'],
+            market=market['market_name'],
+            obs_date=anchor.isoformat(),
+            modal_price=round(price, 2),
+            district=market['district'] or '',
+            state=crop['state'] or '',
+            source=crop['source']
+        ))
+
+    history_rows = 0
+    if os.path.isdir(HISTORY_DIR):
+        for name in sorted(os.listdir(HISTORY_DIR)):
+            if not name.endswith('.jsonl'):
+                continue
+            with open(os.path.join(HISTORY_DIR, name), 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                        unit = entry.get('unit', 'Quintal')
+                        observations.append(PriceObservation(
+                            commodity=entry['commodity'],
+                            market=entry['market'],
+                            obs_date=entry['arrival_date'],
+                            modal_price=round(to_per_kg(float(entry['modal_price']), unit), 2),
+                            min_price=round(to_per_kg(float(entry['min_price']), unit), 2),
+                            max_price=round(to_per_kg(float(entry['max_price']), unit), 2),
+                            district=entry.get('district', ''),
+                            state=entry.get('state', ''),
+                            source='price_history'
+                        ))
+                        history_rows += 1
+                    except (KeyError, TypeError, ValueError):
+                        continue
+
+    written = PriceObservation.bulk_upsert(observations)
+    print(f"Normalized migration completed!")
+    print(f"- Observations written: {written} ({history_rows} from recorded price history)")
+
 
 if __name__ == '__main__':
     migrate()
+    migrate_normalized()
@@ -0,0 +1,43 @@
+"""
+Shared pytest setup for SmartSheti's offline checks
+Puts the backend modules on sys.path the way the API entry points do and
+gives each test its own SQLite database
+
+test_all_crops.py and test_real_prices.py are scripts that query the live
+upstream APIs at import time; run them directly, pytest skips them.
+"""
+
+import os
+import sys
+
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT_DIR, 'backend', 'python'))
+sys.path.insert(0, os.path.join(ROOT_DIR, 'backend'))
+
+collect_ignore = ['test_all_crops.py', 'test_real_prices.py']
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """A fresh, initialized database for one test (the committed one is never touched)"""
+    import database
+
+    database.close_connection()
+    monkeypatch.setattr(database, 'DB_PATH', str(tmp_path / 'farm_database.db'))
+    database.init_db()
+    yield database
+    database.close_connection()
+
+
+@pytest.fixture
+def lookup_state(tmp_path, monkeypatch):
+    """Process-wide negative cache and alias learner backed by temp files"""
+    import lookup_memory
+
+    cache = lookup_memory.NegativeResultCache(str(tmp_path / 'negative.json'), save_interval_seconds=3600)
+    learner = lookup_memory.AliasOrderLearner(str(tmp_path / 'alias.json'), save_interval_seconds=3600)
+    monkeypatch.setattr(lookup_memory, '_negative_cache', cache)
+    monkeypatch.setattr(lookup_memory, '_alias_learner', learner)
+    return cache
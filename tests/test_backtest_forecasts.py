@@ -0,0 +1,65 @@
+"""Rolling-origin backtest harness: datasets, shared origins and the report"""
+
+import importlib.util
+import json
+import os
+
+import pytest
+
+SCRIPT_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scripts', 'python', 'backtest_forecasts.py'
+)
+
+
+@pytest.fixture(scope='module')
+def harness():
+    spec = importlib.util.spec_from_file_location('backtest_forecasts', SCRIPT_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_synthetic_series_are_seeded(harness):
+    first = harness.synthetic_series(markets=2, weeks=20, seed=1)
+    assert first == harness.synthetic_series(markets=2, weeks=20, seed=1)
+    assert first != harness.synthetic_series(markets=2, weeks=20, seed=2)
+    assert len(first) == 2 * len(harness.SYNTHETIC_CROPS)
+
+
+def test_csv_series_is_per_kg_in_date_order(harness, tmp_path):
+    path = tmp_path / 'market_data.csv'
+    path.write_text(
+        'date,commodity,market,modal_price,unit\n'
+        '2026-10-12,Onion,Pune,2100,Quintal\n'
+        '2026-10-05,Onion,Pune,2000,Quintal\n'
+        '2026-10-05,Onion,Nashik,bad,Quintal\n',
+        encoding='utf-8'
+    )
+    assert harness.csv_series(path) == {('onion', 'Pune'): [20.0, 21.0]}
+
+
+def test_models_are_scored_on_the_same_origins(harness):
+    series = {**harness.synthetic_series(markets=1, weeks=30, seed=3), ('onion', 'Short'): [20.0] * 10}
+    report = harness.backtest(series, ['simple', 'holt', 'ar'], min_train=8, measure_memory=False)
+
+    first_origin = report['config']['first_origin']
+    assert report['dataset']['series_skipped'] == 1
+    assert report['dataset']['origins'] == len(harness.SYNTHETIC_CROPS) * (30 - first_origin)
+    counts = {name: result['overall']['forecasts'] for name, result in report['models'].items()}
+    assert set(counts.values()) == {report['dataset']['origins']}
+    assert all(result['overall']['mape'] < 50 for result in report['models'].values())
+
+
+def test_unknown_model_is_rejected(harness):
+    with pytest.raises(ValueError, match='prophet'):
+        harness.backtest({}, ['prophet'])
+
+
+def test_main_writes_the_report(harness, tmp_path, capsys):
+    output = tmp_path / 'report.json'
+    harness.main(['--markets', '1', '--weeks', '24', '--models', 'simple,holt', '--no-memory', '--output', str(output)])
+
+    report = json.loads(output.read_text(encoding='utf-8'))
+    assert report['dataset']['source'] == 'synthetic'
+    assert set(report['models']) == {'simple', 'holt'}
+    assert report['models']['holt']['peak_memory_kb'] is None
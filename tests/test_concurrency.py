@@ -0,0 +1,78 @@
+"""Single-flight coalescing and the token-bucket rate limiter"""
+
+import threading
+import time
+
+from concurrency import SingleFlight, TokenBucket
+
+
+def run_concurrently(count, target):
+    results, errors = [], []
+
+    def worker():
+        try:
+            results.append(target())
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads, results, errors
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        release.wait(5)
+        return {'price': 21.5}
+
+    threads, results, errors = run_concurrently(5, lambda: flight.do('onion', fetch))
+    while flight.stats()['executed'] + flight.stats()['coalesced'] < 5:
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(calls) == 1 and not errors
+    assert results == [{'price': 21.5}] * 5
+    assert flight.stats() == {'executed': 1, 'coalesced': 4, 'in_flight': 0}
+
+
+def test_waiters_receive_the_leaders_exception():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def fetch():
+        release.wait(5)
+        raise RuntimeError('upstream down')
+
+    threads, results, errors = run_concurrently(3, lambda: flight.do('onion', fetch))
+    while flight.stats()['executed'] + flight.stats()['coalesced'] < 3:
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert not results and [str(error) for error in errors] == ['upstream down'] * 3
+
+
+def test_nothing_is_cached_after_the_call():
+    flight = SingleFlight()
+    assert flight.do('onion', lambda: 1) == 1
+    assert flight.do('onion', lambda: 2) == 2
+    assert flight.stats()['executed'] == 2
+
+
+def test_token_bucket_allows_a_burst_then_waits():
+    bucket = TokenBucket(rate=20, capacity=2)
+    assert bucket.acquire(timeout=0) and bucket.acquire(timeout=0)
+    assert not bucket.acquire(timeout=0)
+
+    started = time.monotonic()
+    assert bucket.acquire(timeout=1)
+    assert 0.02 <= time.monotonic() - started < 0.5
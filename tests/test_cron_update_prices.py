@@ -0,0 +1,58 @@
+"""Cron refresh order and the per-run price checkpoint"""
+
+import importlib.util
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+CRON_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'api', 'cron', 'update-prices.py')
+
+
+@pytest.fixture
+def cron(tmp_path, monkeypatch):
+    spec = importlib.util.spec_from_file_location('update_prices', CRON_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    monkeypatch.setattr(module, 'CHECKPOINT_FILE', tmp_path / 'prices.checkpoint.jsonl')
+    return module
+
+
+def test_refresh_priority_prefers_never_updated_then_stalest(cron):
+    now = datetime(2026, 10, 17, 12, 0)
+    entries = {
+        'new': None,
+        'stale': {'last_updated': (now - timedelta(hours=5)).isoformat(), 'data': [2000, 2000]},
+        'fresh_volatile': {'last_updated': (now - timedelta(minutes=30)).isoformat(), 'data': [1000, 3000]},
+        'fresh_flat': {'last_updated': (now - timedelta(minutes=30)).isoformat(), 'data': [2000, 2000]},
+    }
+    order = sorted(entries, key=lambda crop: cron.refresh_priority(entries[crop], now), reverse=True)
+
+    assert order == ['new', 'stale', 'fresh_volatile', 'fresh_flat']
+
+
+def test_checkpoint_restores_only_newer_entries(cron):
+    cron.checkpoint_crop('wheat', {'price': 24.0, 'last_updated': '2026-10-17T10:00:00'})
+    cron.checkpoint_crop('rice', {'price': 40.0, 'last_updated': '2026-10-17T10:00:00'})
+    with open(cron.CHECKPOINT_FILE, 'a', encoding='utf-8') as f:
+        f.write('{"crop": "tomato", "ent')  # the run was killed mid-line
+
+    all_prices = {
+        'wheat': {'price': 23.0, 'last_updated': '2026-10-17T11:00:00'},
+        'rice': {'price': 39.0, 'last_updated': '2026-10-16T10:00:00'},
+    }
+
+    assert cron.restore_checkpoint(all_prices) == 1
+    assert all_prices['wheat']['price'] == 23.0
+    assert all_prices['rice']['price'] == 40.0
+    assert all_prices['lastUpdated'] == '2026-10-17T10:00:00'
+    assert 'tomato' not in all_prices
+
+
+def test_clear_checkpoint(cron):
+    cron.checkpoint_crop('wheat', {'price': 24.0, 'last_updated': '2026-10-17T10:00:00'})
+    cron.clear_checkpoint()
+    cron.clear_checkpoint()
+
+    assert not cron.CHECKPOINT_FILE.exists()
+    assert cron.restore_checkpoint({}) == 0
@@ -0,0 +1,65 @@
+"""Per-thread connection reuse, transactions and bulk upserts"""
+
+import sqlite3
+import threading
+
+import pytest
+
+from database import CropPrice, MarketPrice
+
+
+def crop(name, price, history=(20.0, 21.0)):
+    return CropPrice(
+        crop_name=name, state='Maharashtra', unit='₹/quintal', current_price=price, source='test',
+        color='#000000', last_updated='2026-10-17T10:00:00', historical_labels=['W1', 'W2'], historical_data=list(history)
+    )
+
+
+def test_connection_is_reused_per_thread(db):
+    conn = db.get_connection()
+    assert db.get_connection() is conn
+    assert conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+
+    other = []
+    thread = threading.Thread(target=lambda: (other.append(db.get_connection()), db.close_connection()))
+    thread.start()
+    thread.join()
+    assert other[0] is not conn
+
+
+def test_failed_transaction_rolls_back_nested_writes(db):
+    with pytest.raises(RuntimeError):
+        with db.transaction():
+            CropPrice.bulk_upsert([crop('onion', 2000)])
+            raise RuntimeError('abort')
+
+    assert db.get_connection().execute('SELECT COUNT(*) FROM crop_prices').fetchone()[0] == 0
+
+
+def test_bulk_upsert_keeps_ids_and_market_rows(db):
+    ids = CropPrice.bulk_upsert([crop('onion', 2000), crop('tur', 9500)])
+    MarketPrice.bulk_upsert([(ids['onion'], 'Pune', 'Pune', 2000), (ids['onion'], 'Nashik', 'Nashik', 1900)])
+
+    assert CropPrice.bulk_upsert([crop('onion', 2100, history=(20.0, 21.0, 22.0))]) == {'onion': ids['onion']}
+    MarketPrice.bulk_upsert([(ids['onion'], 'Pune', 'Pune', 2150)])
+
+    conn = db.get_connection()
+    row = conn.execute('SELECT current_price, historical_data FROM crop_prices WHERE id = ?', (ids['onion'],)).fetchone()
+    assert (row['current_price'], row['historical_data']) == (2100, '[20.0, 21.0, 22.0]')
+    markets = conn.execute('SELECT market_name, price FROM market_prices ORDER BY market_name').fetchall()
+    assert [tuple(market) for market in markets] == [('Nashik', 1900), ('Pune', 2150)]
+
+
+def test_unique_market_index_waits_for_duplicates_to_be_removed(db):
+    crop_id = CropPrice.save(crop('onion', 2000))
+    conn = db.get_connection()
+    conn.execute('DROP INDEX idx_market_prices_crop_market')
+    conn.executemany(
+        'INSERT INTO market_prices (crop_id, market_name, district, price) VALUES (?, ?, ?, ?)',
+        [(crop_id, 'Pune', 'Pune', 2000), (crop_id, 'Pune', 'Pune', 2100)]
+    )
+    db.init_db()
+
+    with pytest.raises(sqlite3.OperationalError):
+        MarketPrice.bulk_upsert([(crop_id, 'Pune', 'Pune', 2200)])
+    assert conn.execute('SELECT COUNT(*) FROM market_prices').fetchone()[0] == 2
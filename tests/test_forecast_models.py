@@ -0,0 +1,65 @@
+"""Fitted forecasters and the refit rules of ForecastModelCache"""
+
+from datetime import date, timedelta
+
+import pytest
+
+from price_predictor import ARForecaster, ForecastModelCache, HoltForecaster, fit_best_forecaster
+
+START = date(2025, 1, 6)
+
+
+def weekly(values, start=START):
+    return [((start + timedelta(weeks=week)).isoformat(), value) for week, value in enumerate(values)]
+
+
+def trend(weeks, base=20.0, step=0.5):
+    return [base + step * week for week in range(weeks)]
+
+
+def test_holt_extrapolates_a_linear_trend():
+    state, errors = HoltForecaster().fit(trend(20))
+    assert HoltForecaster().forecast(state, 2) == pytest.approx([30.0, 30.5], abs=0.2)
+    assert state['seen'] == 20 and max(abs(error) for error in errors) < 0.2
+
+
+def test_short_series_fit_nothing():
+    assert ARForecaster().fit([20.0, 21.0]) is None
+    assert fit_best_forecaster([20.0]) is None
+
+
+def test_best_model_has_the_lowest_recent_error():
+    best = fit_best_forecaster(trend(30))
+    assert best['model'] in ('holt', 'ar') and best['mae'] < 0.2
+
+
+def test_stored_fit_is_updated_not_refitted(tmp_path):
+    path = str(tmp_path / 'models.json')
+    cache = ForecastModelCache(path)
+    today = START + timedelta(weeks=20)
+
+    first = cache.forecast('onion', 'Pune', weekly(trend(16)), today=today)
+    second = cache.forecast('onion', 'Pune', weekly(trend(17)), today=today)
+    assert first['refitted'] and not second['refitted'] and cache.refits == 1
+    assert second['predicted_price'] == pytest.approx(28.5, abs=0.3)
+    assert cache.save()
+
+    reloaded = ForecastModelCache(path)
+    assert reloaded.forecast('onion', 'Pune', weekly(trend(18)), today=today)['refitted'] is False
+    assert reloaded.forecast('onion', 'Pune', weekly(trend(18)), today=today + timedelta(days=28))['refitted'] is True
+
+
+def test_drift_triggers_a_refit(tmp_path):
+    cache = ForecastModelCache(str(tmp_path / 'models.json'))
+    today = START + timedelta(weeks=30)
+    cache.forecast('onion', 'Pune', weekly(trend(16)), today=today)
+
+    # The series jumps to a new level for several weeks
+    jumped = trend(16) + [60.0, 62.0, 61.0, 63.0, 62.0]
+    assert cache.forecast('onion', 'Pune', weekly(jumped), today=today)['refitted'] is True
+
+
+def test_no_refit_past_the_budget(tmp_path):
+    cache = ForecastModelCache(str(tmp_path / 'models.json'))
+    assert cache.forecast('onion', 'Pune', weekly(trend(16)), allow_refit=False) is None
+    assert cache.refits == 0
@@ -0,0 +1,97 @@
+"""ETag matching, 304 revalidation and compressed representations"""
+
+import gzip
+
+import pytest
+
+import http_caching
+from http_caching import (
+    add_cache_validators, compress_body, encode_response, etag_matches, representation_etag, select_representation
+)
+
+
+@pytest.mark.parametrize('header, expected', [
+    ('"abc"', True),
+    ('W/"abc"', True),
+    ('"xyz", "abc"', True),
+    ('"xyz",W/"abc"', True),
+    ('*', True),
+    ('"xyz"', False),
+    ('abc', False),
+    ('', False),
+    (None, False),
+])
+def test_etag_matches(header, expected):
+    assert etag_matches(header, '"abc"') is expected
+
+
+def test_encoded_etag_follows_content():
+    first = encode_response({'crop': 'onion', 'price': 21.5})
+    assert first.etag == encode_response({'crop': 'onion', 'price': 21.5}).etag
+    assert first.etag != encode_response({'crop': 'onion', 'price': 22.0}).etag
+    assert encode_response(None) is None
+
+
+def test_compressed_body_has_its_own_etag():
+    encoded = encode_response({'history': list(range(500))})
+    body, encoding, etag = compress_body(encoded.body, 'gzip, deflate', encoded.etag)
+
+    assert encoding == 'gzip'
+    assert gzip.decompress(body) == encoded.body
+    assert etag == representation_etag(encoded.etag, 'gzip') != encoded.etag
+    # A revalidation from a client holding the gzip variant matches it, not the identity one
+    assert etag_matches(etag, etag) and not etag_matches(etag, encoded.etag)
+
+
+def test_small_bodies_are_not_compressed():
+    encoded = encode_response({'ok': True})
+    assert compress_body(encoded.body, 'gzip', encoded.etag) == (encoded.body, None, encoded.etag)
+
+
+def test_representation_etag_is_known_before_compressing(monkeypatch):
+    encoded = encode_response({'prices': list(range(2000))})
+    body, encoding, etag = compress_body(encoded.body, 'gzip', encoded.etag)
+    monkeypatch.setattr(http_caching._compression_cache, 'get_or_compress', lambda *args: pytest.fail('compressed'))
+
+    assert select_representation(encoded.body, 'gzip', encoded.etag) == (encoding, etag)
+
+
+def test_flask_conditional_get_returns_304():
+    flask = pytest.importorskip('flask')
+    app = flask.Flask(__name__)
+    app.after_request(lambda response: add_cache_validators(response, flask.request))
+
+    @app.route('/price')
+    def price():
+        return flask.jsonify({'crop': 'wheat', 'current_price': 24.5, 'data_origin': 'live'})
+
+    client = app.test_client()
+    first = client.get('/price')
+    assert first.status_code == 200
+    assert first.headers['ETag']
+    assert first.headers['Cache-Control'].startswith('public, max-age=300')
+
+    revalidated = client.get('/price', headers={'If-None-Match': first.headers['ETag']})
+    assert revalidated.status_code == 304
+    assert revalidated.get_data() == b''
+
+    assert client.get('/price', headers={'If-None-Match': '"stale"'}).status_code == 200
+
+
+def test_flask_matching_revalidation_is_not_compressed(monkeypatch):
+    flask = pytest.importorskip('flask')
+    app = flask.Flask(__name__)
+    app.after_request(lambda response: add_cache_validators(response, flask.request))
+
+    @app.route('/prices')
+    def prices():
+        return flask.jsonify({'prices': list(range(2000))})
+
+    client = app.test_client()
+    first = client.get('/prices', headers={'Accept-Encoding': 'gzip'})
+    assert first.headers['Content-Encoding'] == 'gzip'
+
+    monkeypatch.setattr(http_caching._compression_cache, 'get_or_compress', lambda *args: pytest.fail('compressed'))
+    revalidated = client.get('/prices', headers={'Accept-Encoding': 'gzip', 'If-None-Match': first.headers['ETag']})
+    assert revalidated.status_code == 304
+    assert revalidated.headers['ETag'] == first.headers['ETag']
@@ -0,0 +1,63 @@
+"""Per-host slot limits and how a busy host is reported"""
+
+import threading
+import time
+
+import pytest
+import requests
+
+import http_client
+import multi_source_price_scraper
+from http_client import HostBusy, http_get
+
+
+@pytest.fixture
+def single_slot_host(monkeypatch):
+    """A host limited to one concurrent request, with that slot taken"""
+    monkeypatch.setitem(http_client.HOST_CONCURRENCY_LIMITS, 'busy.example', 1)
+    monkeypatch.setattr(http_client, '_host_limits', {})
+    slot = http_client._get_host_limit('https://busy.example/')
+    slot.acquire()
+    yield slot
+    slot.release()
+
+
+def test_busy_host_is_not_an_upstream_error(single_slot_host):
+    started = time.monotonic()
+    with pytest.raises(HostBusy) as raised:
+        http_get('https://busy.example/prices', timeout=0.2)
+
+    assert not isinstance(raised.value, requests.RequestException)
+    assert 0.2 <= time.monotonic() - started < 1
+
+
+def test_slot_wait_counts_against_timeout(single_slot_host, monkeypatch):
+    seen = {}
+
+    class Session:
+        def get(self, url, **kwargs):
+            seen.update(kwargs)
+            return 'response'
+
+    monkeypatch.setattr(http_client, 'get_session', lambda: Session())
+    threading.Timer(0.3, single_slot_host.release).start()
+
+    assert http_get('https://busy.example/prices', timeout=(5, 10)) == 'response'
+    assert 4 < seen['timeout'][0] < 4.8 and seen['timeout'][1] == 10
+    single_slot_host.acquire()
+
+
+def test_busy_host_does_not_open_breaker(lookup_state, monkeypatch):
+    def busy(url, **kwargs):
+        raise HostBusy('all slots busy')
+
+    monkeypatch.setattr(multi_source_price_scraper, 'http_get', busy)
+    source = multi_source_price_scraper.DataGovAPISource()
+    for _ in range(multi_source_price_scraper.BREAKER_FAILURE_THRESHOLD + 1):
+        assert source.fetch_price('onion') is None
+
+    snapshot = source.breaker.snapshot()
+    assert snapshot['state'] == 'closed'
+    assert snapshot['failures'] == snapshot['timeouts'] == 0
+    # A busy host says nothing about whether the crop has records
+    assert not lookup_state.is_negative('onion', 'Maharashtra')
@@ -0,0 +1,60 @@
+"""Running window statistics and how PriceStatsStore keeps them in sync"""
+
+import statistics
+from datetime import date, timedelta
+
+import pytest
+
+from incremental_stats import PriceStatsStore, RunningPriceStats
+
+
+def weekly(values, start=date(2026, 7, 6)):
+    return [((start + timedelta(weeks=week)).isoformat(), price) for week, price in enumerate(values)]
+
+
+def assert_matches_window(stats, values):
+    assert list(stats.values) == values
+    assert stats.mean == pytest.approx(statistics.fmean(values))
+    assert stats.variance() == pytest.approx(statistics.pvariance(values))
+
+
+def test_window_slides_and_last_day_is_replaced():
+    stats = RunningPriceStats(window=4)
+    stats.extend(weekly([20.0, 22.0, 21.0, 25.0, 30.0]))
+    assert_matches_window(stats, [22.0, 21.0, 25.0, 30.0])
+
+    assert stats.append(stats.last_date, 28.0)
+    assert not stats.append('2026-01-01', 10.0)
+    assert_matches_window(stats, [22.0, 21.0, 25.0, 28.0])
+    assert stats.slope() == pytest.approx(statistics.linear_regression(range(4), [22.0, 21.0, 25.0, 28.0]).slope)
+
+
+def test_sync_appends_only_new_weeks(tmp_path):
+    store = PriceStatsStore(str(tmp_path / 'stats.json'), window=4)
+    store.sync('onion', 'Pune', weekly([20.0, 22.0, 21.0]))
+    stats = store.sync('onion', 'Pune', weekly([20.0, 22.0, 21.5, 25.0]))
+
+    assert_matches_window(stats, [20.0, 22.0, 21.5, 25.0])
+    assert stats.updates == 5  # three, then the revised last week and one new one
+
+
+@pytest.mark.parametrize('points', [
+    weekly([20.0, 19.0, 21.0, 25.0]),  # an earlier week revised
+    [point for index, point in enumerate(weekly([20.0, 22.0, 21.0, 25.0])) if index != 1],  # one dropped
+])
+def test_sync_rebuilds_when_an_earlier_week_changes(tmp_path, points):
+    store = PriceStatsStore(str(tmp_path / 'stats.json'), window=4)
+    store.sync('onion', 'Pune', weekly([20.0, 22.0, 21.0]))
+
+    stats = store.sync('onion', 'Pune', points)
+    assert_matches_window(stats, [price for _, price in points])
+
+
+def test_store_round_trips(tmp_path):
+    path = str(tmp_path / 'stats.json')
+    store = PriceStatsStore(path, window=4)
+    store.sync('onion', 'Pune', weekly([20.0, 22.0, 21.0]))
+    assert store.save()
+
+    reloaded = PriceStatsStore(path, window=4).get('ONION', 'pune')
+    assert_matches_window(reloaded, [20.0, 22.0, 21.0])
@@ -0,0 +1,75 @@
+"""Keep-alive, idle timeouts and draining in the local server mode"""
+
+import http.client
+import threading
+import time
+from http.server import BaseHTTPRequestHandler
+
+import pytest
+
+from local_server import BoundedThreadingHTTPServer, make_local_handler
+
+
+class EchoHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path == '/slow':
+            time.sleep(0.3)
+        body = self.path.encode()
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = BoundedThreadingHTTPServer(('127.0.0.1', 0), make_local_handler(EchoHandler, 5, idle_timeout=0.2), max_workers=2)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.drain(1)
+    server.server_close()
+
+
+def get(connection, path):
+    connection.request('GET', path)
+    response = connection.getresponse()
+    return response.read()
+
+
+def test_requests_share_a_keep_alive_connection(server):
+    connection = http.client.HTTPConnection(*server.server_address, timeout=5)
+    assert get(connection, '/one') == b'/one'
+    sock = connection.sock
+    assert get(connection, '/two') == b'/two'
+    assert connection.sock is sock
+    connection.close()
+
+
+def test_idle_connection_is_closed(server):
+    connection = http.client.HTTPConnection(*server.server_address, timeout=5)
+    get(connection, '/one')
+    time.sleep(0.5)
+
+    # The server hung up after its idle timeout and freed the worker
+    assert connection.sock.recv(1) == b''
+    assert not server.saturated()
+    connection.close()
+
+
+def test_drain_waits_for_in_flight_requests(server):
+    connection = http.client.HTTPConnection(*server.server_address, timeout=5)
+    result = []
+    client = threading.Thread(target=lambda: result.append(get(connection, '/slow')))
+    client.start()
+    time.sleep(0.1)
+
+    server.shutdown()
+    assert server.drain(5) == 0
+    client.join(5)
+    assert result == [b'/slow']
+    connection.close()
@@ -0,0 +1,92 @@
+"""Negative-result cache rules and alias ordering"""
+
+import json
+import time
+from datetime import date, timedelta
+
+from lookup_memory import DEMOTE_AFTER_MISSES, AliasOrderLearner, NegativeResultCache
+
+
+def make_cache(path, **kwargs):
+    kwargs.setdefault('save_interval_seconds', 3600)
+    return NegativeResultCache(str(path), **kwargs)
+
+
+def test_negative_only_for_today(tmp_path):
+    cache = make_cache(tmp_path / 'negative.json')
+    cache.mark_negative('Onion', 'Maharashtra')
+    cache.mark_negative('Wheat', 'Maharashtra', arrival_date=date.today() - timedelta(days=1))
+
+    assert cache.is_negative('onion', 'maharashtra')
+    assert not cache.is_negative('wheat', 'Maharashtra')
+    assert not cache.is_negative('onion', 'Gujarat')
+
+
+def test_negative_expires_after_ttl(tmp_path):
+    cache = make_cache(tmp_path / 'negative.json', ttl_seconds=60)
+    cache.mark_negative('onion', 'Maharashtra')
+    cache._entries[cache._key('onion', 'Maharashtra')]['recorded_at'] = time.time() - 61
+
+    assert not cache.is_negative('onion', 'Maharashtra')
+
+
+def test_clear_forgets_entry(tmp_path):
+    cache = make_cache(tmp_path / 'negative.json')
+    cache.mark_negative('onion', 'Maharashtra')
+    cache.clear('onion', 'Maharashtra')
+
+    assert not cache.is_negative('onion', 'Maharashtra')
+
+
+def test_writes_are_batched_until_flush(tmp_path):
+    path = tmp_path / 'negative.json'
+    cache = make_cache(path)
+    cache.mark_many_negative(['onion', 'tomato'], 'Maharashtra')
+    assert not path.exists()
+
+    assert cache.flush()
+    assert set(json.loads(path.read_text())) == {'onion|maharashtra', 'tomato|maharashtra'}
+
+
+def test_flush_keeps_another_process_clear(tmp_path):
+    path = tmp_path / 'negative.json'
+    api = make_cache(path)
+    api.mark_negative('onion', 'Maharashtra')
+    api.flush()
+
+    # The cron job sees records again and clears the entry
+    cron = make_cache(path)
+    cron.clear('onion', 'Maharashtra')
+    cron.flush()
+
+    # A later API write must not bring the cleared entry back
+    api.mark_negative('tomato', 'Maharashtra')
+    api.flush()
+
+    fresh = make_cache(path)
+    assert not fresh.is_negative('onion', 'Maharashtra')
+    assert fresh.is_negative('tomato', 'Maharashtra')
+
+
+def test_flush_drops_previous_days(tmp_path):
+    path = tmp_path / 'negative.json'
+    yesterday = (date.today() - timedelta(days=1)).isoformat()
+    path.write_text(json.dumps({'onion|maharashtra': {'date': yesterday, 'recorded_at': time.time()}}))
+
+    cache = make_cache(path)
+    cache.mark_negative('tomato', 'Maharashtra')
+    cache.flush()
+
+    assert set(json.loads(path.read_text())) == {'tomato|maharashtra'}
+
+
+def test_alias_order_prefers_last_hit_and_demotes_misses(tmp_path):
+    learner = AliasOrderLearner(str(tmp_path / 'alias.json'), save_interval_seconds=3600)
+    aliases = ['Soyabean', 'Soybean', 'Soya Bean']
+
+    learner.record_hit('soybean', 'Maharashtra', 'Soybean')
+    for _ in range(DEMOTE_AFTER_MISSES):
+        learner.record_miss('soybean', 'Maharashtra', 'Soyabean')
+
+    assert learner.order('soybean', 'Maharashtra', aliases) == ['Soybean', 'Soya Bean', 'Soyabean']
+    assert learner.order('soybean', 'Gujarat', aliases) == aliases
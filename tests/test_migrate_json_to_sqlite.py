@@ -0,0 +1,83 @@
+"""Legacy market_prices dedupe and the copy into the normalized schema"""
+
+import importlib.util
+import json
+import os
+import sys
+
+import pytest
+
+SCRIPT_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scripts', 'python', 'migrate_json_to_sqlite.py'
+)
+
+
+@pytest.fixture
+def migration(tmp_path, monkeypatch):
+    spec = importlib.util.spec_from_file_location('migrate_json_to_sqlite', SCRIPT_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    # The script imports the database module as backend.database
+    database = sys.modules['backend.database']
+    database.close_connection()
+    monkeypatch.setattr(database, 'DB_PATH', str(tmp_path / 'farm_database.db'))
+    monkeypatch.setattr(module, 'HISTORY_DIR', str(tmp_path / 'history'))
+    database.init_db()
+    yield module
+    database.close_connection()
+
+
+def legacy_onion(migration, markets):
+    crop_id = migration.CropPrice.save(migration.CropPrice(
+        crop_name='onion', state='Maharashtra', unit='₹/quintal', current_price=2000, source='test',
+        color='#000000', last_updated='2026-10-14T09:00:00', historical_labels=[], historical_data=[]
+    ))
+    conn = migration.get_connection()
+    conn.execute('DROP INDEX idx_market_prices_crop_market')
+    conn.executemany(
+        'INSERT INTO market_prices (crop_id, market_name, district, price) VALUES (?, ?, ?, ?)',
+        [(crop_id, name, district, price) for name, district, price in markets]
+    )
+    return conn
+
+
+def test_dedupe_keeps_the_newest_row_and_adds_the_index(migration):
+    conn = legacy_onion(migration, [('Pune', 'Pune', 1800), ('Pune', 'Pune', 2000), ('Nashik', 'Nashik', 1900)])
+
+    assert migration.dedupe_market_prices() == 1
+    rows = conn.execute('SELECT market_name, price FROM market_prices ORDER BY market_name').fetchall()
+    assert [tuple(row) for row in rows] == [('Nashik', 1900), ('Pune', 2000)]
+    assert conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE name = 'idx_market_prices_crop_market'"
+    ).fetchone()
+
+
+def test_normalized_copy_is_per_kg_and_idempotent(migration, tmp_path):
+    legacy_onion(migration, [('Pune', 'Pune', 2000)])
+    migration.dedupe_market_prices()
+    (tmp_path / 'history').mkdir()
+    (tmp_path / 'history' / 'onion.jsonl').write_text(json.dumps({
+        'commodity': 'onion', 'market': 'Lasalgaon', 'district': 'Nashik', 'state': 'Maharashtra',
+        'arrival_date': '2026-10-13', 'modal_price': 1500, 'min_price': 1200, 'max_price': 1700, 'unit': 'Quintal'
+    }) + '\n')
+
+    migration.migrate_normalized()
+    migration.migrate_normalized()
+
+    rows = migration.get_connection().execute('''
+        SELECT m.name, o.obs_date, o.modal_price FROM price_observations o
+        JOIN markets m ON m.id = o.market_id ORDER BY m.name
+    ''').fetchall()
+    assert [tuple(row) for row in rows] == [('Lasalgaon', '2026-10-13', 15.0), ('Pune', '2026-10-14', 20.0)]
+    [week] = migration.PriceRollup.latest('onion')
+    assert (week.days, week.mean_price, week.modal_price) == (2, 17.5, 20.0)
+
+
+def test_pseudo_market_rows_are_removed(migration):
+    migration.PriceObservation.bulk_upsert([
+        migration.PriceObservation(commodity='onion', market=name, obs_date='2026-10-14', modal_price=price)
+        for name, price in (('Pune', 20.0), (migration.ALL_MARKETS, 500.0))
+    ])
+
+    assert migration.remove_pseudo_market_observations() == 1
+    assert [week.modal_price for week in migration.PriceRollup.latest('onion')] == [20.0]
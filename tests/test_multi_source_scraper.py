@@ -0,0 +1,92 @@
+"""Bulk fan-out, circuit breakers and source results in MultiSourcePriceScraper"""
+
+import threading
+import time
+
+import multi_source_price_scraper
+from multi_source_price_scraper import CircuitBreaker, MultiSourcePriceScraper
+
+
+def cached_result(source, crop='onion'):
+    data = {'crop': crop, 'price': 21, 'unit': 'kg', 'market': 'Pune', 'confidence': 90}
+    source.set_cache(crop, data)
+    return data
+
+
+def test_lookup_leaves_the_source_cache_untouched(db, monkeypatch):
+    scraper = MultiSourcePriceScraper(use_negative_cache=False)
+    source = scraper.sources[0]
+    cached = cached_result(source)
+    monkeypatch.setattr(source, 'fetch_price', lambda crop, state='Maharashtra': source.get_cached_price(crop))
+
+    result = scraper.get_price('onion')
+
+    assert result['data_source'] == source.name and result['price'] == 21
+    assert cached == {'crop': 'onion', 'price': 21, 'unit': 'kg', 'market': 'Pune', 'confidence': 90}
+
+
+def test_bulk_fallback_leaves_the_source_cache_untouched(db):
+    scraper = MultiSourcePriceScraper(use_negative_cache=False)
+    cached = cached_result(scraper.sources[0])
+
+    result = scraper._get_bulk_fallback('Onion', 'Maharashtra')
+
+    assert result['is_fallback'] and result['crop'] == 'Onion'
+    assert 'data_source' not in cached and cached['crop'] == 'onion'
+
+
+def test_bulk_lookup_falls_back_for_crops_past_the_deadline(db, monkeypatch):
+    scraper = MultiSourcePriceScraper(use_negative_cache=False)
+    release = threading.Event()
+
+    def get_price(crop, state='Maharashtra', use_fallback=True, deadline_seconds=None):
+        if crop == 'Tur':
+            release.wait(5)
+        return {'crop': crop, 'price': 30, 'data_source': 'live'}
+
+    monkeypatch.setattr(scraper, 'get_price', get_price)
+    started = time.monotonic()
+    try:
+        results = scraper.get_bulk_prices(['Onion', 'Tur', 'onion ', 'Wheat', ''], deadline_seconds=0.3)
+    finally:
+        release.set()
+
+    assert time.monotonic() - started < 2
+    assert list(results) == ['Onion', 'Tur', 'onion', 'Wheat']
+    assert results['Onion']['data_origin'] == 'live'
+    assert results['Tur']['data_origin'] == 'estimate' and results['Tur']['is_fallback']
+
+
+def test_breaker_opens_after_threshold_and_probes_once(monkeypatch):
+    clock = [100.0]
+    monkeypatch.setattr(multi_source_price_scraper.time, 'monotonic', lambda: clock[0])
+    breaker = CircuitBreaker('test', failure_threshold=2, reset_timeout_seconds=30)
+
+    breaker.record_failure()
+    assert breaker.allow_request()
+    breaker.record_failure(timeout=True)
+    assert breaker.state == CircuitBreaker.OPEN and not breaker.allow_request()
+
+    clock[0] += 30
+    assert breaker.allow_request() and breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow_request()  # one probe at a time
+
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    clock[0] += 30
+    assert breaker.allow_request()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED and breaker.consecutive_failures == 0
+    assert breaker.counters == {'successes': 1, 'failures': 2, 'timeouts': 1, 'rejected': 2}
+
+
+def test_released_probe_lets_the_next_request_through(monkeypatch):
+    clock = [100.0]
+    monkeypatch.setattr(multi_source_price_scraper.time, 'monotonic', lambda: clock[0])
+    breaker = CircuitBreaker('test', failure_threshold=1, reset_timeout_seconds=30)
+    breaker.record_failure()
+    clock[0] += 30
+
+    assert breaker.allow_request()
+    breaker.release()
+    assert breaker.allow_request() and breaker.state == CircuitBreaker.HALF_OPEN
@@ -0,0 +1,57 @@
+"""Precomputed forecasts: which model each series gets and the /api/predict lookup"""
+
+from datetime import date, timedelta
+
+from database import CROP_WIDE
+from incremental_stats import PriceStatsStore
+from price_forecasts import build_predictions, find_prediction
+from price_predictor import ForecastModelCache
+
+TODAY = date(2026, 10, 17)
+
+
+def weekly(values):
+    start = TODAY - timedelta(weeks=len(values))
+    return [((start + timedelta(weeks=week)).isoformat(), value) for week, value in enumerate(values)]
+
+
+def predictions(tmp_path):
+    all_prices = {
+        'lastUpdated': '2026-10-17T10:00:00',
+        'onion': {'current_price': 2000},
+        'tur': {'historical_prices': [90.0, 92.0, 94.0, 96.0]},
+        'rice': {'error': 'no data'},
+    }
+    rollups = {'onion': {
+        CROP_WIDE: weekly([20.0 + 0.5 * week for week in range(16)]),
+        'Pune': weekly([22.0, 23.0, 24.0]),
+    }}
+    return build_predictions(
+        all_prices, rollups, ForecastModelCache(str(tmp_path / 'models.json')), today=TODAY,
+        stats_store=PriceStatsStore(str(tmp_path / 'stats.json'), window=12)
+    )
+
+
+def test_each_series_gets_a_forecast(tmp_path):
+    result = predictions(tmp_path)
+
+    assert set(result) == {'onion', 'tur'}
+    onion = result['onion']
+    assert onion['overall']['model'] in ('holt', 'ar') and onion['overall']['points'] == 16
+    assert onion['overall']['predicted_price'] > onion['overall']['current_price']
+    assert onion['markets']['Pune']['model'] == 'moving_average'
+    assert result['tur']['overall']['model'] == 'moving_average' and result['tur']['markets'] == {}
+
+
+def test_find_prediction_by_market(tmp_path):
+    result = predictions(tmp_path)
+
+    pune = find_prediction(result, 'Onion', 'pune')
+    assert pune['market'] == 'Pune' and pune['market_matched'] is True
+    assert pune['prediction'] == result['onion']['markets']['Pune']
+
+    unknown = find_prediction(result, 'onion', 'Lasalgaon')
+    assert unknown['market_matched'] is False and unknown['prediction'] == result['onion']['overall']
+    assert find_prediction(result, 'onion')['market_matched'] is None
+    assert find_prediction(result, 'lastUpdated') is None
+    assert find_prediction(result, 'rice') is None
@@ -0,0 +1,50 @@
+"""Recording fetched records off the request path"""
+
+import threading
+
+import pytest
+
+import price_history_store
+from database import PriceRollup
+from price_history_store import HistoryRecorder, history_stats, record_api_records, to_per_kg
+
+
+def record(market, day, price):
+    return {'market': market, 'district': 'Pune', 'state': 'Maharashtra', 'arrival_date': day, 'modal_price': str(price)}
+
+
+@pytest.fixture
+def recorder(monkeypatch):
+    recorder = HistoryRecorder()
+    monkeypatch.setattr(price_history_store, '_recorder', recorder)
+    return recorder
+
+
+def test_to_per_kg():
+    assert to_per_kg(2150, 'Rs/Quintal') == 21.5
+    assert to_per_kg(30000, 'Tonne') == 30
+    assert to_per_kg(21.5, 'kg') == 21.5
+
+
+def test_records_are_written_in_the_background(db, recorder):
+    assert record_api_records('onion', [record('Pune', '13/10/2026', 2000), record('Pune', '14/10/2026', 2400)])
+    assert record_api_records('onion', [record('Nashik', '14/10/2026', 1800)])
+    assert recorder.flush()
+
+    assert [week.modal_price for week in PriceRollup.latest('onion', market='Pune')] == [24.0]
+    stats = history_stats()
+    assert (stats['queued'], stats['written'], stats['pending'], stats['errors']) == (2, 3, 0, 0)
+
+
+def test_full_queue_drops_instead_of_blocking(monkeypatch):
+    release = threading.Event()
+    recorder = HistoryRecorder(max_pending=1)
+    monkeypatch.setattr(recorder, '_write', lambda batch: release.wait(5))
+
+    assert recorder.submit('onion', [record('Pune', '14/10/2026', 2000)], 'data.gov.in')
+    accepted = [recorder.submit('onion', [record('Pune', '14/10/2026', 2000)], 'data.gov.in') for _ in range(3)]
+    release.set()
+
+    assert recorder.flush()
+    assert False in accepted
+    assert recorder.stats()['dropped'] >= 1
@@ -0,0 +1,65 @@
+"""Batch, incremental and scalar next-week forecasts agree"""
+
+import random
+from datetime import date, timedelta
+
+import pytest
+
+from incremental_stats import RunningPriceStats
+from price_predictor import SimplePricePredictor
+
+np = pytest.importorskip('numpy')
+
+predictor = SimplePricePredictor()
+
+
+def random_histories(count=200, seed=7):
+    rng = random.Random(seed)
+    histories = []
+    for _ in range(count):
+        base = rng.uniform(5, 120)
+        histories.append([round(base * rng.uniform(0.8, 1.2), 2) for _ in range(rng.randint(0, 16))])
+    return histories
+
+
+def assert_same_prediction(batch, scalar):
+    assert batch.keys() == scalar.keys()
+    for key, expected in scalar.items():
+        if isinstance(expected, float):
+            assert batch[key] == pytest.approx(expected, abs=0.011), key
+        else:
+            assert batch[key] == expected, key
+
+
+def test_predict_many_matches_predict_next_week():
+    histories = random_histories()
+    for batch, history in zip(predictor.predict_many(histories), histories):
+        assert_same_prediction(batch, predictor.predict_next_week(history))
+
+
+def test_predict_batch_skips_missing_weeks():
+    rng = random.Random(11)
+    matrix = np.array([[rng.uniform(10, 50) for _ in range(12)] for _ in range(50)])
+    gaps = np.array([[rng.random() < 0.3 for _ in range(12)] for _ in range(50)])
+    matrix[gaps] = np.nan
+
+    batch = predictor.predict_batch(matrix.reshape(5, 10, 12))
+    assert batch['predicted_price'].shape == (5, 10)
+
+    for row in range(50):
+        history = [value for value in matrix[row] if not np.isnan(value)]
+        scalar = predictor.predict_next_week(history)
+        flat = {key: value.reshape(-1)[row] for key, value in batch.items()}
+        assert flat['predicted_price'] == pytest.approx(scalar['predicted_price'], abs=0.011)
+        if len(history) >= 3:
+            assert flat['trend_direction'] == scalar['trend_direction']
+            assert flat['confidence'] == pytest.approx(scalar['confidence'], abs=0.051)
+
+
+def test_predict_from_stats_matches_predict_next_week():
+    for history in random_histories(count=50, seed=3):
+        stats = RunningPriceStats(window=12)
+        for week, price in enumerate(history):
+            stats.append((date(2026, 1, 5) + timedelta(weeks=week)).isoformat(), price)
+        window = history[-12:]
+        assert_same_prediction(predictor.predict_from_stats(stats), predictor.predict_next_week(window))
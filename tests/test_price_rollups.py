@@ -0,0 +1,87 @@
+"""Observation storage and weekly/monthly rollup keying"""
+
+from database import ALL_MARKETS, CROP_WIDE, PriceObservation, PriceRollup
+
+
+def observation(market, obs_date, price, district='Pune', **kwargs):
+    return PriceObservation(
+        commodity='onion', market=market, obs_date=obs_date, modal_price=price,
+        district=district, state='Maharashtra', **kwargs
+    )
+
+
+def test_record_conversion():
+    record = {
+        'market': 'Pune', 'district': 'Pune', 'state': 'Maharashtra', 'arrival_date': '14/10/2026',
+        'modal_price': '2,150', 'min_price': '1800', 'max_price': '2400', 'unit': 'Quintal'
+    }
+    parsed = PriceObservation.from_record('onion', record)
+
+    assert (parsed.obs_date, parsed.modal_price, parsed.min_price, parsed.max_price) == ('2026-10-14', 21.5, 18.0, 24.0)
+    assert PriceObservation.from_record('onion', {**record, 'market': CROP_WIDE}) is None
+    assert PriceObservation.from_record('onion', {**record, 'arrival_date': 'yesterday'}) is None
+
+
+def test_varieties_of_one_day_are_merged():
+    merged = PriceObservation.merge_varieties([
+        observation('Pune', '2026-10-14', 20.0, min_price=18.0, max_price=22.0, arrivals=10),
+        observation('Pune', '2026-10-14', 30.0, min_price=25.0, max_price=35.0, arrivals=5),
+        observation('Nashik', '2026-10-14', 15.0, district='Nashik'),
+    ])
+    pune = next(item for item in merged if item.market == 'Pune')
+
+    assert len(merged) == 2
+    assert (pune.modal_price, pune.min_price, pune.max_price, pune.arrivals) == (25.0, 18.0, 35.0, 15)
+
+
+def test_rollups_are_keyed_by_week_start(db):
+    # 2026-10-12 is a Monday; the 14th and 16th fall in its week
+    PriceObservation.bulk_upsert([
+        observation('Pune', '2026-10-14', 20.0),
+        observation('Pune', '2026-10-16', 24.0),
+        observation('Pune', '2026-10-19', 30.0),
+    ])
+    weeks = PriceRollup.latest('onion', 'week', market='pune')
+
+    assert [(week.period_start, week.days) for week in weeks] == [('2026-10-12', 2), ('2026-10-19', 1)]
+    assert weeks[0].modal_price == 24.0  # latest day of the week
+    assert weeks[0].mean_price == 22.0
+    assert [month.period_start for month in PriceRollup.latest('onion', 'month')] == ['2026-10-01']
+
+
+def test_series_by_market_keys(db):
+    PriceObservation.bulk_upsert([
+        observation('Pune', '2026-10-14', 20.0),
+        observation('Shirur', '2026-10-14', 30.0, district='Pune'),
+        observation('Shirur', '2026-10-14', 40.0, district='Ahmednagar'),
+        observation(ALL_MARKETS, '2026-10-14', 500.0, district=''),
+    ])
+    series = PriceRollup.series_by_market('onion')
+
+    assert set(series) == {CROP_WIDE, 'Pune', 'Shirur (Pune)', 'Shirur (Ahmednagar)'}
+    # The pseudo-market is neither its own series nor part of the commodity-wide one
+    assert series[CROP_WIDE] == [('2026-10-12', 30.0)]
+
+
+def test_revised_day_replaces_rollup(db):
+    PriceObservation.bulk_upsert([observation('Pune', '2026-10-14', 20.0)])
+    PriceObservation.bulk_upsert([observation('Pune', '2026-10-14', 26.0)])
+
+    assert [week.modal_price for week in PriceRollup.latest('onion')] == [26.0]
+
+
+def test_latest_resolves_markets_like_series_by_market(db):
+    PriceObservation.bulk_upsert([
+        observation('Shirur', '2026-10-14', 30.0, district='Pune', arrivals=10),
+        observation('Shirur', '2026-10-14', 40.0, district='Ahmednagar', arrivals=5),
+    ])
+    series = PriceRollup.series_by_market('onion')
+
+    for key in ('Shirur (Pune)', 'shirur (ahmednagar)'):
+        canonical = next(name for name in series if name.lower() == key.lower())
+        assert [(week.period_start, week.modal_price) for week in PriceRollup.latest('onion', market=key)] == series[canonical]
+
+    # A bare name shared across districts covers both markets
+    [week] = PriceRollup.latest('onion', market='Shirur')
+    assert (week.modal_price, week.min_price, week.max_price, week.arrivals) == (35.0, 30.0, 40.0, 15)
+    assert PriceRollup.latest('onion', market='Shirur (Nashik)') == []
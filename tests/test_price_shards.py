@@ -0,0 +1,52 @@
+"""Static per-crop shards: payloads, unchanged rewrites and the manifest"""
+
+import json
+
+from price_canonical import canonicalize_cached_entry
+from price_shards import shard_slug, write_price_shards
+
+
+def prices(markets=(('Pune', 2050), ('Lasalgaon APMC', 1950))):
+    return {
+        'lastUpdated': '2026-10-17T10:00:00',
+        'source': 'test',
+        'onion': {
+            'labels': ['1W ago', 'Current'], 'data': [1900, 2000], 'state': 'Maharashtra',
+            'unit': '₹/quintal', 'current_price': 2000,
+            'markets': [{'name': name, 'district': 'Nashik', 'price': price} for name, price in markets],
+        },
+    }
+
+
+def test_shard_slug():
+    assert shard_slug('Lasalgaon APMC') == 'lasalgaon-apmc'
+    assert shard_slug(' Arhar (Tur/Red Gram) ') == 'arhar-tur-red-gram'
+
+
+def test_shard_is_the_cached_api_payload(db, tmp_path):
+    snapshot = prices()
+    write_price_shards(snapshot, directory=str(tmp_path))
+
+    expected = canonicalize_cached_entry('onion', 'Maharashtra', '', snapshot['onion'], snapshot)
+    assert json.loads((tmp_path / 'onion.json').read_text(encoding='utf-8')) == expected
+    manifest = json.loads((tmp_path / 'manifest.json').read_text(encoding='utf-8'))
+    assert set(manifest['files']) == {'onion.json', 'onion/pune.json', 'onion/lasalgaon-apmc.json'}
+    assert manifest['crops']['onion']['markets']['Pune']['path'] == 'onion/pune.json'
+
+
+def test_unchanged_shards_keep_their_versions(db, tmp_path):
+    first = write_price_shards(prices(), directory=str(tmp_path))
+    second = write_price_shards(prices(), directory=str(tmp_path))
+
+    assert first['written'] == 3
+    assert second == {**first, 'written': 0}
+
+
+def test_dropped_market_shard_is_removed(db, tmp_path):
+    write_price_shards(prices(), directory=str(tmp_path))
+    result = write_price_shards(prices(markets=(('Pune', 2100),)), directory=str(tmp_path))
+
+    assert result['removed'] == 1 and result['manifest_version'] == 2
+    assert not (tmp_path / 'onion' / 'lasalgaon-apmc.json').exists()
+    manifest = json.loads((tmp_path / 'manifest.json').read_text(encoding='utf-8'))
+    assert manifest['files']['onion/pune.json']['version'] == 2
@@ -0,0 +1,67 @@
+"""TTL, LRU eviction and stale-while-revalidate in ResponseCache"""
+
+import threading
+import time
+
+from response_cache import ResponseCache
+
+
+def test_fresh_entries_skip_the_loader():
+    cache = ResponseCache()
+    loads = []
+    load = lambda: loads.append(1) or {'price': 21.5}
+
+    assert cache.get_or_load('onion', load) == {'price': 21.5}
+    assert cache.get_or_load('onion', load) == {'price': 21.5}
+    assert len(loads) == 1
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 1
+
+
+def test_none_is_not_cached():
+    cache = ResponseCache()
+    assert cache.get_or_load('onion', lambda: None) is None
+    assert cache.stats()['size'] == 0
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ResponseCache(max_entries=2)
+    cache.set('onion', 1)
+    cache.set('tur', 2)
+    cache.get('onion')
+    cache.set('wheat', 3)
+
+    assert cache.get('tur') is None
+    assert cache.get('onion') == 1 and cache.get('wheat') == 3
+    assert cache.stats()['evictions'] == 1
+
+
+def test_stale_entry_is_served_while_one_refresh_runs():
+    cache = ResponseCache(ttl_seconds=0, max_stale_seconds=60)
+    cache.set('onion', 'old')
+    release = threading.Event()
+    refreshed = threading.Event()
+    loads = []
+
+    def reload():
+        loads.append(1)
+        release.wait(5)
+        refreshed.set()
+        return 'new'
+
+    assert cache.get_or_load('onion', reload, ttl_for=lambda value: 60) == 'old'
+    assert cache.get_or_load('onion', reload, ttl_for=lambda value: 60) == 'old'
+    release.set()
+    assert refreshed.wait(5)
+
+    for _ in range(100):
+        if cache.stats()['refreshing'] == 0:
+            break
+        time.sleep(0.01)
+    assert cache.get('onion') == 'new'
+    assert len(loads) == 1 and cache.stats()['refreshes'] == 1
+
+
+def test_entries_past_the_stale_window_reload_inline():
+    cache = ResponseCache(ttl_seconds=0, max_stale_seconds=0)
+    cache.set('onion', 'old')
+    assert cache.get_or_load('onion', lambda: 'new') == 'new'
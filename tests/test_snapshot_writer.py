@@ -0,0 +1,101 @@
+"""Snapshot versions, generations and the SQLite copy"""
+
+import json
+
+import pytest
+
+import snapshot_writer
+from snapshot_writer import HASH_KEY, VERSION_KEY, load_snapshot, publish_prices, write_snapshot
+
+
+def snapshot(price, updated='2026-10-17T10:00:00'):
+    return {
+        'lastUpdated': updated,
+        'source': 'test',
+        'onion': {'current_price': price, 'last_updated': updated, 'unit': '₹/quintal'},
+    }
+
+
+def test_version_is_stable_when_only_timestamps_change(tmp_path):
+    path = str(tmp_path / 'prices.json')
+    first = write_snapshot(path, snapshot(21.5))
+    second = write_snapshot(path, snapshot(21.5, updated='2026-10-17T11:00:00'))
+
+    assert first == {'written': True, 'version': 1, 'hash': first['hash']}
+    assert second == {'written': False, 'version': 1, 'hash': first['hash']}
+    # The skipped write left the file as it was
+    assert json.loads((tmp_path / 'prices.json').read_text())['lastUpdated'] == '2026-10-17T10:00:00'
+
+
+def test_changed_prices_bump_version_and_keep_generations(tmp_path):
+    path = str(tmp_path / 'prices.json')
+    for version, price in enumerate((20.0, 21.0, 22.0, 23.0), start=1):
+        assert write_snapshot(path, snapshot(price), generations=2)['version'] == version
+
+    kept = sorted(item.name for item in (tmp_path / 'generations').iterdir())
+    assert kept == ['prices.000003.json', 'prices.000004.json']
+
+    data, version = load_snapshot(path)
+    assert version == 4 and data['onion']['current_price'] == 23.0
+    assert data[HASH_KEY]
+
+
+def test_unreadable_snapshot_falls_back_to_generation(tmp_path):
+    path = tmp_path / 'prices.json'
+    write_snapshot(str(path), snapshot(20.0))
+    write_snapshot(str(path), snapshot(21.0))
+    path.write_text('{"truncated": ')
+
+    data, version = load_snapshot(str(path))
+    assert version == 2 and data['onion']['current_price'] == 21.0
+
+
+def test_version_continues_after_snapshot_is_lost(tmp_path):
+    path = tmp_path / 'prices.json'
+    write_snapshot(str(path), snapshot(20.0))
+    path.unlink()
+
+    assert write_snapshot(str(path), snapshot(21.0))['version'] == 2
+
+
+def test_publish_replaces_database_snapshot(db, tmp_path):
+    path = str(tmp_path / 'prices.json')
+    publish_prices(path, {**snapshot(20.0), 'wheat': {'current_price': 24.0}})
+    result = publish_prices(path, snapshot(21.0))
+
+    assert result['written'] and result['database']
+    prices = db.read_prices(json_paths=(path,))
+    assert prices[VERSION_KEY] == result['version'] == 2
+    assert prices['onion']['current_price'] == 21.0
+    assert 'wheat' not in prices
+
+
+def test_each_file_keeps_its_own_database_snapshot(db, tmp_path):
+    cron_file = str(tmp_path / 'data' / 'prices.json')
+    scraper_file = str(tmp_path / 'backend' / 'prices.json')
+    publish_prices(cron_file, {**snapshot(20.0), 'tur': {'current_price': 95.0}})
+    publish_prices(scraper_file, {'onion': {'labels': ['Current'], 'data': [2000.0]}})
+
+    key, entry, meta = db.read_price_entry(['tur'], json_paths=(cron_file,))
+    assert key == 'tur' and entry['current_price'] == 95.0 and meta[VERSION_KEY] == 1
+    assert db.read_price_entry(['onion'], json_paths=(cron_file,))[1]['current_price'] == 20.0
+    assert db.read_price_entry(['onion'], json_paths=(scraper_file,))[1]['data'] == [2000.0]
+
+
+def test_current_database_snapshot_is_read_without_parsing_the_file(db, tmp_path, monkeypatch):
+    path = str(tmp_path / 'prices.json')
+    publish_prices(path, snapshot(20.0))
+    monkeypatch.setattr(db, '_load_json_file', lambda path: pytest.fail('prices.json was parsed'))
+
+    assert db.read_prices(json_paths=(path,))['onion']['current_price'] == 20.0
+    assert db.read_price_entry(['onion'], json_paths=(path,))[0] == 'onion'
+
+
+def test_file_rewritten_without_the_database_is_served(db, tmp_path, monkeypatch):
+    path = str(tmp_path / 'prices.json')
+    publish_prices(path, snapshot(20.0))
+    monkeypatch.setattr(snapshot_writer, 'DATABASE_AVAILABLE', False)
+    publish_prices(path, snapshot(21.0))
+
+    assert db.read_prices(json_paths=(path,))['onion']['current_price'] == 21.0
+    assert db.read_price_entry(['onion'], json_paths=(path,))[1]['current_price'] == 21.0
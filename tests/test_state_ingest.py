@@ -0,0 +1,101 @@
+"""Whole-state paging, its deadline and when negatives are recorded"""
+
+import time
+from datetime import date
+
+import pytest
+import requests
+
+import state_ingest
+
+
+class FakeResponse:
+    def __init__(self, records, total):
+        self.status_code = 200
+        self._data = {'records': records, 'total': total}
+
+    def json(self):
+        return self._data
+
+
+def fake_listing(monkeypatch, total, page_delay=0.0):
+    """Serve `total` onion records in pages; returns the list of requested offsets"""
+    offsets = []
+
+    def http_get(url, params=None, timeout=None):
+        offset, limit = int(params['offset']), int(params['limit'])
+        offsets.append(offset)
+        time.sleep(page_delay)
+        count = max(0, min(limit, total - offset))
+        records = [
+            {'commodity': 'Onion', 'market': f'Market {offset + index}', 'modal_price': '2000'}
+            for index in range(count)
+        ]
+        return FakeResponse(records, total)
+
+    monkeypatch.setattr(state_ingest, 'http_get', http_get)
+    return offsets
+
+
+def test_complete_listing(monkeypatch):
+    offsets = fake_listing(monkeypatch, total=25)
+    result = state_ingest.ingest_state('Maharashtra', date(2026, 10, 16))
+
+    assert result.complete and result.arrival_date == date(2026, 10, 16)
+    assert len(result.partition['Onion']) == 25
+    assert offsets == [0]
+
+
+def test_deadline_stops_paging(monkeypatch):
+    monkeypatch.setattr(state_ingest, 'MIN_PAGE_SECONDS', 0.05)
+    offsets = fake_listing(monkeypatch, total=1000, page_delay=0.05)
+
+    records = []
+    with pytest.raises(state_ingest.StateIngestIncomplete):
+        for record in state_ingest.iter_state_records('Maharashtra', page_size=10, deadline=time.monotonic() + 0.2):
+            records.append(record)
+
+    assert 0 < len(offsets) < 100
+    assert len(records) == 10 * len(offsets)
+
+
+def test_no_time_left_skips_both_dates(monkeypatch):
+    offsets = fake_listing(monkeypatch, total=25)
+    result = state_ingest.ingest_state('Maharashtra', deadline=time.monotonic())
+
+    assert result == state_ingest.IngestResult({}, None, False)
+    assert offsets == []
+
+
+def test_failed_page_is_incomplete(monkeypatch):
+    def http_get(url, params=None, timeout=None):
+        raise requests.ConnectionError('connection reset')
+
+    monkeypatch.setattr(state_ingest, 'http_get', http_get)
+    with pytest.raises(state_ingest.StateIngestIncomplete):
+        list(state_ingest.iter_state_records('Maharashtra'))
+
+
+class FakeScraper:
+    crop_mappings = {'onion': ['Onion'], 'tur': ['Arhar (Tur/Red Gram)(Whole)']}
+
+    def __init__(self):
+        self.primed = {}
+
+    def prime_cache(self, crop, state, records):
+        self.primed[crop] = records
+        return True
+
+
+@pytest.mark.parametrize('complete, negative', [(True, True), (False, False)])
+def test_negatives_only_after_complete_listing(lookup_state, complete, negative):
+    partition = {'Onion': {'Pune': [{'commodity': 'Onion', 'market': 'Pune'}]}}
+    scraper = FakeScraper()
+    stats = state_ingest.prime_scraper_caches(
+        partition, 'Maharashtra', real_scraper=scraper, arrival_date=date.today(), complete=complete
+    )
+
+    assert list(scraper.primed) == ['onion']
+    assert stats['no_records'] == ['tur']
+    assert stats['negatives_recorded'] is negative
+    assert lookup_state.is_negative('tur', 'Maharashtra') is negative